@@ -0,0 +1,74 @@
+"""
+Generates synthetic Python modules for the benchmarks.
+
+Every axis of the corpus can be scaled on its own, the rest stay at their defaults. Only constructs the transpiler
+supports are generated.
+"""
+import typing
+
+AXES = ('functions', 'depth', 'literal', 'fstrings', 'chain')
+DEFAULTS = {
+    'functions': 20,  # top-level function definitions
+    'depth': 2,  # nesting of if/for blocks inside every function
+    'literal': 8,  # elements of list, tuple and dict literals
+    'fstrings': 2,  # f-strings in every function
+    'chain': 8,  # terms of arithmetic expression chains
+}
+_CHAIN_OPERATORS = (' + ', ' * ', ' / ', ' + ')
+
+
+def _chain(length: int, seed: int) -> str:
+    terms = ['a', 'b', 'c', str(seed), 'a.size', 'values[0]']
+    parts = [terms[0]]
+    for i in range(1, length):
+        parts.append(_CHAIN_OPERATORS[(i + seed) % len(_CHAIN_OPERATORS)])
+        parts.append(terms[(i + seed) % len(terms)])
+    return ''.join(parts)
+
+
+def _body(i: int, depth: int, literal: int, fstrings: int, chain: int) -> typing.List[str]:
+    strings = ''.join(f'"s{j}", ' for j in range(literal))  # trailing commas keep one element tuples valid
+    lines = [
+        f'values = [{", ".join(str(j) for j in range(literal))}]',
+        f'strings = ({strings})',
+        f'names = {{{", ".join(f"{j}: a" for j in range(literal))}}}',
+        f'total = {_chain(chain, i)}',
+    ]
+    for j in range(fstrings):
+        lines.append(f"print(f'{{a}} {{b:>{j + 1}}} {{total}} {j}')")
+
+    # every level of nesting adds the same amount of code, so `depth` scales the output linearly
+    indent = ''
+    for level in range(depth):
+        if level % 2:
+            lines.append(f'{indent}for j{level} in range({level + 2}):')
+        else:
+            lines.append(f'{indent}if a:')
+        indent += '    '
+        lines.append(f'{indent}total = total + {level}')
+    lines.append('return total')
+    return lines
+
+
+def generate(functions: int = DEFAULTS['functions'], depth: int = DEFAULTS['depth'],
+             literal: int = DEFAULTS['literal'], fstrings: int = DEFAULTS['fstrings'],
+             chain: int = DEFAULTS['chain']) -> str:
+    """
+    Returns the source of a module with `functions` functions, see DEFAULTS for what the other arguments scale.
+    """
+    output = []
+    for i in range(functions):
+        output.append(f'def function_{i}(a, b, c):\n')
+        for line in _body(i, depth, literal, fstrings, chain):
+            output.append(f'    {line}\n')
+        output.append('\n')
+    return ''.join(output)
+
+
+def scaled(axis: str, value: int, base: typing.Optional[typing.Dict[str, int]] = None) -> str:
+    """
+    Returns a module with only `axis` changed from `base` (DEFAULTS if not given).
+    """
+    if axis not in AXES:
+        raise ValueError(f'Unknown axis {axis!r}, expected one of {AXES}')
+    return generate(**{**(base or DEFAULTS), axis: value})
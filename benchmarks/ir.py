@@ -0,0 +1,78 @@
+"""
+Measures the size of the IR built for a module and how long it takes to compile it.
+
+Usage: python -m benchmarks.ir [FUNCTIONS]
+"""
+import ast
+import gc
+import sys
+import time
+import tracemalloc
+
+import unholy
+
+FUNCTION_TEMPLATE = '''
+def function_{i}(a, b, c):
+    if a:
+        for j in range(10):
+            print(f'{{j}} {{a:>3}} {{b}}')
+    values = [a, b, c, {i}, "string {i}", (1, 2, 3), {{1: a, 2: b}}]
+    total = a + b * c + {i} + a / 2
+    return total
+'''
+
+
+def generate(functions: int) -> str:
+    return ''.join(FUNCTION_TEMPLATE.format(i=i) for i in range(functions))
+
+
+def _count_objects(roots) -> int:
+    count = 0
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, unholy.JSBlock):
+            count += 1
+            stack.extend(obj.statements)
+        elif isinstance(obj, unholy.JSExpression):
+            count += 1
+            stack.extend(obj.others)
+        else:
+            count += 1
+    return count
+
+
+def run(functions: int):
+    code = generate(functions)
+    tree = unholy.parse(code)
+    nodes = sum(1 for _ in ast.walk(tree))
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = unholy.jsify_node(tree)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    objects = _count_objects(result)
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        result[0].compile([])
+        best = min(best, time.perf_counter() - start)
+
+    best_jsify = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        unholy.jsify_node(tree)
+        best_jsify = min(best_jsify, time.perf_counter() - start)
+
+    print(f'AST nodes:          {nodes}')
+    print(f'IR objects:         {objects} ({objects / nodes:.2f} per AST node)')
+    print(f'IR memory:          {(after - before) / 1024:.0f} KiB ({(after - before) / nodes:.1f} B per AST node)')
+    print(f'jsify time:         {best_jsify * 1000:.1f} ms')
+    print(f'compile time:       {best * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,213 @@
+"""
+Measures how the transpiler scales along every axis of the synthetic corpus and compares the results to a baseline.
+
+For every point the wall time of `unholy.transpile`, the time of the parse, optimize, jsify and compile phases and the peak
+memory are recorded. A power law is fitted to the wall times of every axis, an exponent above `--max-exponent` means
+that something got super-linear. Every measurement is compared to the baseline, averaged over
+the points of an axis. Times too short to measure reliably aren't compared, and axes that look like they regressed
+are measured again, a regression has to show up in both runs.
+
+Usage: python -m benchmarks.scaling [--axis AXIS] [--baseline FILE] [--update-baseline] [--json FILE]
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+import typing
+
+import unholy
+from benchmarks import corpus
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# The axis being measured is scaled on top of a small corpus, so that the rest of it doesn't flatten the curve.
+BACKGROUND = {'functions': 10, 'depth': 1, 'literal': 1, 'fstrings': 0, 'chain': 1}
+SERIES = {
+    'functions': [50, 100, 200, 400],
+    'depth': [10, 20, 40, 80],  # the tokenizer doesn't allow more than 100 levels of indentation
+    'literal': [100, 200, 400, 800],
+    'fstrings': [20, 40, 80, 160],
+    'chain': [100, 200, 400, 800],
+}
+# times below this are mostly timer and scheduling noise, they aren't compared to the baseline
+MIN_COMPARED_TIME = 0.002
+
+
+def _best(func: typing.Callable, repeat: int, setup: typing.Optional[typing.Callable] = None) -> float:
+    best = float('inf')
+    gc.collect()
+    gc.disable()  # a collection landing in one of the runs makes the times useless for fitting
+    try:
+        for _ in range(repeat):
+            arguments = (setup(),) if setup else ()
+            start = time.perf_counter()
+            func(*arguments)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def measure(code: str, repeat: int = 3) -> dict:
+    """
+    Returns the best wall and phase times out of `repeat` runs, and the peak memory of a single run.
+    """
+    tree = unholy.optimize(unholy.parse(code))
+    result = unholy.jsify_node(tree)
+    phases = {
+        'parse': _best(lambda: unholy.parse(code), repeat),
+        'optimize': _best(unholy.optimize, repeat, setup=lambda: unholy.parse(code)),  # passes modify the tree
+        'jsify': _best(lambda: unholy.jsify_node(tree), repeat),
+        'compile': _best(lambda: result[0].compile([]), repeat),
+    }
+    wall = _best(lambda: unholy.transpile(code), repeat)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        unholy.transpile(code)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'bytes': len(code), 'wall': wall, 'phases': phases, 'peak_memory': peak - base}
+
+
+def fit_exponent(values: typing.List[float], times: typing.List[float]) -> float:
+    """
+    Least squares fit of `time = c * value ** k` in log-log space, returns k.
+    """
+    xs = [math.log(i) for i in values]
+    ys = [math.log(max(i, 1e-9)) for i in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def run(axes: typing.Iterable[str], repeat: int = 3, log: typing.Optional[typing.TextIO] = None) -> dict:
+    results = {}
+    for axis in axes:
+        points = []
+        for value in SERIES[axis]:
+            point = measure(corpus.scaled(axis, value, BACKGROUND), repeat)
+            point['value'] = value
+            points.append(point)
+            if log:
+                print(f'{axis:<10} {value:>6} {point["wall"] * 1000:>10.2f} ms '
+                      f'{point["peak_memory"] / 1024:>10.0f} KiB', file=log)
+        results[axis] = {
+            'points': points,
+            'exponent': fit_exponent([i['value'] for i in points], [i['wall'] for i in points]),
+        }
+    return {'version': unholy.VERSION, 'axes': results}
+
+
+def merge(first: dict, second: dict) -> dict:
+    """
+    The best of two measurements of the same axis, point by point.
+    """
+    points = []
+    for a, b in zip(first['points'], second['points']):
+        points.append({**a, 'wall': min(a['wall'], b['wall']), 'peak_memory': min(a['peak_memory'], b['peak_memory']),
+                       'phases': {name: min(a['phases'][name], b['phases'][name]) for name in a['phases']}})
+    return {'points': points, 'exponent': fit_exponent([i['value'] for i in points], [i['wall'] for i in points])}
+
+
+def compare(results: dict, baseline: typing.Optional[dict], tolerance: float = 0.5, memory_tolerance: float = 0.1,
+            max_exponent: float = 1.3) -> typing.List[str]:
+    """
+    Returns a description of every regression: a super-linear axis, or an axis that got slower than `tolerance` or
+    uses more memory than `memory_tolerance` allows compared to the baseline.
+    """
+    problems = []
+    for axis, current in results['axes'].items():
+        if current['exponent'] > max_exponent:
+            problems.append(f'{axis}: scales with exponent {current["exponent"]:.2f} (max {max_exponent})')
+
+        if not baseline or axis not in baseline['axes']:
+            continue
+        old_points = {i['value']: i for i in baseline['axes'][axis]['points']}
+        pairs = [(i, old_points[i['value']]) for i in current['points'] if i['value'] in old_points]
+        if not pairs:
+            continue
+        # single points are too noisy to compare, the geometric mean of the ratios along the axis is used
+        measured = [('wall time', lambda i: i['wall'], tolerance, MIN_COMPARED_TIME),
+                    ('peak memory', lambda i: i['peak_memory'], memory_tolerance, 1)]
+        measured += [(f'{name} time', lambda i, name=name: i['phases'][name], tolerance, MIN_COMPARED_TIME)
+                     for name in pairs[0][0]['phases'] if name in pairs[0][1]['phases']]
+        for name, get, allowed, smallest in measured:
+            ratios = [get(new) / get(old) for new, old in pairs if get(old) >= smallest]
+            if not ratios:
+                continue
+            ratio = math.exp(sum(math.log(i) for i in ratios) / len(ratios))
+            if ratio > 1 + allowed:
+                problems.append(f'{axis}: {name} is {ratio:.2f}x the baseline')
+    return problems
+
+
+def report(results: dict, baseline: typing.Optional[dict]) -> str:
+    lines = [f'{"axis":<10} {"exponent":>9} {"baseline":>9}']
+    for axis, current in results['axes'].items():
+        old = baseline['axes'].get(axis) if baseline else None
+        old_exponent = f'{old["exponent"]:.2f}' if old else '-'
+        lines.append(f'{axis:<10} {current["exponent"]:>9.2f} {old_exponent:>9}')
+    return '\n'.join(lines)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog='python -m benchmarks.scaling')
+    p.add_argument('--axis', choices=corpus.AXES, action='append', dest='axes',
+                   help='Only measure this axis, can be given more than once.')
+    p.add_argument('--repeat', metavar='N', type=int, default=5, dest='repeat',
+                   help='Number of runs, the best one is kept.')
+    p.add_argument('--baseline', metavar='FILE', type=str, default=BASELINE, dest='baseline')
+    p.add_argument('--update-baseline', action='store_true', dest='update_baseline',
+                   help='Store the results as the new baseline instead of comparing against it.')
+    p.add_argument('--json', metavar='FILE', type=str, default=None, dest='json',
+                   help='Write the results as JSON into FILE.')
+    p.add_argument('--tolerance', metavar='FRACTION', type=float, default=0.5, dest='tolerance',
+                   help='How much slower than the baseline an axis may get.')
+    p.add_argument('--memory-tolerance', metavar='FRACTION', type=float, default=0.1, dest='memory_tolerance',
+                   help='How much more memory than the baseline a point may use.')
+    p.add_argument('--max-exponent', metavar='K', type=float, default=1.3, dest='max_exponent',
+                   help='Largest acceptable scaling exponent.')
+    args = p.parse_args(argv)
+
+    results = run(args.axes or corpus.AXES, args.repeat, log=sys.stderr)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+            f.write('\n')
+        print(f'Written baseline to {args.baseline}')
+        return 0
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    problems = compare(results, baseline, args.tolerance, args.memory_tolerance, args.max_exponent)
+    # a busy machine slows down single runs, what regressed is measured again
+    regressed = [axis for axis in results['axes'] if any(i.startswith(axis + ':') for i in problems)]
+    if regressed:
+        print(f'Measuring {", ".join(regressed)} again', file=sys.stderr)
+        again = run(regressed, args.repeat, log=sys.stderr)
+        for axis in regressed:
+            results['axes'][axis] = merge(results['axes'][axis], again['axes'][axis])
+        problems = compare(results, baseline, args.tolerance, args.memory_tolerance, args.max_exponent)
+    print(report(results, baseline))
+    for i in problems:
+        print(f'REGRESSION: {i}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+// Micro-benchmarks of the unholy_js runtime. Run with `node not_python/bench.js [iterations]`.
+const unholy_js = require("./unholy_js.js");
+
+const N = Number(process.argv[2] ?? 1000000);
+const ROUNDS = 20;
+
+
+// the generator based range the runtime used before, kept for comparison
+const generator_range = (function* generator_range(start, end, step) {
+    for (let i = start; step > 0 ? i < end : i > end; i += step) {
+        yield i;
+    }
+});
+
+
+function bench(name, func) {
+    func();  // warm up
+    let best = Infinity;
+    let result;
+    for (let i = 0; i < ROUNDS; i++) {
+        const start = process.hrtime.bigint();
+        result = func();
+        const elapsed = Number(process.hrtime.bigint() - start) / 1e6;
+        best = Math.min(best, elapsed);
+    }
+    console.log(`${name.padEnd(40)} ${best.toFixed(3).padStart(10)} ms  (${(best * 1e6 / N).toFixed(2)} ns/item, result ${result})`);
+}
+
+
+const array = Array.from({length: N}, (_, i) => i);
+
+bench("for...of generator range", () => {
+    let total = 0;
+    for (const i of generator_range(0, N, 1)) total += i;
+    return total;
+});
+bench("for...of py__range", () => {
+    let total = 0;
+    for (const i of unholy_js.py__iter(unholy_js.py__range(N))) total += i;
+    return total;
+});
+bench("for...of py__range, negative step", () => {
+    let total = 0;
+    for (const i of unholy_js.py__iter(unholy_js.py__range(N, 0, -1))) total += i;
+    return total;
+});
+bench("plain counting loop", () => {
+    let total = 0;
+    for (let i = 0; i < N; i++) total += i;
+    return total;
+});
+bench("for...of py__iter(array)", () => {
+    let total = 0;
+    for (const i of unholy_js.py__iter(array)) total += i;
+    return total;
+});
+bench("py__iter dispatch", () => {
+    let total = 0;
+    const targets = [array, "abc", new Set([1]), unholy_js.py__range(3)];
+    for (let i = 0; i < N; i++) {
+        if (unholy_js.py__iter(targets[i & 3]) !== null) total++;
+    }
+    return total;
+});
+bench("sum of 64 item slices, py__slice", () => {
+    let total = 0;
+    for (let i = 0; i + 64 <= N; i += 64) total += unholy_js.py__sum(unholy_js.py__slice(array, i, i + 64));
+    return total;
+});
+bench("sum of 64 item slices, py__slice_view", () => {
+    let total = 0;
+    for (let i = 0; i + 64 <= N; i += 64) total += unholy_js.py__sum(unholy_js.py__slice_view(array, i, i + 64));
+    return total;
+});
+bench("for...of 64 item slices, py__slice", () => {
+    let total = 0;
+    for (let i = 0; i + 64 <= N; i += 64) {
+        for (const x of unholy_js.py__slice(array, i, i + 64)) total += x;
+    }
+    return total;
+});
+bench("for over 64 item slices, indices", () => {
+    let total = 0;
+    for (let i = 0; i + 64 <= N; i += 64) {
+        for (let [index, left, step] = unholy_js.py__slice_indices(array, i, i + 64); left > 0; left--, index += step) {
+            const x = array[index];
+            total += x;
+        }
+    }
+    return total;
+});
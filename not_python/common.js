@@ -3,6 +3,18 @@ class NotImplementedError extends Error {
 }
 
 
+class ValueError extends Error {
+
+}
+
+
+class StopIteration extends Error {
+
+}
+
+
 module.exports = {
-    NotImplementedError
+    NotImplementedError,
+    StopIteration,
+    ValueError
 };
@@ -1,4 +1,8 @@
-const {NotImplementedError} = require("./common.js");
+const {NotImplementedError, StopIteration, ValueError} = require("./common.js");
+
+// With --inline-runtime the transpiler copies the declarations a module needs into its output, see unholy/runtime.py.
+// Every declaration starts at the beginning of a line and ends with the next line starting with "}" or ")". Helpers
+// refer to each other by their names, not through module.exports.
 
 
 class ParsingError extends Error {
@@ -25,7 +29,6 @@ const _parse_fspec = (function _parse_fspec(spec) {
     let state = 0;
     // 0 = fill
     for (let i = 0; i < spec.length; i++) {
-        console.log({spec, ret_val, state, i, speci: spec[i]});
         if (state === 0) {
             if ("<>^=".includes(spec[i + 1])) {
                 // next chat is align, current must be fill
@@ -111,37 +114,384 @@ const _parse_fspec = (function _parse_fspec(spec) {
     return ret_val;
 });
 
-const real_py__range = (function* real_py__range(start, end, step) {
-    for (let i = 0; i < end; i += step) {
-        yield i;
+/**
+ * Iterator over a PyRange. The same result object is returned from every call to next(), iterating doesn't allocate.
+ * That's fine for for...of and spreading, which read it right away, iter() wraps it in a PyFreshIterator.
+ */
+class PyRangeIterator {
+    constructor(start, stop, step) {
+        this._current = start;
+        this._stop = stop;
+        this._step = step;
+        this._result = {value: undefined, done: false};
     }
-});
 
-module.exports = {
-    format: (function py__format(value, fspec) {
-        if (typeof value.__format__ !== 'undefined') {
-            return value.__format__(fspec);
+    next() {
+        const current = this._current;
+        if (this._step > 0 ? current < this._stop : current > this._stop) {
+            this._current = current + this._step;
+            this._result.value = current;
         } else {
-            /** @type FSpec */
-            const spec = _parse_fspec(fspec);
-            throw NotImplementedError("__format__ is not implemented YET.");
-        }
-    }),
-    py__range: (function py__range(...args) {
-        if (args.length === 1) {
-            return real_py__range(0, args[0], 1);
-        } else if (args.length === 2) {
-            return real_py__range(args[0], args[1], 1);
-        } else if (args.length === 3) {
-            return real_py__range(args[0], args[1], args[2]);
+            this._result.value = undefined;
+            this._result.done = true;
+        }
+        return this._result;
+    }
+
+    [Symbol.iterator]() {
+        return this;
+    }
+}
+
+
+/**
+ * Python's range(): an immutable sequence that can be iterated more than once.
+ */
+class PyRange {
+    constructor(start, stop, step) {
+        if (step === 0) {
+            throw new ValueError("range() arg 3 must not be zero");
+        }
+        this.start = start;
+        this.stop = stop;
+        this.step = step;
+    }
+
+    get length() {
+        const length = this.step > 0
+            ? Math.ceil((this.stop - this.start) / this.step)
+            : Math.ceil((this.start - this.stop) / -this.step);
+        return Math.max(length, 0);
+    }
+
+    [Symbol.iterator]() {
+        return new PyRangeIterator(this.start, this.stop, this.step);
+    }
+
+    includes(value) {
+        if (!Number.isInteger(value)) {
+            return false;
+        }
+        if (this.step > 0 ? value < this.start || value >= this.stop : value > this.start || value <= this.stop) {
+            return false;
+        }
+        return (value - this.start) % this.step === 0;
+    }
+
+    toString() {
+        return this.step === 1 ? `range(${this.start}, ${this.stop})` : `range(${this.start}, ${this.stop}, ${this.step})`;
+    }
+}
+
+
+/**
+ * Python's slice.indices(): clamps the parts of a slice to a sequence of the given length.
+ * @return {number[]} start, number of items and step
+ */
+const _slice_indices = (function _slice_indices(length, start, stop, step) {
+    step = step ?? 1;
+    if (step === 0) {
+        throw new ValueError("slice step cannot be zero");
+    }
+    const lower = step > 0 ? 0 : -1;
+    const upper = step > 0 ? length : length - 1;
+    const clamp = (index, missing) => {
+        if (index === null || index === undefined) {
+            return missing;
+        }
+        return index < 0 ? Math.max(index + length, lower) : Math.min(index, upper);
+    };
+    start = clamp(start, step > 0 ? lower : upper);
+    stop = clamp(stop, step > 0 ? upper : lower);
+    const count = step > 0 ? Math.ceil((stop - start) / step) : Math.ceil((start - stop) / -step);
+    return [start, Math.max(count, 0), step];
+});
+
+
+/**
+ * Iterator over a PySliceView, like PyRangeIterator it reuses its result object.
+ */
+class PySliceViewIterator {
+    constructor(target, start, count, step) {
+        this._target = target;
+        this._index = start;
+        this._left = count;
+        this._step = step;
+        this._result = {value: undefined, done: false};
+    }
+
+    next() {
+        if (this._left > 0) {
+            this._left--;
+            this._result.value = this._target[this._index];
+            this._index += this._step;
         } else {
-            throw SyntaxError(`Given bad amount of arguments for function py__range (Python range): ${args.length}, expected 1, 2 or 3`);
+            this._result.value = undefined;
+            this._result.done = true;
+        }
+        return this._result;
+    }
+
+    [Symbol.iterator]() {
+        return this;
+    }
+}
+
+
+/**
+ * A read-only window into an array, used for slices that are only iterated, measured or searched. Nothing is copied,
+ * changes to the array are visible through the view.
+ */
+class PySliceView {
+    constructor(target, start, count, step) {
+        this._target = target;
+        this._start = start;
+        this.length = count;
+        this._step = step;
+    }
+
+    [Symbol.iterator]() {
+        return new PySliceViewIterator(this._target, this._start, this.length, this._step);
+    }
+
+    _sum(total) {
+        // py__sum without the iterator protocol
+        for (let i = 0, index = this._start; i < this.length; i++, index += this._step) {
+            total += this._target[index];
+        }
+        return total;
+    }
+
+    includes(value) {
+        for (let i = 0, index = this._start; i < this.length; i++, index += this._step) {
+            if (this._target[index] === value) {
+                return true;
+            }
+        }
+        return false;
+    }
+}
+
+
+/**
+ * Python's len(), also used by the translated `len(...)` of slice views.
+ */
+const py__len = (function py__len(target) {
+    if (typeof target === "string" || Array.isArray(target) || ArrayBuffer.isView(target)
+        || target instanceof PyRange || target instanceof PySliceView) {
+        return target.length;
+    }
+    if (target instanceof Set || target instanceof Map) {
+        return target.size;
+    }
+    if (target !== null && target !== undefined) {
+        if (typeof target.__len__ === "function") {
+            return target.__len__();
         }
-    }),
-    py__iter: (function py__iter(target) {
-        console.debug("Warn: ignored argument for py__iter");
+        if (typeof target === "object") {
+            return Object.keys(target).length;
+        }
+    }
+    throw new TypeError(`object of type '${target === null ? "None" : typeof target}' has no len()`);
+});
+
+
+const py__format = (function py__format(value, fspec) {
+    if (typeof value.__format__ !== 'undefined') {
+        return value.__format__(fspec);
+    } else {
+        /** @type FSpec */
+        const spec = _parse_fspec(fspec);
+        throw new NotImplementedError("__format__ is not implemented YET.");
+    }
+});
+
+
+const py__range = (function py__range(start, stop, step) {
+    switch (arguments.length) {
+        case 1:
+            return new PyRange(0, start, 1);
+        case 2:
+            return new PyRange(start, stop, 1);
+        case 3:
+            return new PyRange(start, stop, step);
+        default:
+            throw new TypeError(`range expected 1 to 3 arguments, got ${arguments.length}`);
+    }
+});
+
+
+const py__iter = (function py__iter(target) {
+    // What for...of loops go over, not necessarily an iterator: the most common cases are returned as they are.
+    // iter() is py__iterator.
+    if (Array.isArray(target) || typeof target === "string" || target instanceof PyRange
+        || target instanceof Set || target instanceof PySliceView) {
         return target;
-    })
+    }
+    if (target instanceof Map) {
+        return target.keys();  // like a dict
+    }
+    if (target !== null && target !== undefined) {
+        if (typeof target.__iter__ === "function") {
+            return target.__iter__();
+        }
+        if (typeof target[Symbol.iterator] === "function") {
+            return target;
+        }
+        if (typeof target === "object") {
+            return Object.keys(target);  // a dict, iterating it gives the keys
+        }
+    }
+    throw new TypeError(`'${target === null ? "None" : typeof target}' object is not iterable`);
+});
+
+
+/**
+ * Gives the results of an iterator reusing its result object as new objects, for code that may keep them.
+ */
+class PyFreshIterator {
+    constructor(iterator) {
+        this._iterator = iterator;
+    }
+
+    next() {
+        const {value, done} = this._iterator.next();
+        return {value, done};
+    }
+
+    [Symbol.iterator]() {
+        return this;
+    }
+}
+
+
+const py__iterator = (function py__iterator(target) {
+    const iterable = py__iter(target);
+    if (iterable instanceof PyRange || iterable instanceof PySliceView) {
+        // handed out, unlike the iterators of the runtime's own loops
+        return new PyFreshIterator(iterable[Symbol.iterator]());
+    }
+    if (typeof iterable[Symbol.iterator] === "function") {
+        return iterable[Symbol.iterator]();
+    }
+    return iterable;  // what an __iter__ returned, an iterator with only next()
+});
+
+
+const py__contains = (function py__contains(container, item) {
+    if (Array.isArray(container) || typeof container === "string" || container instanceof PyRange
+        || container instanceof PySliceView || ArrayBuffer.isView(container)) {
+        return container.includes(item);
+    }
+    if (container instanceof Set || container instanceof Map) {
+        return container.has(item);
+    }
+    if (container !== null && container !== undefined) {
+        if (typeof container.__contains__ === "function") {
+            return container.__contains__(item);
+        }
+        if (typeof container === "object") {
+            return Object.prototype.hasOwnProperty.call(container, item);  // a dict, not what it inherits
+        }
+    }
+    throw new TypeError(`argument of type '${container === null ? "None" : typeof container}' is not iterable`);
+});
+
+
+const py__next = (function py__next(iterator, ...default_) {
+    const result = iterator.next();
+    if (result.done) {
+        if (default_.length) {
+            return default_[0];
+        }
+        throw new StopIteration();
+    }
+    return result.value;
+});
+
+
+const py__slice = (function py__slice(target, start, stop, step) {
+    // a copy, allocated once at its final size
+    if (typeof target === "string") {
+        const [first, count, by] = _slice_indices(target.length, start, stop, step);
+        if (by === 1) {
+            return target.slice(first, first + count);
+        }
+        const characters = new Array(count);
+        for (let i = 0, index = first; i < count; i++, index += by) {
+            characters[i] = target[index];
+        }
+        return characters.join("");
+    }
+    if (Array.isArray(target) || ArrayBuffer.isView(target)) {
+        const [first, count, by] = _slice_indices(target.length, start, stop, step);
+        if (by === 1) {
+            return target.slice(first, first + count);
+        }
+        const result = Array.isArray(target) ? new Array(count) : new target.constructor(count);
+        for (let i = 0, index = first; i < count; i++, index += by) {
+            result[i] = target[index];
+        }
+        return result;
+    }
+    throw new TypeError(`'${target === null ? "None" : typeof target}' object is not subscriptable`);
+});
+
+
+const py__slice_indices = (function py__slice_indices(target, start, stop, step) {
+    // for loops over slices index the sliced object directly, see control._jsify_loop_header
+    if (target === null || target === undefined || typeof target.length !== "number") {
+        throw new TypeError(`'${target === null ? "None" : typeof target}' object is not subscriptable`);
+    }
+    return _slice_indices(target.length, start, stop, step);
+});
+
+
+const py__slice_view = (function py__slice_view(target, start, stop, step) {
+    // for slices that are only read once, see unholy/passes.py
+    if (Array.isArray(target)) {
+        const [first, count, by] = _slice_indices(target.length, start, stop, step);
+        return new PySliceView(target, first, count, by);
+    }
+    if (ArrayBuffer.isView(target) && !(target instanceof DataView)) {
+        const [first, count, by] = _slice_indices(target.length, start, stop, step);
+        if (by === 1) {
+            return target.subarray(first, first + count);
+        }
+        return new PySliceView(target, first, count, by);
+    }
+    // strings are immutable, engines don't copy substrings anyway
+    return py__slice(target, start, stop, step);
+});
+
+
+const py__sum = (function py__sum(iterable, start = 0) {
+    // consumes generators one value at a time, nothing is collected into an array
+    let total = start;
+    if (iterable instanceof PySliceView) {
+        return iterable._sum(total);
+    }
+    for (const i of py__iter(iterable)) {
+        total += i;
+    }
+    return total;
+});
+
+
+module.exports = {
+    PyRange,
+    py__format,
+    format: py__format,  // old name
+    py__range,
+    py__iter,
+    py__iterator,
+    py__contains,
+    py__next,
+    py__len,
+    py__slice,
+    py__slice_indices,
+    py__slice_view,
+    py__sum
 };
 /**
  * @typedef FSpec {{grouping_option: string, precision: number, sign: string, width: number, fill: string, align: string, type: string}}
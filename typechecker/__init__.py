@@ -1,91 +1,326 @@
+import collections.abc
 import functools
-import inspect
 import logging
+import random
+import sys
 import typing
 
+# Read on every call, can be flipped at any time. Functions decorated with ensure_typecheck stay wrapped either way.
 enable_typecheck = False
 
+MODES = ('off', 'full', 'sample', 'bounded')
+# full: every call is checked completely
+# sample: only one in `sample_rate` calls of every function is checked
+# bounded: every call is checked, but lists only have their first `list_bound` elements and `list_sample` random
+#          others checked
+mode = 'full'
+sample_rate = 100
+list_bound: typing.Optional[int] = None
+list_sample = 8
+raise_on_violation = True
+
+_random = random.Random()
+_call_counts: typing.Dict[object, int] = {}
+
+
+class TypecheckStats:
+    def __init__(self):
+        self.checks = 0
+        self.skipped = 0
+        self.violations = 0
+
+    def as_dict(self) -> typing.Dict[str, int]:
+        return {'checks': self.checks, 'skipped': self.skipped, 'violations': self.violations}
+
+    def __str__(self):
+        return f'{self.checks} checked, {self.skipped} skipped, {self.violations} violations'
+
+
+stats = TypecheckStats()
+
+
+def set_typecheck(enabled: bool):
+    global enable_typecheck
+    enable_typecheck = enabled
+
+
+def configure(new_mode: str = 'full', rate: int = 100, bound: int = 16, bound_sample: int = 8,
+              on_violation: str = 'raise'):
+    """
+    Selects how much checking is done, see MODES. `on_violation` is either 'raise' or 'log'.
+    """
+    global mode, sample_rate, list_bound, list_sample, raise_on_violation
+    if new_mode not in MODES:
+        raise ValueError(f'Unknown typecheck mode {new_mode!r}, expected one of {MODES}')
+    if on_violation not in ('raise', 'log'):
+        raise ValueError(f'Unknown violation action {on_violation!r}, expected raise or log')
+    mode = new_mode
+    sample_rate = max(rate, 1)
+    list_bound = bound if new_mode == 'bounded' else None
+    list_sample = bound_sample
+    raise_on_violation = on_violation == 'raise'
+    _call_counts.clear()
+    set_typecheck(new_mode != 'off')
+
+
+def settings() -> typing.Dict[str, typing.Any]:
+    """
+    The arguments to `configure` that select the current checking, e.g. to set it up the same in worker processes.
+    """
+    return {
+        'new_mode': mode if enable_typecheck else 'off',
+        'rate': sample_rate,
+        'bound': 16 if list_bound is None else list_bound,
+        'bound_sample': list_sample,
+        'on_violation': 'raise' if raise_on_violation else 'log',
+    }
+
+
+def _should_check(key) -> bool:
+    if mode == 'sample':
+        count = _call_counts.get(key, 0)
+        _call_counts[key] = count + 1
+        if count % sample_rate:
+            stats.skipped += 1
+            return False
+    stats.checks += 1
+    return True
+
+
+def _violation(name, good_type, value):
+    stats.violations += 1
+    _, msg = _really_typecheck(value, good_type, name)
+    error = TypeCheckError(name, good_type, value, msg)
+    if raise_on_violation:
+        raise error
+    logging.warning(f'Type check violation: {error}')
+
 
 def typecheck(types: dict, **values):
     if not enable_typecheck:
         return
+    if not _should_check(sys._getframe(1).f_code):
+        return
 
     for k, good_type in types.items():
         value = values[k]
-        o, msg = _really_typecheck(value, good_type, k)
-        if not o:
-            raise TypeCheckError(k, good_type, value, msg)
+        if not compile_validator(good_type)(value):
+            _violation(k, good_type, value)
 
 
-def ensure_typecheck(func):
-    if not enable_typecheck:
-        return func
+def _accept(value) -> bool:
+    return True
+
+
+def _compile(good_type) -> typing.Union[tuple, typing.Callable[[typing.Any], bool]]:
+    """
+    Turns an annotation into either a tuple of classes (usable with isinstance directly) or a validator function.
+    """
+    if good_type is None or good_type is type(None):
+        return type(None),
+    if good_type is typing.Any or isinstance(good_type, (str, typing.ForwardRef)):
+        return _accept  # unresolved forward references can't be checked
+
+    origin = typing.get_origin(good_type)
+    if origin is None:
+        if isinstance(good_type, type):
+            return good_type,
+        return _accept
+
+    args = typing.get_args(good_type)
+    if origin is typing.Union:
+        compiled = [_compile(i) for i in args]
+        if _accept in compiled:
+            return _accept
+        classes = tuple(j for i in compiled if isinstance(i, tuple) for j in i)
+        functions = [i for i in compiled if not isinstance(i, tuple)]
+        if not functions:
+            return classes
+
+        def union_validator(value) -> bool:
+            if classes and isinstance(value, classes):
+                return True
+            for i in functions:
+                if i(value):
+                    return True
+            return False
+
+        return union_validator
+    elif origin is list:
+        element = _compile(args[0]) if args else _accept
+        if element is _accept:
+            return list,
+        if isinstance(element, tuple):
+            def list_validator(value) -> bool:
+                if not isinstance(value, list):
+                    return False
+                if list_bound is not None:
+                    value = _bounded_sample(value)
+                for i in value:
+                    if not isinstance(i, element):
+                        return False
+                return True
+        else:
+            def list_validator(value) -> bool:
+                if not isinstance(value, list):
+                    return False
+                if list_bound is not None:
+                    value = _bounded_sample(value)
+                for i in value:
+                    if not element(i):
+                        return False
+                return True
+        return list_validator
+    elif isinstance(origin, type):
+        return origin,
+    return _accept
 
-    signature = inspect.signature(func)
+
+def _bounded_sample(value: list) -> list:
+    length = len(value)
+    if length <= list_bound + list_sample:
+        return value
+    # drawn with replacement, that's cheaper than random.sample and just as good at catching a bad element
+    rest = length - list_bound
+    pick = _random.random
+    return value[:list_bound] + [value[list_bound + int(pick() * rest)] for _ in range(list_sample)]
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_validator_cached(good_type) -> typing.Callable[[typing.Any], bool]:
+    compiled = _compile(good_type)
+    if isinstance(compiled, tuple):
+        return lambda value: isinstance(value, compiled)
+    return compiled
+
+
+def compile_validator(good_type) -> typing.Callable[[typing.Any], bool]:
+    """
+    Returns a function that checks a value against `good_type`. Validators are built once per annotation.
+    """
+    try:
+        return _compile_validator_cached(good_type)
+    except TypeError:  # unhashable annotation
+        return _compile_validator_cached.__wrapped__(good_type)
+
+
+class _FunctionChecker:
+    """
+    Argument and return value validators of a single function, built on the first checked call.
+    """
+    __slots__ = ('positional', 'keyword', 'return_validator', 'return_type', 'types', 'generator')
+
+    def __init__(self, func):
+        import inspect
+
+        signature = inspect.signature(func)
+        self.positional = []
+        self.keyword = []
+        self.types = {}
+        for num, (param_name, param) in enumerate(signature.parameters.items()):
+            if param.annotation is inspect.Parameter.empty:
+                continue
+            self.types[param_name] = param.annotation
+            validator = compile_validator(param.annotation)
+            if param.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.POSITIONAL_ONLY):
+                self.positional.append((num, param_name, validator))
+            elif param.kind == inspect.Parameter.KEYWORD_ONLY:
+                self.keyword.append((param_name, validator))
+            else:
+                logging.debug('FeelsDonkMan')
+
+        self.return_validator = None
+        self.return_type = signature.return_annotation
+        self.generator = inspect.isgeneratorfunction(func)
+        if self.generator:
+            # `Generator[Y, S, R]` describes the generator, its value is of type R. Any other annotation of a
+            # generator function describes its value, what `yield from` and StopIteration give back.
+            origin = typing.get_origin(self.return_type)
+            if origin is collections.abc.Generator:
+                self.return_type = typing.get_args(self.return_type)[2]
+            elif origin in (collections.abc.Iterator, collections.abc.Iterable) \
+                    or self.return_type in (typing.Generator, typing.Iterator, typing.Iterable):
+                self.return_type = inspect.Signature.empty
+        if self.return_type is not inspect.Signature.empty:
+            self.return_validator = compile_validator(self.return_type)
+
+    def check_arguments(self, a: tuple, kw: dict):
+        for num, name, validator in self.positional:
+            if name in kw:
+                value = kw[name]
+            elif num < len(a):
+                value = a[num]
+            else:
+                continue  # don't typecheck defaults
+            if not validator(value):
+                self._fail(name, self.types[name], value)
+        for name, validator in self.keyword:
+            if name in kw and not validator(kw[name]):
+                self._fail(name, self.types[name], kw[name])
+
+    def check_return(self, value):
+        if self.return_validator is not None and not self.return_validator(value):
+            self._fail('return', self.return_type, value)
+
+    def check_generator(self, generator):
+        """
+        Wraps `generator` to check its value once it's done.
+        """
+        if self.return_validator is None:
+            return generator
+        return self._checked(generator)
+
+    def _checked(self, generator):
+        value = yield from generator
+        self.check_return(value)
+        return value
+
+    @staticmethod
+    def _fail(name, good_type, value):
+        _violation(name, good_type, value)
+
+
+def ensure_typecheck(func):
+    checker = None
+    calls = 0
 
     @functools.wraps(func)
     def new_func(*a, **kw):
         if not enable_typecheck:
             return func(*a, **kw)
 
-        true_args = {}
-        arg_types = {}
-        for num, obj in enumerate(signature.parameters.items()):
-            param_name, param = obj
-            param_name: str
-            param: inspect.Parameter
-
-            if param.annotation != inspect._empty:
-                arg_types[param_name] = param.annotation
-
-            if param.kind == inspect.Parameter.POSITIONAL_OR_KEYWORD:
-                if param_name in kw:
-                    true_args[param.name] = kw.get(param_name, param.default or None)
-                else:
-                    # logging.debug(f'{a=} {num=}')
-                    if len(a) > num:
-                        true_args[param.name] = a[num]
-                    # don't typecheck defaults
-            elif param.kind == inspect.Parameter.KEYWORD_ONLY:
-                true_args[param.name] = kw.get(param_name, param.default)
-            elif param.kind == inspect.Parameter.POSITIONAL_ONLY:
-                true_args[param.name] = a[num]
-            else:
-                logging.debug('FeelsDonkMan')
+        nonlocal checker, calls
+        if mode == 'sample':
+            calls += 1
+            if (calls - 1) % sample_rate:
+                stats.skipped += 1
+                return func(*a, **kw)
+        stats.checks += 1
 
+        if checker is None:
+            checker = _FunctionChecker(func)
+        checker.check_arguments(a, kw)
         return_value = func(*a, **kw)
-        arg_types['return'] = signature.return_annotation
-        true_args['return'] = return_value
-        typecheck(arg_types, **true_args)
+        if checker.generator:
+            return checker.check_generator(return_value)
+        checker.check_return(return_value)
         return return_value
 
     return new_func
 
 
 def _really_typecheck(value, good_type, name) -> typing.Tuple[bool, str]:
-    if not enable_typecheck:
-        return True, 'Type checking disabled.'
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    if isinstance(good_type, typing._GenericAlias):
-        if good_type.__origin__ == typing.Union:
-            for arg in good_type.__args__:
-                v = _really_typecheck(value, arg, name)
-                if v:
-                    return True, ''
-            return False, ''  # doesn't type check
-        elif good_type.__origin__ == list:
-            if not isinstance(value, list):
-                return False, ''
-
-            for i, elem in enumerate(value):
-                v, msg = _really_typecheck(elem, good_type.__args__[0], f'{name}[{i}]')
-                if not v:
-                    return False, f'At element #{i}: {elem}: {msg}'
-            return True, ''
-        else:
-            return False, ''
-    else:
-        return isinstance(value, good_type), ''
+    if compile_validator(good_type)(value):
+        return True, ''
+
+    # slow path, only used to explain what went wrong
+    if typing.get_origin(good_type) is list and isinstance(value, list):
+        args = typing.get_args(good_type)
+        for i, elem in enumerate(value):
+            v, msg = _really_typecheck(elem, args[0], f'{name}[{i}]')
+            if not v:
+                return False, f'At element #{i}: {elem}: {msg}'
+    return False, ''
 
 
 class TypeCheckError(TypeError):
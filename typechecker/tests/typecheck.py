@@ -2,10 +2,19 @@ import unittest
 from unittest import TestCase
 import typing
 
-from typechecker import _really_typecheck, TypeCheckError, ensure_typecheck
+import typechecker
+from typechecker import _really_typecheck, TypeCheckError, ensure_typecheck, compile_validator
 
 
 class TypecheckTests(TestCase):
+    def setUp(self):
+        self._enabled = typechecker.enable_typecheck
+        typechecker.set_typecheck(True)
+
+    def tearDown(self):
+        typechecker.configure('full')
+        typechecker.set_typecheck(self._enabled)
+
     def test__really_typecheck_isinstance(self):
         try:
             _really_typecheck('some string', str, 'some_string')
@@ -60,6 +69,90 @@ class TypecheckTests(TestCase):
         else:
             self.fail("Expected exception but that didn't happen.")
 
+    def test_toggle_at_runtime(self):
+        bad_return = ensure_typecheck(_bad_return)
+        typechecker.set_typecheck(False)
+        self.assertEqual(bad_return(1), '1')
+        typechecker.set_typecheck(True)
+        self.assertRaises(TypeCheckError, bad_return, 1)
+
+    def test_compiled_validators(self):
+        validator = compile_validator(typing.List[typing.Union[int, str]])
+        self.assertIs(validator, compile_validator(typing.List[typing.Union[int, str]]))
+        self.assertTrue(validator([1, 'a']))
+        self.assertFalse(validator([1, 2.0]))
+        self.assertFalse(validator((1,)))
+
+        validator = compile_validator(typing.Optional[typing.List[str]])
+        self.assertTrue(validator(None))
+        self.assertTrue(validator(['a']))
+        self.assertFalse(validator([None]))
+
+    def test_union_element_message(self):
+        ok, message = _really_typecheck(['a', 1.5], typing.List[typing.Union[int, str]], 'values')
+        self.assertFalse(ok)
+        self.assertIn('#1', message)
+
+    def test_sample_mode(self):
+        typechecker.configure('sample', rate=10)
+        bad_return = ensure_typecheck(_bad_return)
+        skipped = typechecker.stats.skipped
+        self.assertRaises(TypeCheckError, bad_return, 1)  # the first call is always checked
+        for i in range(9):
+            self.assertEqual(bad_return(i), str(i))
+        self.assertEqual(typechecker.stats.skipped - skipped, 9)
+        self.assertRaises(TypeCheckError, bad_return, 1)
+
+    def test_bounded_mode(self):
+        typechecker.configure('bounded', bound=4, bound_sample=2)
+        typechecker._random.seed(0)  # the sampled elements are random, a few unlucky runs never pick the bad one
+        validator = compile_validator(typing.List[int])
+        self.assertFalse(validator([1, 2, 'a'] + [0] * 100))
+        checked = sum(not validator([1] * 50 + ['a'] + [1] * 49) for _ in range(200))
+        self.assertGreater(checked, 0)
+        self.assertLess(checked, 200)
+
+        typechecker.configure('full')
+        self.assertFalse(validator([1] * 50 + ['a'] + [1] * 49))
+
+    def test_log_violations(self):
+        typechecker.configure('full', on_violation='log')
+        bad_return = ensure_typecheck(_bad_return)
+        violations = typechecker.stats.violations
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(bad_return(1), '1')
+        self.assertEqual(typechecker.stats.violations - violations, 1)
+
+    def test_generator_return(self):
+        # the annotation is checked against what the generator returns once it's done
+        def drive(generator):
+            try:
+                while True:
+                    next(generator)
+            except StopIteration as e:
+                return e.value
+
+        self.assertEqual(drive(ensure_typecheck(_generator)(1)), 1)
+        self.assertRaises(TypeCheckError, drive, ensure_typecheck(_generator)('1'))
+        self.assertEqual(drive(ensure_typecheck(_annotated_generator)(1)), 1)
+        self.assertRaises(TypeCheckError, drive, ensure_typecheck(_annotated_generator)('1'))
+        self.assertEqual(list(ensure_typecheck(_iterator)()), [1])
+
+    def test_settings(self):
+        typechecker.configure('bounded', bound=4, bound_sample=2, on_violation='log')
+        settings = typechecker.settings()
+        typechecker.configure('full')
+        typechecker.configure(**settings)
+        self.assertEqual((typechecker.mode, typechecker.list_bound, typechecker.list_sample,
+                          typechecker.raise_on_violation), ('bounded', 4, 2, False))
+        typechecker.set_typecheck(False)
+        self.assertEqual(typechecker.settings()['new_mode'], 'off')
+
+    def test_configure_off(self):
+        typechecker.configure('off')
+        self.assertFalse(typechecker.enable_typecheck)
+        self.assertRaises(ValueError, typechecker.configure, 'everything')
+
 
 def _correct_signature(a: int) -> int:
     return a
@@ -70,6 +163,20 @@ def _bad_return(a: int) -> int:
     return str(a)
 
 
+def _generator(a) -> int:
+    yield a
+    return a
+
+
+def _annotated_generator(a) -> typing.Generator[object, None, int]:
+    yield a
+    return a
+
+
+def _iterator() -> typing.Iterator[int]:
+    yield 1
+
+
 if __name__ == '__main__':
     import logging
 
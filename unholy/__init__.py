@@ -1,27 +1,64 @@
-from typing import Dict
+"""
+Importing the package only loads the constants. The names the submodules export (`_EXPORTS`) and the submodules
+themselves are loaded the first time they're used, so tools that import unholy without transpiling don't pay for the
+transpiler, the typechecker or `typing`.
+"""
+import importlib
 
 from .constants import *
 from .utils import *
-from .classes import *
-from .functions import *
-from .node_types import *
+
+# submodule -> the names it exports into the package
+_EXPORTS = {
+    'classes': ('Compilable', 'JSExpression', 'JSStatement', 'JSBlock', 'CompilationError'),
+    'functions': ('PARSE_RECURSION_LIMIT', 'translate_node', 'jsify_node', 'parse', 'jsify', 'transpile'),
+    'passes': ('RangeFor', 'optimize'),
+    'node_types': ('lookup_node_translator', 'translator_map'),
+    'cache': ('TranspileCache', 'CacheStats'),
+    'sourcemap': ('SourceMap', 'encode_vlq'),
+    'minify': ('rename_locals',),
+}
+_LAZY = {name: module for module, names in _EXPORTS.items() for name in names}
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        try:
+            return importlib.import_module(f'.{name}', __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f'{__name__}.{name}':
+                raise
+            raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
 
 
 def map_name(name: str) -> str:
     if name in PY_TO_JS_NAMES:
-        return PY_TO_JS_NAMES[name]
+        mapped = PY_TO_JS_NAMES[name]
+        from . import runtime
+        runtime.record(mapped)
+        return mapped
     else:
         return name
 
 
-PY_TO_JS_NAMES: Dict[str, str] = {
+PY_TO_JS_NAMES: 'dict[str, str]' = {
     'print': 'console.log',
     'asyncio.create_task': '',
     'asyncio.ensure_future': '',
 
     'format': 'unholy_js.py__format',
-    'iter': 'unholy_js.py__iter',
+    'iter': 'unholy_js.py__iterator',
+    'len': 'unholy_js.py__len',
     'next': 'unholy_js.py__next',
 
-    'range': 'unholy_js.py__range'
+    'range': 'unholy_js.py__range',
+    'sum': 'unholy_js.py__sum',
 }
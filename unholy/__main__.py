@@ -1,31 +1,243 @@
 import logging
+import os
+import sys
 
 import typechecker
 import unholy
+import unholy.bundle
+import unholy.parallel
+import unholy.profiling
+import unholy.project
+import unholy.server
+import unholy.watch
 
 if __name__ == '__main__':
     import argparse
 
     p = argparse.ArgumentParser()
-    p.add_argument('file', metavar='FILE', type=open)
-    p.add_argument('-o', '--output', metavar='FILE', type=str, default='-', dest='output')
+    p.add_argument('files', metavar='FILE', type=str, nargs='*',
+                   help='A Python file. Multiple files, directories or globs transpile a whole project into the '
+                        'output directory.')
+    p.add_argument('-o', '--output', metavar='FILE', type=str, default='-', dest='output',
+                   help='Output file, or the output directory for a project.')
+    p.add_argument('-j', '--jobs', metavar='N', type=int, default=None, dest='jobs',
+                   help='Number of worker processes used for a project or --parallel. Defaults to the number of CPUs.')
     p.add_argument('-q', '--quiet', '--stfu', default=0, action='count', dest='quiet')
     p.add_argument('--safe', action='store_true', dest='safe',
                    help='Enables debugging types returned by functions in the transpiler. Leads to slight slow down of '
-                        'the compilation but gives more detailed error information where possible.')
+                        'the compilation but gives more detailed error information where possible. Same as '
+                        '--typecheck full.')
+    p.add_argument('--typecheck', choices=typechecker.MODES, default=None, dest='typecheck',
+                   help='How much type checking is done inside the transpiler: sample checks one in N calls of every '
+                        'function, bounded checks only some elements of lists.')
+    p.add_argument('--typecheck-sample-rate', metavar='N', type=int, default=100, dest='typecheck_sample_rate',
+                   help='Check one in N calls of every function with --typecheck sample.')
+    p.add_argument('--typecheck-bound', metavar='K', type=int, default=16, dest='typecheck_bound',
+                   help='Check the first K elements of lists and a few random others with --typecheck bounded.')
+    p.add_argument('--typecheck-violations', choices=('raise', 'log'), default='raise', dest='typecheck_violations',
+                   help='Whether a failed type check stops the transpilation or is only logged.')
+    p.add_argument('--passes', metavar='PASS,...', type=str, default=None, dest='passes',
+                   help=f'Comma separated optimization passes to run, all of them by default. Available: '
+                        f'{", ".join(unholy.passes.PASSES)}.')
+    p.add_argument('--no-pass', metavar='PASS', choices=list(unholy.passes.PASSES), action='append', default=[],
+                   dest='disabled_passes', help='Disables an optimization pass, can be given more than once.')
+    p.add_argument('--cache-dir', metavar='DIR', type=str, default=None, dest='cache_dir',
+                   help='Reuse transpiled output stored in DIR when the source didn\'t change.')
+    p.add_argument('--cache-size', metavar='BYTES', type=int, default=unholy.cache.DEFAULT_CACHE_SIZE,
+                   dest='cache_size', help='Maximum size of the cache directory, least recently used entries are '
+                                           'removed first.')
+    p.add_argument('--watch', action='store_true', dest='watch',
+                   help='Keep running and transpile the input again whenever it changes. Only the statements that '
+                        'changed are translated again.')
+    p.add_argument('--watch-interval', metavar='SECONDS', type=float, default=0.1, dest='watch_interval',
+                   help='How often to check the input for changes.')
+    p.add_argument('--source-map', action='store_true', dest='source_map',
+                   help='Write a source map (version 3) next to every output file, as FILE.map, and reference it from '
+                        'the output.')
+    p.add_argument('--minify', action='store_true', dest='minify',
+                   help='Leave out indentation and line breaks and shorten the names of local variables.')
+    p.add_argument('--inline-runtime', action='store_true', dest='inline_runtime',
+                   help='Copy the runtime helpers a module uses into it instead of requiring not_python/unholy_js.js.')
+    p.add_argument('--esm', action='store_true', dest='esm',
+                   help='Output ES modules: top-level imports become import declarations and top-level definitions '
+                        'are exported. Imports inside functions are loaded when they run.')
+    p.add_argument('--bundle', action='store_true', dest='bundle',
+                   help='Transpile FILE and the local modules it imports into a single script.')
+    p.add_argument('--parallel', action='store_true', dest='parallel',
+                   help='Split the top-level statements of a single FILE between --jobs worker processes. Worth it '
+                        'for modules with many thousands of lines, the output is the same.')
+    p.add_argument('--serve', action='store_true', dest='serve',
+                   help='Keep running and answer transpile requests, JSON lines read from stdin, on stdout. The '
+                        'requests give the source and options, see unholy/server.py.')
+    p.add_argument('--socket', metavar='PATH', type=str, default=None, dest='socket',
+                   help='Answer requests on the connections to a Unix socket at PATH instead. Implies --serve.')
+    p.add_argument('--profile', action='store_true', dest='profile',
+                   help='Print how long every phase and every AST node type took to transpile.')
+    p.add_argument('--profile-json', metavar='FILE', type=str, default=None, dest='profile_json',
+                   help='Write the profile as JSON into FILE. Implies --profile.')
     program_arguments = p.parse_args()
-    typechecker.enable_typecheck = not program_arguments.safe
+    serving = program_arguments.serve or program_arguments.socket is not None
+    if serving and program_arguments.files:
+        p.error('--serve reads the code to transpile from its requests, not from FILE')
+    if serving and any((program_arguments.watch, program_arguments.bundle, program_arguments.profile,
+                        program_arguments.profile_json, program_arguments.source_map, program_arguments.minify,
+                        program_arguments.inline_runtime, program_arguments.esm, program_arguments.parallel)):
+        p.error('--serve takes the output options with every request')
+    if not serving and not program_arguments.files:
+        p.error('the following arguments are required: FILE')
+    passes = list(unholy.passes.PASSES)
+    if program_arguments.passes is not None:
+        passes = [i.strip() for i in program_arguments.passes.split(',') if i.strip()]
+    try:
+        unholy.passes.set_passes(i for i in passes if i not in program_arguments.disabled_passes)
+    except ValueError as e:
+        p.error(str(e))
+
+    typecheck_mode = program_arguments.typecheck or ('full' if program_arguments.safe else 'off')
+    typechecker.configure(typecheck_mode, rate=program_arguments.typecheck_sample_rate,
+                          bound=program_arguments.typecheck_bound,
+                          on_violation=program_arguments.typecheck_violations)
+
+    def report_typecheck():
+        if typecheck_mode != 'off' and program_arguments.quiet < 2:
+            print(f'Type checks: {typechecker.stats}', file=sys.stderr)
+
+    logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(funcName)s:%(lineno)s] %(message)s',
+                        level=(logging.INFO if program_arguments.quiet else logging.DEBUG))
+    if program_arguments.source_map and (program_arguments.watch or program_arguments.profile
+                                         or program_arguments.profile_json):
+        p.error('--source-map can\'t be combined with --watch or --profile')
+    if program_arguments.minify and (program_arguments.watch or program_arguments.profile
+                                     or program_arguments.profile_json):
+        p.error('--minify can\'t be combined with --watch or --profile')
+    if program_arguments.esm and (program_arguments.watch or program_arguments.profile
+                                  or program_arguments.profile_json or program_arguments.bundle):
+        p.error('--esm can\'t be combined with --watch, --profile or --bundle')
+    if program_arguments.bundle and (program_arguments.watch or program_arguments.profile
+                                     or program_arguments.profile_json or program_arguments.source_map):
+        p.error('--bundle can\'t be combined with --watch, --profile or --source-map')
+    if program_arguments.parallel and (program_arguments.watch or program_arguments.profile
+                                       or program_arguments.profile_json or program_arguments.source_map
+                                       or program_arguments.bundle):
+        p.error('--parallel can\'t be combined with --watch, --profile, --source-map or --bundle')
+    if program_arguments.parallel and (len(program_arguments.files) > 1
+                                       or unholy.project.is_project_input(program_arguments.files[0])):
+        p.error('--parallel takes a single file, the files of a project are already spread across --jobs')
+    if program_arguments.bundle and (len(program_arguments.files) > 1 or os.path.isdir(program_arguments.files[0])):
+        p.error('--bundle takes a single entry file')
+    unholy.minify.enabled = program_arguments.minify
+    unholy.runtime.inline = program_arguments.inline_runtime
+    unholy.esm.enabled = program_arguments.esm
+
+    if serving:
+        unholy.server.serve(unholy.server.Server(
+            program_arguments.jobs, cache_dir=program_arguments.cache_dir, cache_size=program_arguments.cache_size,
+            log_level=logging.getLogger().level
+        ), program_arguments.socket)
+        report_typecheck()
+    elif program_arguments.watch:
+        try:
+            unholy.watch.watch(program_arguments.files, program_arguments.output,
+                               interval=program_arguments.watch_interval)
+        except KeyboardInterrupt:
+            pass
+    elif program_arguments.bundle:
+        cache = None
+        if program_arguments.cache_dir:
+            cache = unholy.TranspileCache(program_arguments.cache_dir, program_arguments.cache_size)
+        bundled = unholy.bundle.Bundle(program_arguments.files[0], cache=cache)
+        result = bundled.render()
+        if program_arguments.output == '-':
+            print(result)
+        else:
+            with open(program_arguments.output, 'w', encoding='utf-8') as f:
+                f.write(unholy.minify.header())
+                f.write(result)
+            if program_arguments.quiet < 2:
+                print(f'Bundled {len(bundled.modules)} modules into {program_arguments.output}')
+        if cache is not None and program_arguments.quiet < 2:
+            print(f'Cache: {cache.stats}', file=sys.stderr)
+        report_typecheck()
+    elif len(program_arguments.files) > 1 or unholy.project.is_project_input(program_arguments.files[0]):
+        if program_arguments.output == '-':
+            p.error('an output directory (-o) is required when transpiling a project')
+
+        def report(file_result):
+            if not file_result.ok:
+                print(f'{file_result.source}: {file_result.error}', file=sys.stderr)
+            elif program_arguments.quiet < 1:
+                print(f'Written result to {file_result.output}')
+
+        summary = unholy.project.transpile_project(
+            program_arguments.files, program_arguments.output, jobs=program_arguments.jobs,
+            cache_dir=program_arguments.cache_dir, cache_size=program_arguments.cache_size,
+            log_level=logging.getLogger().level, on_result=report, source_maps=program_arguments.source_map
+        )
+        if program_arguments.quiet < 2:
+            print(summary)
+        report_typecheck()
+        sys.exit(1 if summary.failures else 0)
+    else:
+        with open(program_arguments.files[0]) as source_file:
+            code = source_file.read()
+        source_map = None
+        if program_arguments.source_map:
+            if program_arguments.output == '-':
+                p.error('--source-map needs an output file (-o)')
+            source_map = unholy.sourcemap.for_output(program_arguments.files[0], program_arguments.output, code)
+            mapped_result = unholy.transpile(code, source_map=source_map)
+
+            def write_result(f):
+                f.write(mapped_result)
+        elif program_arguments.profile or program_arguments.profile_json:
+            profiler = unholy.profiling.Profiler()
+            profiled_result = profiler.transpile(code)
+            if program_arguments.profile:
+                print(profiler.report(), file=sys.stderr)
+            if program_arguments.profile_json:
+                with open(program_arguments.profile_json, 'w') as f:
+                    f.write(profiler.to_json())
+
+            def write_result(f):
+                f.write(profiled_result)
+        elif program_arguments.parallel:
+            cache = None
+            if program_arguments.cache_dir:
+                cache = unholy.TranspileCache(program_arguments.cache_dir, program_arguments.cache_size)
+            parallel_result = unholy.parallel.transpile(code, program_arguments.files[0], jobs=program_arguments.jobs,
+                                                        cache=cache, log_level=logging.getLogger().level)
+            if cache is not None and program_arguments.quiet < 2:
+                print(f'Cache: {cache.stats}', file=sys.stderr)
+
+            def write_result(f):
+                f.write(parallel_result)
+        elif program_arguments.cache_dir:
+            cache = unholy.TranspileCache(program_arguments.cache_dir, program_arguments.cache_size)
+            cached_result = unholy.transpile(code, cache=cache)
+            if program_arguments.quiet < 2:
+                print(f'Cache: {cache.stats}', file=sys.stderr)
+
+            def write_result(f):
+                f.write(cached_result)
+        else:
+            result = unholy.jsify(code)
+
+            def write_result(f):
+                result[0].compile_to(f, [], minify=program_arguments.minify)
 
-    if program_arguments.file:
-        logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(funcName)s:%(lineno)s] %(message)s',
-                            level=(logging.INFO if program_arguments.quiet else logging.DEBUG))
-        result = unholy.jsify(''.join(program_arguments.file.readlines()))
         if program_arguments.output == '-':
-            print(result[0].compile([]))
+            write_result(sys.stdout)
+            print()
         else:
             with open(program_arguments.output, 'w') as f:
-                f.write(unholy.START_COMMENT)
-                f.write(result[0].compile([]))
+                f.write(unholy.minify.header())
+                write_result(f)
+                if source_map is not None:
+                    f.write(unholy.sourcemap.url_comment(program_arguments.output))
+            if source_map is not None:
+                with open(program_arguments.output + '.map', 'w') as f:
+                    f.write(source_map.to_json())
 
             if program_arguments.quiet < 2:
                 print(f'Written result to {program_arguments.output}')
+        report_typecheck()
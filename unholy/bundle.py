@@ -0,0 +1,182 @@
+"""
+Bundles a program: follows the imports of an entry module to the local modules they refer to and puts the translation
+of every module reached into one file, each of them exactly once.
+
+Every module is wrapped in a function which gets a `require` of its own. It maps what the module's imports were
+translated to (see `module_specifier`) onto the bundled modules, anything else, like the runtime or modules that
+weren't found, is passed on to Node's `require`. A module runs the first time it's required, later imports share its
+exports, the same as with Node's module cache but without resolving files at startup. Like in Python, `from package
+import name` loads the submodule `name` if there is one and it isn't set in the package yet.
+"""
+import ast
+import json
+import os
+import typing
+
+import unholy
+from .node_types.imports import module_specifier
+
+_BINDINGS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class BundledModule:
+    __slots__ = ('path', 'code', 'links', 'submodules', 'exports')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.code = ''
+        # specifier -> index of the bundled module
+        self.links: typing.Dict[str, int] = {}
+        # specifier -> names imported from the package that are modules -> their index
+        self.submodules: typing.Dict[str, typing.Dict[str, int]] = {}
+        self.exports: typing.List[str] = []
+
+
+def resolve(name: str, directory: str) -> typing.Optional[str]:
+    """
+    Finds the file of the module `name` (dotted) relative to `directory`, None if it isn't there.
+    """
+    base = os.path.join(directory, *name.split('.'))
+    for candidate in (base + '.py', os.path.join(base, '__init__.py')):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _imports(tree: ast.Module) -> typing.Iterator[typing.Tuple[str, str, int, typing.List[str]]]:
+    """
+    The modules imported anywhere in `tree`, as (specifier, dotted name, level of relative imports, names imported
+    from it).
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield module_specifier(alias.name), alias.name, 0, []
+        elif isinstance(node, ast.ImportFrom):
+            if node.module is None:
+                for alias in node.names:
+                    yield module_specifier(alias.name), alias.name, node.level, []
+            else:
+                yield module_specifier(node.module), node.module, node.level, [i.name for i in node.names]
+
+
+def _exports(tree: ast.Module) -> typing.List[str]:
+    """
+    The names every run of the module binds at module level, which other modules can import.
+    """
+    names = {}
+    for node in tree.body:
+        if isinstance(node, _BINDINGS):
+            names[node.name] = None
+        elif isinstance(node, ast.Assign):
+            names.update((i.id, None) for i in node.targets if isinstance(i, ast.Name))
+        elif isinstance(node, ast.AnnAssign) and node.value is not None and isinstance(node.target, ast.Name):
+            names[node.target.id] = None
+        elif isinstance(node, ast.ImportFrom):
+            names.update((i.asname or i.name, None) for i in node.names)
+        elif isinstance(node, ast.Import):
+            names.update((i.asname or i.name, None) for i in node.names if '.' not in (i.asname or i.name))
+    return list(names)
+
+
+class Bundle:
+    """
+    The modules reachable from `entry`. Absolute imports are looked up in `root`, the directory of `entry` by
+    default, like Python does with the directory of the script it runs.
+    """
+
+    def __init__(self, entry: str, root: typing.Optional[str] = None,
+                 cache: typing.Optional['unholy.TranspileCache'] = None):
+        self.entry = entry
+        self.root = root if root is not None else os.path.dirname(os.path.abspath(entry))
+        self.cache = cache
+        self.modules: typing.List[BundledModule] = []
+        self._indices: typing.Dict[str, int] = {}
+        self._queue: typing.List[int] = []
+        self._add(entry)
+        while self._queue:
+            self._translate(self.modules[self._queue.pop(0)])
+
+    def _add(self, path: str) -> int:
+        path = os.path.realpath(path)
+        index = self._indices.get(path)
+        if index is None:
+            index = self._indices[path] = len(self.modules)
+            self.modules.append(BundledModule(path))
+            self._queue.append(index)
+        return index
+
+    def _translate(self, module: BundledModule):
+        with open(module.path, encoding='utf-8') as f:
+            code = f.read()
+        tree = unholy.parse(code, module.path)
+        for specifier, name, level, names in _imports(tree):
+            if level:
+                directory = os.path.dirname(module.path)
+                for _ in range(level - 1):
+                    directory = os.path.dirname(directory)
+            else:
+                directory = self.root
+            path = resolve(name, directory)
+            if path is None:
+                continue
+            module.links[specifier] = self._add(path)
+            if os.path.basename(path) == '__init__.py':
+                for i in names:
+                    submodule = resolve(i, os.path.dirname(path))
+                    if submodule is not None:
+                        module.submodules.setdefault(specifier, {})[i] = self._add(submodule)
+        module.exports = _exports(tree)
+        module.code = unholy.transpile(code, module.path, cache=self.cache)
+
+    def render(self) -> str:
+        """
+        The bundle, running the entry module when it's loaded.
+        """
+        parts = ['const py__bundle = (() => {\nconst modules = [\n']
+        for module in self.modules:
+            parts.append(f'// {os.path.relpath(module.path, self.root)}\n(function (require, module, exports) {{\n')
+            parts.append(module.code)
+            if module.exports:
+                parts.append(f';\nObject.assign(module.exports, {{{", ".join(module.exports)}}});')
+            parts.append('\n}),\n')
+        parts.append('];\n')
+        parts.append(f'const links = {json.dumps([i.links for i in self.modules])};\n')
+        parts.append(f'const submodules = {json.dumps([i.submodules for i in self.modules])};\n')
+        parts.append('const loaded = [];\n'
+                     'const load = (index) => {\n'
+                     '    if (loaded[index] === undefined) {\n'
+                     '        const module = loaded[index] = {exports: {}};\n'
+                     '        const require_ = (specifier) => {\n'
+                     '            const linked = links[index][specifier];\n'
+                     '            if (linked === undefined) {\n'
+                     '                return require(specifier);\n'
+                     '            }\n'
+                     '            const exports = load(linked);\n'
+                     '            const children = submodules[index][specifier];\n'
+                     '            for (const name in children) {\n'
+                     '                if (!(name in exports)) {\n'
+                     '                    exports[name] = load(children[name]);\n'
+                     '                }\n'
+                     '            }\n'
+                     '            return exports;\n'
+                     '        };\n'
+                     '        modules[index](require_, module, module.exports);\n'
+                     '    }\n'
+                     '    return loaded[index].exports;\n'
+                     '};\n'
+                     'return load;\n'
+                     '})();\n'
+                     'py__bundle(0);\n')
+        return ''.join(parts)
+
+
+def bundle(entry: str, root: typing.Optional[str] = None,
+           cache: typing.Optional['unholy.TranspileCache'] = None) -> str:
+    """
+    Transpiles `entry` and every local module it imports, directly or not, into a single script.
+    """
+    return Bundle(entry, root, cache).render()
+
+
+__all__ = ['bundle', 'Bundle']
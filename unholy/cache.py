@@ -0,0 +1,163 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Optional, Dict
+
+import unholy
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+SOURCE_DIR = os.path.dirname(__file__)
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
+
+    def __str__(self):
+        return (f'{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), {self.stores} stored, '
+                f'{self.evictions} evicted')
+
+
+@functools.lru_cache(maxsize=None)
+def _sources_fingerprint() -> str:
+    """
+    A hash of the transpiler's sources, the output changes with them even when the version doesn't.
+    """
+    h = hashlib.sha256()
+    for directory, directories, files in os.walk(SOURCE_DIR):
+        directories[:] = sorted(i for i in directories if i not in ('tests', '__pycache__'))
+        for name in sorted(i for i in files if i.endswith('.py')):
+            path = os.path.join(directory, name)
+            h.update(os.path.relpath(path, SOURCE_DIR).encode())
+            h.update(b'\0')
+            with open(path, 'rb') as f:
+                h.update(f.read())
+            h.update(b'\0')
+    return h.hexdigest()
+
+
+class TranspileCache:
+    """
+    Content-addressed on-disk cache of transpiled modules.
+
+    Entries are keyed by a hash of the source text, the transpiler's own sources and the name mapping, so changing
+    any of them makes old entries unreachable. Writes go through a temporary file and an atomic rename, so concurrent
+    builds sharing a directory never see partial entries. When the directory grows over `max_size` bytes the least
+    recently used entries are removed. The size is only measured again once the entries stored since the last time
+    could have taken it over `max_size`, entries other processes store are noticed then.
+    """
+    SUFFIX = '.js'
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.stats = CacheStats()
+        # the size of the directory when it was last measured plus what was stored since, None until it's measured
+        self._size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, code: str) -> str:
+        h = hashlib.sha256()
+        h.update(_sources_fingerprint().encode())
+        h.update(b'\0')
+        h.update(json.dumps(unholy.PY_TO_JS_NAMES, sort_keys=True).encode())
+        h.update(b'\0')
+        h.update(','.join(unholy.passes.enabled_passes).encode())
+        h.update(b'\0')
+        h.update(b'minify' if unholy.minify.enabled else b'')
+        h.update(b'\0')
+        h.update(unholy.runtime.fingerprint().encode() if unholy.runtime.inline else b'')
+        h.update(b'\0')
+        h.update(b'esm' if unholy.esm.enabled else b'')
+        h.update(b'\0')
+        h.update(code.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, code: str, key: Optional[str] = None) -> Optional[str]:
+        """
+        The cached translation of `code`, or None. `key` is `self.key(code)` if the caller has it already.
+        """
+        path = self._path(key or self.key(code))
+        try:
+            with open(path, encoding='utf-8') as f:
+                result = f.read()
+        except FileNotFoundError:  # not there or evicted by someone else in the meantime
+            self.stats.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, PermissionError):  # evicted since, or a shared cache this process may only read
+            pass
+        self.stats.hits += 1
+        return result
+
+    def put(self, code: str, result: str, key: Optional[str] = None):
+        data = result.encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key or self.key(code)))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.stats.stores += 1
+        if self._size is not None:
+            self._size += len(data)
+        if self._size is None or self._size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(self.SUFFIX):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        self._size = total
+        if total <= self.max_size:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            logging.debug('Evicted %s from the transpilation cache', path)
+            total -= size
+            self.stats.evictions += 1
+        self._size = total
+
+
+__all__ = ['TranspileCache', 'CacheStats']
@@ -1,109 +1,224 @@
 import abc
-from typing import List, Union, Optional
+import io
+from typing import List, Union, Optional, TextIO
 
+import typechecker
 from typechecker import typecheck
-
-INDENT = '    '
+from . import interning
+from .layout import INDENT, Layout
 
 
 class Compilable(abc.ABC):
-    @abc.abstractmethod
-    def compile(self, lines_ref: List[str], indent: int = 0, indent_inc: int = 1) -> str:
+    __slots__ = ()
+
+    def compile(self, lines_ref: Optional[List[str]], indent: int = 0, indent_inc: int = 1,
+                source_map=None, minify: bool = False) -> str:
         """
         Compiles and indents the Compilable.
         :param indent: How much to indent the output
         :param indent_inc: How indent should change in inner blocks.
+        :param source_map: An `unholy.SourceMap` to record the origins of the output in.
+        :param minify: Leave out indentation and line breaks.
         :return:
         """
+        output = io.StringIO()
+        self.compile_to(output, lines_ref, indent, indent_inc, source_map, minify)
+        return output.getvalue()
+
+    def compile_to(self, writer: TextIO, lines_ref: Optional[List[str]], indent: int = 0,
+                   indent_inc: int = 1, source_map=None, minify: bool = False) -> None:
+        """
+        Compiles the Compilable, pushing the output into `writer` as it is produced instead of returning it.
+        :param writer: Any object with a `write(str)` method, e.g. a file or an `io.StringIO`
+        :param indent: How much to indent the output
+        :param indent_inc: How indent should change in inner blocks.
+        :param source_map: An `unholy.SourceMap` to record the origins of the output in.
+        :param minify: Leave out indentation and line breaks.
+        """
+        if typechecker.enable_typecheck:  # don't build the type dict when checking is off
+            typecheck({
+                'lines_ref': Optional[List[str]],
+                'indent': int,
+                'indent_inc': int
+            }, lines_ref=lines_ref, indent=indent, indent_inc=indent_inc)
+
+        layout = Layout(writer, lines_ref, source_map=source_map, minify=minify)
+        self.emit_statement(layout, indent, indent_inc)
+        layout.close()
+
+    @abc.abstractmethod
+    def emit(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        """
+        Emits the Compilable into the current line of `layout`.
+        :param indent: Depth of the line being emitted, inner blocks go deeper
+        :param indent_inc: How indent should change in inner blocks.
+        """
         pass
 
-    def _indent_line(self, line: str, count: int) -> str:
-        return INDENT * count + line
+    def emit_statement(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        """
+        Emits the Compilable as an element of a block, on its own line.
+        """
+        layout.new_line(indent)
+        self.emit(layout, indent, indent_inc)
+
+
+def _coalesce(others: list) -> list:
+    """
+    Merges adjacent strings and unwraps plain expressions that hold only one fragment.
+    """
+    output = []
+    text = []
+    for i in others:
+        if type(i) is JSExpression and len(i.others) == 1 and i.origin is None:
+            i = i.others[0]
+        if isinstance(i, str):
+            text.append(i)
+        elif isinstance(i, int):
+            text.append(str(i))
+        else:
+            if text:
+                output.append(text[0] if len(text) == 1 else interning.text(''.join(text)))
+                text = []
+            output.append(i)
+    if text:
+        output.append(text[0] if len(text) == 1 else interning.text(''.join(text)))
+
+    if len(output) == 1 and type(output[0]) is JSExpression and output[0].origin is None:
+        return output[0].others
+    return output
+
 
-    def _indent_code(self, lines: str, count: int) -> str:
-        out = []
-        for i in lines.split('\n'):
-            out.append(self._indent_line(i, count))
-        return '\n'.join(out)
+# subscripting typing generics isn't free, the annotations checked on every construction are built once
+_PART = Union[Compilable, str]
+_PARTS = List[_PART]
 
 
 class JSExpression(Compilable):
-    def __init__(self, others: List[Union['JSExpression', str]]):
-        typecheck({
-            'others': List[Union[JSExpression, str]]
-        }, others=others)
-        self.others = others
-
-    def compile(self, lines_ref: List[str], indent: int = 0, indent_inc: int = 1) -> str:
-        typecheck({
-            'lines_ref': List[str],
-            'indent': int,
-            'indent_inc': int
-        }, lines_ref=lines_ref, indent=indent, indent_inc=indent_inc)
-
-        output = ''
-        for i in self.others:
-            if isinstance(i, Compilable):
-                output += i.compile(lines_ref, indent, indent_inc)
-            elif isinstance(i, str):
-                output += i
-            elif isinstance(i, int):
-                output += str(i)
+    # origin: (line, column) of the Python code this was translated from, only set while building a source map
+    __slots__ = ('others', 'origin')
+
+    def __init__(self, others: List[Union[Compilable, str]]):
+        if typechecker.enable_typecheck:
+            typecheck({
+                'others': _PARTS
+            }, others=others)
+        self.origin = None
+        self.others = _coalesce(others)
+
+    def emit(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        if layout.source_map is not None:
+            self._emit_mapped(layout, indent, indent_inc)
+            return
+        # Plain nested expressions are walked with an explicit stack, long chains like `a + b + c + ...` nest as deep
+        # as the input does.
+        stack = [iter(self.others)]
+        while stack:
+            for i in stack[-1]:
+                if isinstance(i, str):
+                    layout.write(i)
+                elif type(i) is JSExpression:
+                    stack.append(iter(i.others))
+                    break
+                elif isinstance(i, Compilable):
+                    i.emit(layout, indent, indent_inc)
+                elif isinstance(i, int):
+                    layout.write(str(i))
+                else:
+                    raise RuntimeError(f'{self}: unable to compile {i!r} as a part of a JS expression')
             else:
-                raise RuntimeError(f'{self}: unable to compile {i!r} as a part of a JS expression')
-        return output
+                stack.pop()
+
+    def _emit_mapped(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        # Same as emit, marking the origin of every piece of text. Text of an expression without an origin belongs to
+        # the closest enclosing one that has it. `marked` saves calls to the layout while the origin stays the same.
+        stack = [(iter(self.others), self.origin)]
+        marked = None
+        while stack:
+            parts, origin = stack[-1]
+            for i in parts:
+                if type(i) is JSExpression:
+                    child_origin = i.origin if i.origin is not None else origin
+                    if len(i.others) != 1 or not isinstance(i.others[0], str):
+                        stack.append((iter(i.others), child_origin))
+                        break
+                    if child_origin is not marked:  # a leaf, e.g. a name or a constant
+                        layout.mark(child_origin)
+                        marked = child_origin
+                    layout.write(i.others[0])
+                elif isinstance(i, str):
+                    if origin is not marked:
+                        layout.mark(origin)
+                        marked = origin
+                    layout.write(i)
+                elif isinstance(i, Compilable):
+                    i.emit(layout, indent, indent_inc)
+                    marked = None
+                elif isinstance(i, int):
+                    layout.write(str(i))
+                else:
+                    raise RuntimeError(f'{self}: unable to compile {i!r} as a part of a JS expression')
+            else:
+                stack.pop()
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.others!r})'
 
 
 class JSStatement(JSExpression, Compilable):
+    __slots__ = ('has_semicolon', 'force_concat')
+
     def __init__(self, expr: Union[Compilable, str], others: Optional[List[Union[Compilable, str]]] = None,
                  has_semicolon=True, force_concat=False):
-        typecheck({
-            'expr': Union[JSExpression, str],
-            'others': Optional[List[Union[JSExpression, str]]],
-            'has_semicolon': bool,
-            'force_concat': bool,
-        }, others=others, expr=expr, has_semicolon=has_semicolon, force_concat=force_concat)
-
-        if others:
-            o = others.copy()
-        else:
-            o = []
-        o.insert(0, expr)
-        super().__init__(o or [expr])
+        if typechecker.enable_typecheck:
+            typecheck({
+                'expr': _PART,
+                'others': Optional[_PARTS],
+                'has_semicolon': bool,
+                'force_concat': bool,
+            }, others=others, expr=expr, has_semicolon=has_semicolon, force_concat=force_concat)
+
+        super().__init__([expr, *others] if others else [expr])
         self.has_semicolon = has_semicolon
         self.force_concat = force_concat
 
-    def compile(self, lines_ref: List[str], indent: int = 0, indent_inc: int = 1):
-        o = super().compile(lines_ref, indent, indent_inc)
-        return self._indent_code((o.rstrip(';') + ';') if self.has_semicolon else o, count=indent)
+    def emit(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        super().emit(layout, indent, indent_inc)
+        if self.has_semicolon:
+            layout.terminate()
+
+    def emit_statement(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        if self.force_concat and layout.in_line():
+            self.emit(layout, indent, indent_inc)
+        else:
+            super().emit_statement(layout, indent, indent_inc)
 
 
 class JSBlock(Compilable):
+    __slots__ = ('statements', 'has_braces', 'origin')
+
     def __init__(self, statements, has_braces=True):
         self.statements = statements
         self.has_braces = has_braces
+        self.origin = None
 
-    def compile(self, lines_ref: List[str], indent: int = -1, indent_inc: int = 1):
-        output = []
-        if self.has_braces:
-            if lines_ref and not lines_ref[-1].endswith(';'):
-                lines_ref[-1] += ' {'
-            else:
-                output.append('{')
+    def compile(self, lines_ref: Optional[List[str]], indent: int = -1, indent_inc: int = 1, source_map=None,
+                minify: bool = False):
+        return super().compile(lines_ref, indent, indent_inc, source_map, minify)
 
-        for i, elem in enumerate(self.statements):
-            s = elem.compile(output, indent + indent_inc, indent_inc)
-            if isinstance(elem, JSStatement) and elem.force_concat:
-                output[-1] += s
-            else:
-                output.append(s)
+    def compile_to(self, writer: TextIO, lines_ref: Optional[List[str]], indent: int = -1,
+                   indent_inc: int = 1, source_map=None, minify: bool = False) -> None:
+        super().compile_to(writer, lines_ref, indent, indent_inc, source_map, minify)
+
+    def emit(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        layout.open_block(indent, self.has_braces)
+        for elem in self.statements:
+            elem.emit_statement(layout, indent + indent_inc, indent_inc)
+        layout.close_block(indent, self.has_braces)
 
-        if self.has_braces:
-            output.append('}')
-        return self._indent_code('\n'.join(output), indent)
+    def emit_statement(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        # blocks lay out their own lines, the opening brace might go onto the current one
+        self.emit(layout, indent, indent_inc)
 
     def __repr__(self):
         return f'<JSBlock: {repr(self.statements[0]) if self.statements else "no statements"}>'
@@ -113,6 +228,9 @@ class CompilationError(NotImplementedError):
     pass
 
 
+__all__ = ['Compilable', 'JSExpression', 'JSStatement', 'JSBlock', 'CompilationError']
+
+
 if __name__ == '__main__':
     # test = JSBlock([
     #     JSStatement('(iterable) =>', has_semicolon=False),
@@ -4,3 +4,5 @@ START_COMMENT = '''/************************************************************
  * Your changes might get overwritten.                                        *
  ******************************************************************************/
 '''
+
+VERSION = '0.1.0'
@@ -0,0 +1,160 @@
+"""
+ES module output (`--esm`).
+
+Imports at the top of a module become static `import` declarations, which bundlers can tree-shake, and the module's
+top-level definitions are exported. Imports anywhere else are loaded only when they run: with `await import()` in
+async functions, through `createRequire` everywhere else, Node caches the module after the first call. Requiring an
+ES module needs Node 20.19 or 22.12 and fails for modules using top-level `await`, so the output never uses it: a
+module loaded lazily at module level is required too.
+
+ES modules are strict, assigning a variable that wasn't declared is an error. The variables plain output assigns
+without declaring them are declared at the start of the module and of every function.
+
+`prepare` records all of this on the AST, the translators check for it, so nothing changes unless it ran.
+"""
+import ast
+import typing
+
+# set from the command line, part of the cache key
+enabled = False
+
+STATIC = 'static'
+AWAIT = 'await'
+REQUIRE = 'require'
+REQUIRE_NAME = 'py__require'
+REQUIRE_SETUP = ['import { createRequire } from "module"', f'const {REQUIRE_NAME} = createRequire(import.meta.url)']
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+_SKIPPED = (ast.Lambda, ast.ClassDef, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_ASSIGNMENTS = (ast.Assign, ast.AnnAssign, ast.AugAssign)
+
+
+def imported_names(node: typing.Union[ast.Import, ast.ImportFrom]) -> typing.List[str]:
+    return [i.asname or i.name for i in node.names]
+
+
+def _assigned(node) -> typing.Iterator[str]:
+    """
+    The variables an assignment binds, the names in subscripts and attributes it assigns are only read.
+    """
+    stack = list(reversed(node.targets)) if isinstance(node, ast.Assign) else [node.target]
+    while stack:
+        target = stack.pop()
+        if isinstance(target, ast.Name):
+            yield target.id
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            stack.extend(reversed(target.elts))
+        elif isinstance(target, ast.Starred):
+            stack.append(target.value)
+
+
+class _Scope:
+    __slots__ = ('assigned', 'defined', 'imported', 'declared_global', 'declared_nonlocal', 'functions')
+
+    def __init__(self):
+        self.assigned = {}
+        self.defined = {}
+        self.imported = {}
+        self.declared_global = {}
+        self.declared_nonlocal = {}
+        self.functions = []
+
+
+def _walk(body: typing.List[ast.stmt], loading: str, top_level: bool) -> _Scope:
+    """
+    Collects what one module or function binds, marking its imports with how they're loaded.
+    """
+    scope = _Scope()
+    stack = [(i, top_level) for i in reversed(body)]
+    while stack:
+        node, direct = stack.pop()
+        if isinstance(node, _FUNCTIONS):
+            scope.defined[node.name] = None
+            scope.functions.append(node)
+            stack.extend((i, False) for i in reversed([*node.decorator_list, *node.args.defaults,
+                                                       *filter(None, node.args.kw_defaults)]))
+            continue
+        if isinstance(node, _SKIPPED):
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            node.esm_loading = STATIC if direct else loading
+            scope.imported.update(dict.fromkeys(imported_names(node), node.esm_loading))
+        elif isinstance(node, _ASSIGNMENTS):
+            scope.assigned.update(dict.fromkeys(_assigned(node)))
+        elif isinstance(node, ast.Global):
+            scope.declared_global.update(dict.fromkeys(node.names))
+        elif isinstance(node, ast.Nonlocal):
+            scope.declared_nonlocal.update(dict.fromkeys(node.names))
+        stack.extend((i, False) for i in reversed(list(ast.iter_child_nodes(node))))
+    return scope
+
+
+class ModuleSummary:
+    """
+    What `prepare` needs to know about the top level of a module, the parts of a module can be summarized on their
+    own and `combine`d.
+    """
+    __slots__ = ('assigned', 'defined', 'imported', 'declared_global', 'uses_require')
+
+    def __init__(self, assigned: dict, defined: dict, imported: dict, declared_global: dict, uses_require: bool):
+        self.assigned = assigned
+        self.defined = defined
+        self.imported = imported
+        # variables functions declare global
+        self.declared_global = declared_global
+        self.uses_require = uses_require
+
+
+def summarize(body: typing.List[ast.stmt]) -> ModuleSummary:
+    """
+    Records on the statements `body` how their imports are loaded and what their functions declare, see `prepare`.
+    """
+    module = _walk(body, REQUIRE, True)
+    globals_ = {}
+    uses_require = REQUIRE in module.imported.values()
+    stack = list(reversed(module.functions))
+    while stack:
+        function = stack.pop()
+        scope = _walk(function.body, AWAIT if isinstance(function, ast.AsyncFunctionDef) else REQUIRE, False)
+        args = function.args
+        parameters = {i.arg for i in [*args.posonlyargs, *args.args, *args.kwonlyargs, args.vararg, args.kwarg] if i}
+        excluded = parameters | set(scope.defined) | set(scope.declared_global) | set(scope.declared_nonlocal)
+        function.esm_declarations = [i for i in {**scope.assigned, **scope.imported} if i not in excluded]
+        globals_.update(scope.declared_global)
+        uses_require = uses_require or REQUIRE in scope.imported.values()
+        stack.extend(reversed(scope.functions))
+    return ModuleSummary(module.assigned, module.defined, module.imported, globals_, uses_require)
+
+
+def combine(summaries: typing.Iterable[ModuleSummary]) -> ModuleSummary:
+    """
+    The summary of a module from the summaries of its consecutive parts.
+    """
+    result = ModuleSummary({}, {}, {}, {}, False)
+    for i in summaries:
+        result.assigned.update(i.assigned)
+        result.defined.update(i.defined)
+        result.imported.update(i.imported)
+        result.declared_global.update(i.declared_global)
+        result.uses_require = result.uses_require or i.uses_require
+    return result
+
+
+def finish(tree: ast.Module, module: ModuleSummary) -> ast.Module:
+    """
+    Records on `tree` what it declares and exports and if it needs `py__require`, from the summary of its body.
+    """
+    lazy = [name for name, loading in module.imported.items() if loading != STATIC]
+    tree.esm_declarations = [i for i in {**module.assigned, **dict.fromkeys(lazy), **module.declared_global}
+                             if i not in module.defined and module.imported.get(i) != STATIC]
+    tree.esm_exports = list({**module.defined, **module.assigned, **module.declared_global})
+    tree.esm_require = module.uses_require
+    return tree
+
+
+def prepare(tree: ast.Module) -> ast.Module:
+    """
+    Records on `tree` how its imports are loaded (`esm_loading`), which variables the module and its functions
+    declare (`esm_declarations`), what the module exports (`esm_exports`) and if it needs `py__require`.
+    """
+    return finish(tree, summarize(tree.body))
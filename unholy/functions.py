@@ -1,17 +1,98 @@
 import ast
+import io
 import logging
+import sys
+import types
+import typing
 from typing import List
 
 from typechecker import ensure_typecheck
 import unholy
 
-@ensure_typecheck
-def jsify_node(node) -> List[unholy.Compilable]:
-    logging.debug(f'Process node {node}')
+# CPython builds the AST recursively, long chains like `a + b + c + ...` need more than the default limit
+PARSE_RECURSION_LIMIT = 50000
+
+# set by unholy.profiling.Profiler while it's installed
+_profiler = None
+# set while translating for a source map, translations are tagged with the position of their node
+_track_origins = False
+# the lines of the code translated for a source map
+_source_lines: List[str] = []
+
+
+def translate_node(node):
+    """
+    Calls the translator of `node`. This returns either the translation or, for generator translators, a generator
+    that needs to be driven by `jsify_node`.
+    """
+    logging.debug('Process node %s', node)
     try:
-        return unholy.lookup_node_translator(node)(node)
+        translator = unholy.lookup_node_translator(node)
     except KeyError as e:
         raise unholy.CompilationError(f'Unknown node type: {type(node)!r}.') from e
+    if _track_origins and hasattr(node, 'lineno'):
+        result = translator(node)
+        if isinstance(result, types.GeneratorType):
+            return _tag_origins(node, result)
+        _set_origin(node, result)
+        return result
+    return translator(node)
+
+
+def _character_column(line: int, offset: int) -> int:
+    """
+    Converts the UTF-8 byte offset of a node into a column counted in characters, like source maps count them.
+    """
+    text = _source_lines[line - 1]
+    if text.isascii():
+        return offset
+    return len(text.encode('utf-8')[:offset].decode('utf-8', 'replace'))
+
+
+def _set_origin(node, result):
+    origin = (node.lineno, _character_column(node.lineno, node.col_offset))
+    for i in result:
+        if isinstance(i, (unholy.JSExpression, unholy.JSBlock)) and i.origin is None:
+            i.origin = origin
+
+
+def _tag_origins(node, translation):
+    result = yield from translation
+    _set_origin(node, result)
+    return result
+
+
+@ensure_typecheck
+def jsify_node(node) -> List[unholy.Compilable]:
+    """
+    Translates `node` and everything below it.
+
+    Translators can be generator functions: instead of calling jsify_node on their children, they yield them and get
+    the translation sent back. Suspended translators are kept on an explicit stack, so the depth of the input isn't
+    limited by Python's recursion limit.
+    """
+    if _profiler is not None:
+        return _profiler.drive(node)
+
+    stack = []
+    value = translate_node(node)
+    while True:
+        if isinstance(value, types.GeneratorType):
+            stack.append(value)
+            value = None
+        elif not stack:
+            return value
+
+        while True:
+            try:
+                child = stack[-1].send(value)
+                break
+            except StopIteration as e:
+                stack.pop()
+                if not stack:
+                    return e.value
+                value = e.value
+        value = translate_node(child)
 
 
 def _variable_name(name: str) -> str:
@@ -20,8 +101,64 @@ def _variable_name(name: str) -> str:
     return name
 
 
+def parse(code: str, filename='eval.py') -> ast.Module:
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, PARSE_RECURSION_LIMIT))
+    try:
+        return ast.parse(code, filename, 'exec')
+    finally:
+        sys.setrecursionlimit(limit)
+
+
 @ensure_typecheck
-def jsify(code: str, filename='eval.py') -> List[unholy.Compilable]:
-    tree = ast.parse(code, filename, 'exec')
+def jsify(code: str, filename='eval.py', origins: bool = False) -> List[unholy.Compilable]:
+    """
+    Translates `code`. With `origins`, the translations remember the position of the code they come from, which is
+    needed for source maps.
+    """
+    global _track_origins, _source_lines
+    tree = unholy.optimize(parse(code, filename))
+    if unholy.minify.enabled:
+        tree = unholy.rename_locals(tree)
+    if unholy.esm.enabled:
+        tree = unholy.esm.prepare(tree)
     # logging.debug(ast.dump(tree, annotate_fields=True, include_attributes=True, indent=4))
-    return jsify_node(tree)
+    if not origins:
+        return jsify_node(tree)
+    _track_origins = True
+    _source_lines = io.StringIO(code, newline='').readlines()
+    # translations are tagged with their origin, they can't be shared
+    interning = unholy.interning.enabled
+    unholy.interning.enabled = False
+    try:
+        return jsify_node(tree)
+    finally:
+        _track_origins = False
+        _source_lines = []
+        unholy.interning.enabled = interning
+
+
+def transpile(code: str, filename='eval.py', cache: 'typing.Optional[unholy.TranspileCache]' = None,
+              source_map: 'typing.Optional[unholy.SourceMap]' = None) -> str:
+    """
+    Transpiles `code` into a JS module. If `cache` is given, it is consulted first and filled on a miss. If
+    `source_map` is given, the mappings of the result are recorded in it, the cache isn't used then. The output is
+    minified if `unholy.minify.enabled` is set.
+    """
+    minify = unholy.minify.enabled
+    if source_map is not None:
+        return jsify(code, filename, origins=True)[0].compile([], source_map=source_map, minify=minify)
+
+    if cache is not None:
+        key = cache.key(code)
+        result = cache.get(code, key)
+        if result is not None:
+            return result
+
+    result = jsify(code, filename)[0].compile([], minify=minify)
+    if cache is not None:
+        cache.put(code, result, key)
+    return result
+
+
+__all__ = ['PARSE_RECURSION_LIMIT', 'translate_node', 'jsify_node', 'parse', 'jsify', 'transpile']
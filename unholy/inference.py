@@ -0,0 +1,348 @@
+"""
+Flow-insensitive type inference of local variables.
+
+Every function is analysed on its own: a local variable has a type if every assignment to it anywhere in the function
+(including arguments, annotations, augmented assignments and loop targets) gives it the same one. Loads of such
+variables are marked with an `inferred_type` attribute and `type_of` uses that to type whole expressions, which lets
+translators emit plain JS instead of calls into the runtime. Functions are marked with `is_generator` on the way, so
+the translator doesn't have to look for their `yield`s again.
+
+Module level variables are never typed, they can be changed from anywhere. Builtins like `range` and `len` are assumed
+not to be replaced at module level.
+"""
+import ast
+import typing
+
+# types are named after the Python builtins
+INT = 'int'
+FLOAT = 'float'
+BOOL = 'bool'
+STR = 'str'
+NONE = 'None'
+LIST = 'list'
+TUPLE = 'tuple'
+DICT = 'dict'
+SET = 'set'
+RANGE = 'range'
+
+_NUMBERS = (INT, FLOAT, BOOL)
+_BUILTIN_RESULTS = {
+    'range': RANGE,
+    'len': INT,
+    'int': INT,
+    'float': FLOAT,
+    'bool': BOOL,
+    'str': STR,
+    'repr': STR,
+    'list': LIST,
+    'tuple': TUPLE,
+    'dict': DICT,
+    'set': SET,
+}
+_ANNOTATIONS = {
+    'int': INT, 'float': FLOAT, 'bool': BOOL, 'str': STR, 'None': NONE, 'list': LIST, 'tuple': TUPLE, 'dict': DICT,
+    'set': SET, 'range': RANGE, 'List': LIST, 'Tuple': TUPLE, 'Dict': DICT, 'Set': SET,
+}
+# expressions nested deeper than this are left untyped, typing them isn't worth walking the whole chain
+_MAX_DEPTH = 64
+# used during inference for variables whose assignments haven't been looked at yet
+_PENDING = object()
+# what name lookups return for variables that aren't local
+_GLOBAL = object()
+
+
+def _arithmetic(op: ast.operator, left, right):
+    if left is _PENDING or right is _PENDING:
+        return _PENDING
+    if left in _NUMBERS and right in _NUMBERS:
+        if isinstance(op, ast.Div):
+            return FLOAT
+        if FLOAT in (left, right):
+            return FLOAT
+        if isinstance(op, ast.Pow):
+            return None  # int ** negative int is a float
+        return INT
+    if isinstance(op, ast.Add) and left == right and left in (STR, LIST, TUPLE):
+        return left
+    if isinstance(op, ast.Mult) and (left, right) in ((STR, INT), (INT, STR), (LIST, INT), (INT, LIST)):
+        return STR if STR in (left, right) else LIST
+    if isinstance(op, ast.Mod) and left == STR:
+        return STR
+    return None
+
+
+def _same(types):
+    types = list(types)
+    if _PENDING in types:
+        return _PENDING
+    if types and all(i == types[0] for i in types):
+        return types[0]
+    return None
+
+
+def _expression_type(node, lookup: typing.Callable, depth: int = 0):
+    if depth > _MAX_DEPTH:
+        return None
+    depth += 1
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool):
+            return BOOL
+        if isinstance(value, int):
+            return INT
+        if isinstance(value, float):
+            return FLOAT
+        if isinstance(value, str):
+            return STR
+        if value is None:
+            return NONE
+        return None
+    if isinstance(node, (ast.List, ast.ListComp)):
+        return LIST
+    if isinstance(node, ast.Tuple):
+        return TUPLE
+    if isinstance(node, (ast.Dict, ast.DictComp)):
+        return DICT
+    if isinstance(node, (ast.Set, ast.SetComp)):
+        return SET
+    if isinstance(node, ast.JoinedStr):
+        return STR
+    if isinstance(node, ast.Name):
+        value = lookup(node)
+        return None if value is _GLOBAL else value
+    if isinstance(node, ast.NamedExpr):
+        return _expression_type(node.value, lookup, depth)
+    if isinstance(node, ast.BinOp):
+        return _arithmetic(node.op, _expression_type(node.left, lookup, depth),
+                           _expression_type(node.right, lookup, depth))
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return BOOL
+        operand = _expression_type(node.operand, lookup, depth)
+        if operand is _PENDING:
+            return _PENDING
+        if operand in _NUMBERS:
+            return INT if operand == BOOL else operand
+        return None
+    if isinstance(node, ast.Compare):
+        return BOOL
+    if isinstance(node, ast.BoolOp):
+        return _same(_expression_type(i, lookup, depth) for i in node.values)
+    if isinstance(node, ast.IfExp):
+        return _same((_expression_type(node.body, lookup, depth), _expression_type(node.orelse, lookup, depth)))
+    if isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Name) and node.func.id in _BUILTIN_RESULTS and lookup(node.func) is _GLOBAL:
+            return _BUILTIN_RESULTS[node.func.id]
+        return None
+    if isinstance(node, ast.Subscript):
+        value = _expression_type(node.value, lookup, depth)
+        if value is _PENDING:
+            return _PENDING
+        if value == STR:
+            return STR
+        if isinstance(node.slice, ast.Slice) and value in (LIST, TUPLE):
+            return value
+        return None
+    return None
+
+
+def _annotation_type(annotation) -> typing.Optional[str]:
+    if isinstance(annotation, ast.Constant) and annotation.value is None:
+        return NONE
+    if isinstance(annotation, ast.Subscript):
+        annotation = annotation.value
+    if isinstance(annotation, ast.Attribute) and isinstance(annotation.value, ast.Name) \
+            and annotation.value.id == 'typing':
+        return _ANNOTATIONS.get(annotation.attr)
+    if isinstance(annotation, ast.Name):
+        return _ANNOTATIONS.get(annotation.id)
+    return None
+
+
+def _element_type(iterable) -> typing.Optional[str]:
+    if iterable is _PENDING:
+        return _PENDING
+    if iterable == RANGE:
+        return INT
+    if iterable == STR:
+        return STR
+    return None
+
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_YIELDS = (ast.Yield, ast.YieldFrom)
+# the nodes `_walk_scope` doesn't look into, or not into all of, by their exact class
+_LEAVES = {ast.Name, ast.Constant}
+_SCOPES = {*_FUNCTIONS, *_COMPREHENSIONS, ast.ClassDef, ast.Lambda}
+# match statements are new in Python 3.10
+_MATCH_MAPPING = getattr(ast, 'MatchMapping', ())
+_MATCH_BINDINGS = tuple(getattr(ast, i) for i in ('MatchAs', 'MatchStar', 'MatchMapping') if hasattr(ast, i))
+# nodes that bind names, everything else in a scope is only looked at for loads of names
+_BINDINGS = (ast.Assign, ast.AnnAssign, ast.AugAssign, ast.For, ast.AsyncFor, ast.NamedExpr, ast.FunctionDef,
+             ast.AsyncFunctionDef, ast.ClassDef, ast.Import, ast.ImportFrom, ast.Global, ast.Nonlocal, ast.ExceptHandler,
+             *_MATCH_BINDINGS)
+
+
+def _walk_scope(body: typing.List[ast.AST], nodes: typing.List[ast.AST], functions: typing.List[ast.AST]):
+    """
+    Collects the nodes of a scope into `nodes`, skipping the insides of nested scopes except the parts that are
+    evaluated in the outer one (decorators, defaults). Functions defined in the scope, or in classes in it, are
+    collected into `functions`.
+    """
+    stack = list(reversed(body))
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        kind = node.__class__
+        if kind in _LEAVES:
+            continue
+        if kind not in _SCOPES:
+            children = []
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if value.__class__ is list:
+                    children.extend([i for i in value if isinstance(i, ast.AST)])
+                elif isinstance(value, ast.AST) and value._fields:  # contexts and operators don't matter here
+                    children.append(value)
+        elif kind in _FUNCTIONS:
+            functions.append(node)
+            children = node.decorator_list + node.args.defaults + [i for i in node.args.kw_defaults if i is not None]
+        elif kind is ast.ClassDef:
+            children = node.decorator_list + node.bases + [i.value for i in node.keywords]
+            _walk_scope(node.body, [], functions)  # class bodies aren't typed, the methods are
+        elif kind is ast.Lambda:
+            children = node.args.defaults + [i for i in node.args.kw_defaults if i is not None]
+        else:
+            children = [node.generators[0].iter]  # the rest is evaluated inside the comprehension
+        children.reverse()
+        stack.extend(children)
+
+
+class TypeInference:
+    """
+    Marks loads of local variables with the type inferred for them, see the module documentation.
+    """
+
+    def __init__(self):
+        self._types: typing.Dict[str, typing.Any] = {}
+
+    def run(self, tree: ast.AST):
+        functions = []
+        _walk_scope(getattr(tree, 'body', []), [], functions)  # module level variables aren't typed
+
+        # [function, nodes of its scope, index of the enclosing function, names made unknown by nested functions,
+        #  node classes in the scope]
+        scopes = []
+        pending = [(i, None) for i in functions]
+        while pending:
+            function, parent = pending.pop()
+            nodes, nested = [], []
+            _walk_scope(function.body, nodes, nested)
+            pending.extend((i, len(scopes)) for i in nested)
+            scopes.append([function, nodes, parent, set(), set(map(type, nodes))])
+
+        # nested functions can assign to the variables of the enclosing ones
+        for _, nodes, parent, _, kinds in scopes:
+            if ast.Nonlocal not in kinds:
+                continue
+            names = [name for node in nodes if isinstance(node, ast.Nonlocal) for name in node.names]
+            while names and parent is not None:
+                scopes[parent][3].update(names)
+                parent = scopes[parent][2]
+
+        for function, nodes, _, unknown, kinds in scopes:
+            function.is_generator = not kinds.isdisjoint(_YIELDS)
+            self._analyse(function, nodes, unknown)
+        return tree
+
+    def _analyse(self, function: typing.Union[ast.FunctionDef, ast.AsyncFunctionDef], nodes: typing.List[ast.AST],
+                 unknown: typing.Set[str]):
+        # (name, function computing the type of one assignment to it)
+        bindings: typing.List[typing.Tuple[str, typing.Callable]] = []
+        handled_targets: typing.Set[int] = set()
+        loads = []
+        stores = []
+
+        def bind(target, compute: typing.Callable):
+            if isinstance(target, ast.Name):
+                handled_targets.add(id(target))
+                bindings.append((target.id, compute))
+
+        arguments = function.args
+        for i in arguments.posonlyargs + arguments.args + arguments.kwonlyargs:
+            annotated = _annotation_type(i.annotation) if i.annotation is not None else None
+            bindings.append((i.arg, lambda annotated=annotated: annotated))
+        if arguments.vararg:
+            bindings.append((arguments.vararg.arg, lambda: None))
+        if arguments.kwarg:
+            bindings.append((arguments.kwarg.arg, lambda: None))
+
+        for node in nodes:
+            kind = node.__class__
+            if kind is ast.Name:
+                (loads if node.ctx.__class__ is ast.Load else stores).append(node)
+            elif not isinstance(node, _BINDINGS):  # not by class, passes put subclasses of For in the tree
+                continue
+            elif isinstance(node, ast.Assign):
+                if len(node.targets) == 1:
+                    bind(node.targets[0], lambda node=node: self._type(node.value))
+            elif isinstance(node, ast.AnnAssign):
+                annotated = _annotation_type(node.annotation)
+                bind(node.target, lambda annotated=annotated: annotated)
+            elif isinstance(node, ast.AugAssign):
+                bind(node.target, lambda node=node: _arithmetic(node.op, self._types[node.target.id],
+                                                                self._type(node.value)))
+            elif isinstance(node, (ast.For, ast.AsyncFor)):
+                bind(node.target, lambda node=node: _element_type(self._type(node.iter)))
+            elif isinstance(node, ast.NamedExpr):
+                bind(node.target, lambda node=node: self._type(node.value))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                unknown.add(node.name)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                unknown.update((i.asname or i.name).split('.')[0] for i in node.names)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                unknown.update(node.names)
+            elif isinstance(node, _MATCH_MAPPING):
+                if node.rest:
+                    unknown.add(node.rest)
+            elif node.name:  # except ... as, match captures
+                unknown.add(node.name)
+        unknown.update(i.id for i in stores if id(i) not in handled_targets)  # unpacking, with ... as, del
+
+        # Fixed point: every variable starts pending and gets joined with the types of all its assignments until
+        # nothing changes. A variable can only go from pending to a type to unknown, so this ends quickly.
+        self._types = {name: _PENDING for name, _ in bindings}
+        self._types.update((i, None) for i in unknown)
+        changed = True
+        while changed:
+            changed = False
+            for name, compute in bindings:
+                current = self._types[name]
+                if current is None:
+                    continue
+                new = compute()
+                if new is _PENDING:
+                    continue
+                joined = new if current is _PENDING or current == new else None
+                if joined != current:
+                    self._types[name] = joined
+                    changed = True
+
+        for node in loads:
+            if node.id in self._types:
+                value = self._types[node.id]
+                node.inferred_type = None if value is _PENDING else value
+
+    def _type(self, node):
+        return _expression_type(node, lambda name: self._types.get(name.id, _GLOBAL))
+
+
+def type_of(node: ast.AST) -> typing.Optional[str]:
+    """
+    Returns the type of an expression, as far as it's known after TypeInference ran. None if it isn't known.
+    """
+    return _expression_type(node, lambda name: getattr(name, 'inferred_type', _GLOBAL))
+
+
+__all__ = ['type_of']
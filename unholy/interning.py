@@ -0,0 +1,102 @@
+"""
+Shares the translations of leaves: constants, names and attribute chains like `self.items.append`. Generated code
+repeats them a lot, every distinct one is translated once and the same `JSExpression`, holding its compiled text, is
+used for all of its occurrences. Short pieces of text joined by `JSExpression`, like `total = total + `, are shared
+the same way, so repeated code keeps a single copy of them.
+
+Shared expressions must not be changed. Only `unholy.functions` does that, it tags translations with their origin
+while building a source map, `enabled` is cleared then.
+
+The tables are emptied once they hold `max_size` entries, `clear` empties them, e.g. between files or after changing
+`unholy.PY_TO_JS_NAMES`.
+"""
+import ast
+import json
+import logging
+import typing
+
+import unholy
+
+max_size = 65536
+MAX_TEXT_LENGTH = 80
+enabled = True
+
+_table: typing.Dict[tuple, 'unholy.JSExpression'] = {}
+# text joined from the parts of expressions, the copies of equal strings are dropped
+_texts: typing.Dict[str, str] = {}
+# constants whose equal values translate the same
+_EXACT = (str, int, bool, type(None))
+
+
+def clear():
+    _table.clear()
+    _texts.clear()
+
+
+def _lookup(key: tuple) -> typing.Optional['unholy.JSExpression']:
+    return _table.get(key) if enabled else None
+
+
+def _store(key: tuple, text: str) -> 'unholy.JSExpression':
+    expression = unholy.JSExpression([text])
+    if enabled:
+        if len(_table) >= max_size:
+            _table.clear()
+        _table[key] = expression
+    return expression
+
+
+def text(value: str) -> str:
+    """
+    A string equal to `value`, the same object for every equal string as long as it's short enough to repeat.
+    """
+    if len(value) > MAX_TEXT_LENGTH:
+        return value
+    shared = _texts.get(value)
+    if shared is None:
+        if len(_texts) >= max_size:
+            _texts.clear()
+        shared = _texts[value] = value
+    return shared
+
+
+def constant(value) -> 'unholy.JSExpression':
+    # equal values of different types translate differently, like 1 and True, and so do 0.0 and -0.0
+    key = ('constant', value.__class__, value if value.__class__ in _EXACT else repr(value))
+    expression = _lookup(key)
+    if expression is None:
+        expression = _store(key, json.dumps(value))
+    return expression
+
+
+def name(identifier: str) -> 'unholy.JSExpression':
+    key = ('name', identifier)
+    expression = _lookup(key)
+    if expression is None:
+        expression = _store(key, unholy.map_name(identifier))
+        logging.debug('Name %s maps to %s', identifier, expression.others[0])
+    else:
+        unholy.runtime.record(expression.others[0])  # map_name isn't called, the module still needs the helper
+    return expression
+
+
+def attribute_chain(node: ast.Attribute) -> typing.Optional['unholy.JSExpression']:
+    """
+    The translation of `node` if it's a chain of attributes of a name, None otherwise.
+    """
+    parts = [node.attr]
+    value = node.value
+    while value.__class__ is ast.Attribute:
+        parts.append(value.attr)
+        value = value.value
+    if value.__class__ is not ast.Name:
+        return None
+    parts.append(value.id)
+    key = ('attribute', *parts)
+    expression = _lookup(key)
+    if expression is None:
+        parts.reverse()
+        expression = _store(key, '.'.join([unholy.map_name(parts[0]), *parts[1:]]))
+    else:
+        unholy.runtime.record(expression.others[0])
+    return expression
@@ -0,0 +1,135 @@
+from typing import List, Optional, TextIO
+
+INDENT = '    '
+
+
+class Layout:
+    """
+    Lays out compiled code in a single pass.
+
+    Lines are written to `writer` as soon as they are started, indentation is computed from the current depth and
+    never re-applied. The only part of the output kept back is the tail of the current line, in case a statement
+    wants to replace its trailing semicolons.
+    """
+
+    def __init__(self, writer: TextIO, lines_ref: Optional[List[str]] = None, indent: str = INDENT,
+                 source_map=None, minify: bool = False):
+        self.writer = writer
+        self.lines_ref = lines_ref
+        self.indent = indent
+        # an unholy.SourceMap, filled by `mark`
+        self.source_map = source_map
+        # Everything on one line without indentation. Statements that would end with a line break are separated by
+        # semicolons instead, the output doesn't rely on automatic semicolon insertion.
+        self.minify = minify
+        self._last_character = ''
+
+        # position in the output, only kept up to date with a source map
+        self._line = 0
+        self._column = 0
+        self._marked = None
+        self._marked_line = -1
+
+        self._tail = ''
+        self._started = False
+        # how many lines were started in each of the currently open blocks
+        self._scopes = [len(lines_ref) if lines_ref else 0]
+
+    def new_line(self, depth: int, statement: bool = True):
+        """
+        Starts a line. `statement` is False for lines that continue the previous statement, like opening braces.
+        """
+        self._flush_tail()
+        if self.minify:
+            if statement and self._started and self._last_character not in ';{':
+                self.writer.write(';')
+                self._column += 1
+            self._started = True
+            self._scopes[-1] += 1
+            return
+        if self._started:
+            self.writer.write('\n')
+            self._line += 1
+        self._started = True
+        self._scopes[-1] += 1
+        self._column = 0
+        if depth > 0:
+            self.writer.write(self.indent * depth)
+            self._column = len(self.indent) * depth
+
+    def write(self, text: str):
+        if not text:
+            return
+        if not self._started:
+            self.new_line(0)
+
+        if text.rstrip(';'):
+            self._flush_tail()
+            self._tail = text
+        else:
+            self._tail += text
+
+    def mark(self, origin):
+        """
+        Records that the output written next comes from `origin`, a (line, column) position in the Python source.
+        """
+        line = self._line
+        if origin is None or origin is self._marked and line == self._marked_line:
+            return
+        if not self._started:
+            self.new_line(0)
+        self._marked = origin
+        self._marked_line = line
+        self.source_map.add(line, self._column + len(self._tail), origin[0] - 1, origin[1])
+
+    def terminate(self):
+        """Ends the current line with exactly one semicolon."""
+        self._tail = self._tail.rstrip(';') + ';'
+
+    def in_line(self) -> bool:
+        """Returns True if the innermost open block already has a line that can be continued."""
+        return self._started and self._scopes[-1] > 0
+
+    def open_block(self, depth: int, has_braces: bool):
+        if has_braces:
+            if not self._started and self.lines_ref:
+                # compiling into the middle of someone else's output
+                if self.lines_ref[-1].endswith(';'):
+                    self._scopes.append(0)
+                    self.new_line(depth)
+                    self.write('{')
+                else:
+                    self.lines_ref[-1] += ' {'
+                    self._scopes.append(0)
+                return
+            if self.in_line() and not self._tail.endswith(';'):
+                self.write('{' if self.minify else ' {')
+                self._scopes.append(0)
+            else:
+                self._scopes.append(0)
+                self.new_line(depth, statement=False)
+                self.write('{')
+        else:
+            self._scopes.append(0)
+
+    def close_block(self, depth: int, has_braces: bool):
+        if has_braces:
+            self.new_line(depth, statement=False)
+            self.write('}')
+        self._scopes.pop()
+        self._scopes[-1] += 1
+
+    def close(self):
+        self._flush_tail()
+
+    def _flush_tail(self):
+        if self._tail:
+            self.writer.write(self._tail)
+            if self.source_map is not None and '\n' in self._tail:  # multi-line template literals
+                self._line += self._tail.count('\n')
+                self._column = len(self._tail) - self._tail.rindex('\n') - 1
+            else:
+                self._column += len(self._tail)
+            if self.minify:
+                self._last_character = self._tail[-1]
+            self._tail = ''
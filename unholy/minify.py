@@ -0,0 +1,206 @@
+"""
+Minified output: no indentation, no line breaks and short names for the local variables of functions.
+
+Names are only changed inside functions, everything at module level keeps its name, so what a module exports and
+what other modules refer to stays the same. Names mapped by `PY_TO_JS_NAMES`, names declared `global` and imported
+names are never renamed either. Comprehensions are translated into the function they're in, their variables are
+renamed like the function's own.
+
+Assignments in functions don't declare their variables yet, so every function gets short names of its own instead of
+reusing the names of its siblings, two unrelated locals must not end up as the same implicit global.
+
+Renaming happens on the Python AST, after the optimization passes, so the translators don't need to know about it.
+"""
+import ast
+import itertools
+import string
+import typing
+
+import unholy
+from .constants import START_COMMENT
+
+# set from the command line, part of the cache key
+enabled = False
+
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+_RESERVED = frozenset((
+    'await', 'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger', 'default', 'delete', 'do', 'else',
+    'enum', 'export', 'extends', 'false', 'finally', 'for', 'function', 'if', 'implements', 'import', 'in',
+    'instanceof', 'interface', 'let', 'new', 'null', 'package', 'private', 'protected', 'public', 'return', 'static',
+    'super', 'switch', 'this', 'throw', 'true', 'try', 'typeof', 'var', 'void', 'while', 'with', 'yield',
+    # globals the translations refer to
+    'Array', 'Infinity', 'JSON', 'Map', 'Math', 'NaN', 'Number', 'Object', 'Set', 'String', 'Symbol', 'arguments',
+    'console', 'eval', 'exports', 'module', 'require', 'undefined', 'unholy_js',
+))
+_FIRST_CHARACTERS = string.ascii_letters
+_CHARACTERS = string.ascii_letters + string.digits
+
+
+def _short_names() -> typing.Iterator[str]:
+    yield from _FIRST_CHARACTERS
+    for length in itertools.count(1):
+        for first in _FIRST_CHARACTERS:
+            for rest in itertools.product(_CHARACTERS, repeat=length):
+                yield first + ''.join(rest)
+
+
+def _arguments(node: typing.Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda]) -> typing.List[ast.arg]:
+    # `**kwargs` is passed as `options`, references to it are left alone
+    args = node.args
+    return [*args.posonlyargs, *args.args, *([args.vararg] if args.vararg else []), *args.kwonlyargs]
+
+
+def _walk_scope(roots: typing.Iterable[ast.AST], nodes: list, scopes: list):
+    """
+    Collects the nodes belonging to one scope into `nodes` and the functions nested in it into `scopes`. The name,
+    decorators and defaults of a nested function belong to the enclosing scope. Classes aren't translated and are
+    skipped.
+    """
+    stack = list(roots)
+    stack.reverse()
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if isinstance(node, _SCOPES):
+            scopes.append(node)
+            children = [*node.args.defaults, *filter(None, node.args.kw_defaults)]
+            if not isinstance(node, ast.Lambda):
+                children = [*node.decorator_list, *children]
+        elif isinstance(node, ast.ClassDef):
+            continue
+        else:
+            children = list(ast.iter_child_nodes(node))
+        children.reverse()
+        stack.extend(children)
+
+
+def used_names(tree: ast.AST) -> typing.Set[str]:
+    """
+    The names used anywhere in `tree`, short names must not clash with them.
+    """
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).split('.', 1)[0])
+    return names
+
+
+class LocalRenamer:
+    """
+    Gives the local variables of all functions in a module short names that don't clash with anything visible.
+
+    `taken` are the names used in the module, by default the ones in `tree`. A module can be renamed in parts, like
+    `unholy.parallel` does: every part gets the names of the whole module and skips the short names the parts before
+    it picked, see `count`.
+    """
+
+    def __init__(self, tree: ast.Module, taken: typing.Optional[typing.Set[str]] = None, skip: int = 0):
+        self.tree = tree
+        self._taken = set(_RESERVED)
+        self._taken.update(unholy.PY_TO_JS_NAMES)
+        self._taken.update(i.split('.', 1)[0] for i in unholy.PY_TO_JS_NAMES.values())
+        self._taken.update(used_names(tree) if taken is None else taken)
+        self._names = itertools.islice((i for i in _short_names() if i not in self._taken), skip, None)
+
+    def run(self) -> ast.Module:
+        scopes = []
+        _walk_scope(self.tree.body, [], scopes)
+        stack = [(i, {}) for i in reversed(scopes)]
+        while stack:
+            function, inherited = stack.pop()
+            mapping, nested = self._rename(function, inherited)
+            stack.extend((i, mapping) for i in reversed(nested))
+        return self.tree
+
+    def count(self) -> int:
+        """
+        How many short names `run` picks, without renaming anything.
+        """
+        result = 0
+        stack = []
+        _walk_scope(self.tree.body, [], stack)
+        while stack:
+            _, nested, renamed, _ = self._scope(stack.pop())
+            result += len(renamed)
+            stack.extend(nested)
+        return result
+
+    def _scope(self, function):
+        """
+        The nodes of one function, the functions nested in it, its locals that get short names and the names it
+        refers to that must keep the name they have outside.
+        """
+        nodes = []
+        nested = []
+        arguments = _arguments(function)
+        body = [function.body] if isinstance(function, ast.Lambda) else function.body
+        _walk_scope([*arguments, *body], nodes, nested)
+
+        local = dict.fromkeys(i.arg for i in arguments)
+        kept = set()
+        if function.args.kwarg:
+            kept.add(function.args.kwarg.arg)
+        for node in nodes:
+            if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+                local[node.id] = None
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                local[node.name] = None
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                local[node.name] = None
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                kept.update((i.asname or i.name).split('.', 1)[0] for i in node.names)
+            elif isinstance(node, ast.Global):
+                kept.update(node.names)
+            elif isinstance(node, ast.Nonlocal):
+                # refers to the enclosing function's variable, which already has its name
+                for i in node.names:
+                    local.pop(i, None)
+                kept.difference_update(node.names)
+        renamed = [i for i in local if i not in kept and i not in unholy.PY_TO_JS_NAMES]
+        return nodes, nested, renamed, kept
+
+    def _rename(self, function, inherited: typing.Dict[str, str]):
+        """
+        Renames the names of one function. `inherited` maps the names of the enclosing functions. Returns the mapping
+        of this function, which the functions nested in it inherit, and those functions.
+        """
+        nodes, nested, renamed, kept = self._scope(function)
+        mapping = dict(inherited)
+        for name in kept:
+            mapping.pop(name, None)
+        for name, short in zip(renamed, self._names):
+            mapping[name] = short
+
+        for node in nodes:
+            if isinstance(node, ast.Name):
+                node.id = mapping.get(node.id, node.id)
+            elif isinstance(node, ast.arg):
+                node.arg = mapping.get(node.arg, node.arg)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                node.name = mapping.get(node.name, node.name)
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                node.name = mapping.get(node.name, node.name)
+        return mapping, nested
+
+
+def rename_locals(tree: ast.Module) -> ast.Module:
+    """
+    Renames the local variables of the functions in `tree` in place, see `LocalRenamer`.
+    """
+    return LocalRenamer(tree).run()
+
+
+def header() -> str:
+    """
+    What is written before the transpiled code of an output file.
+    """
+    return '' if enabled else START_COMMENT
+
+
+__all__ = ['rename_locals']
@@ -1,53 +1,82 @@
+"""
+The translators of every AST node type. The module defining a translator is imported the first time a node of its
+type is translated, code without comprehensions never loads `.comprehensions`.
+"""
 import ast
+import importlib
 import typing
 
-from . import functions, general, containers, fstrings, control, operators, imports
+from ..passes import RangeFor
 
 
 def lookup_node_translator(node):
-    return translator_map[type(node)]
+    try:
+        return translator_map[type(node)]
+    except KeyError:
+        pass
+    # raises KeyError for nodes without a translator, like the lookup in translator_map did
+    module, name = _TRANSLATORS[type(node)]
+    translator = translator_map[type(node)] = getattr(importlib.import_module(f'.{module}', __name__), name)
+    return translator
 
 
-translator_map: typing.Dict[type, typing.Callable] = {
+# the translators looked up so far
+translator_map: typing.Dict[type, typing.Callable] = {}
+
+# node type -> (module, translator)
+_TRANSLATORS: typing.Dict[type, typing.Tuple[str, str]] = {
     # .functions
-    ast.AsyncFunctionDef: functions.jsify_function_definition,
-    ast.Call: functions.jsify_call,
-    ast.FunctionDef: functions.jsify_function_definition,
-    ast.Lambda: functions.jsify_lambda,
-    ast.Return: functions.jsify_return,
+    ast.AsyncFunctionDef: ('functions', 'jsify_function_definition'),
+    ast.Call: ('functions', 'jsify_call'),
+    ast.FunctionDef: ('functions', 'jsify_function_definition'),
+    ast.Lambda: ('functions', 'jsify_lambda'),
+    ast.Return: ('functions', 'jsify_return'),
+    ast.Yield: ('functions', 'jsify_yield'),
+    ast.YieldFrom: ('functions', 'jsify_yield_from'),
 
     # .general
-    ast.Expr: general.jsify_expr,
-    ast.Module: general.jsify_module,
-    ast.Constant: general.jsify_constant,
-    ast.Name: general.jsify_name,
-    ast.Attribute: general.jsify_attribute,
-    ast.Assign: general.jsify_assign,
-    ast.AnnAssign: general.jsify_assign,
-    ast.Delete: general.jsify_delete,
-    ast.Subscript: general.jsify_subscript,
-    ast.Await: general.jsify_await,
+    ast.Expr: ('general', 'jsify_expr'),
+    ast.Module: ('general', 'jsify_module'),
+    ast.Constant: ('general', 'jsify_constant'),
+    ast.Name: ('general', 'jsify_name'),
+    ast.Attribute: ('general', 'jsify_attribute'),
+    ast.Assign: ('general', 'jsify_assign'),
+    ast.AnnAssign: ('general', 'jsify_assign'),
+    ast.Delete: ('general', 'jsify_delete'),
+    ast.Global: ('general', 'jsify_scope_declaration'),
+    ast.Nonlocal: ('general', 'jsify_scope_declaration'),
+    ast.Subscript: ('general', 'jsify_subscript'),
+    ast.Await: ('general', 'jsify_await'),
 
     # .containers
-    ast.Dict: containers.jsify_dict,
-    ast.List: containers.jsify_list,
-    ast.Set: containers.jsify_set,
-    ast.Tuple: containers.jsify_tuple,
+    ast.Dict: ('containers', 'jsify_dict'),
+    ast.List: ('containers', 'jsify_list'),
+    ast.Set: ('containers', 'jsify_set'),
+    ast.Tuple: ('containers', 'jsify_tuple'),
+
+    # .comprehensions
+    ast.ListComp: ('comprehensions', 'jsify_list_comprehension'),
+    ast.SetComp: ('comprehensions', 'jsify_set_comprehension'),
+    ast.DictComp: ('comprehensions', 'jsify_dict_comprehension'),
+    ast.GeneratorExp: ('comprehensions', 'jsify_generator_expression'),
 
     # .fstrings
-    ast.FormattedValue: fstrings.jsify_formatted_value,
-    ast.JoinedStr: fstrings.jsify_fstring,
+    ast.FormattedValue: ('fstrings', 'jsify_formatted_value'),
+    ast.JoinedStr: ('fstrings', 'jsify_fstring'),
 
     # .control
-    ast.If: control.jsify_if,
-    ast.For: control.jsify_for,
+    ast.If: ('control', 'jsify_if'),
+    ast.For: ('control', 'jsify_for'),
+    RangeFor: ('control', 'jsify_range_for'),
 
     # .operators
-    ast.BinOp: operators.jsify_binop,
-    ast.UnaryOp: operators.jsify_unary,
-    ast.Compare: operators.jsify_comparison,
+    ast.BinOp: ('operators', 'jsify_binop'),
+    ast.UnaryOp: ('operators', 'jsify_unary'),
+    ast.Compare: ('operators', 'jsify_comparison'),
 
     # .imports
-    ast.Import: imports.jsify_import,
-    ast.ImportFrom: imports.jsify_import_from,
+    ast.Import: ('imports', 'jsify_import'),
+    ast.ImportFrom: ('imports', 'jsify_import_from'),
 }
+
+__all__ = ['lookup_node_translator', 'translator_map']
@@ -0,0 +1,123 @@
+"""
+Comprehensions and generator expressions.
+
+List, set and dict comprehensions run in an arrow function which fills one container using plain loops, there are no
+intermediate arrays and no closures per element, it's async and awaited if the comprehension awaits. Generator
+expressions become generator functions, they stay lazy and a pipeline of them handles one element at a time.
+"""
+import ast
+import typing
+
+import unholy
+from typechecker import ensure_typecheck
+from unholy import inference
+from .control import _jsify_counting_header, _jsify_loop_header
+
+_RESULT_NAME = 'py__result'
+# Python evaluates the outermost iterable of a generator expression when the expression is evaluated, not when it's
+# first iterated, it's passed to the generator function under this name
+_ITERABLE_NAME = 'py__iterable'
+
+
+@ensure_typecheck
+def _jsify_generators(node: typing.Union[ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp],
+                      first_iter: ast.expr):
+    """
+    Translates the `for` and `if` clauses of a comprehension, see `_nest` for putting them together.
+    """
+    clauses = []
+    for index, generator in enumerate(node.generators):
+        if generator.is_async:
+            raise unholy.CompilationError('Asynchronous comprehensions are not supported')
+        bounds = getattr(generator, 'range_bounds', None)
+        if bounds is not None and (index or first_iter is generator.iter):
+            # except the outermost range() of a generator expression, it's called before the loop runs
+            header, prologue = (yield from _jsify_counting_header(generator.target, *bounds)), []
+        else:
+            header, prologue = yield from _jsify_loop_header(generator.target,
+                                                             first_iter if index == 0 else generator.iter)
+        conditions = []
+        for i in generator.ifs:
+            conditions.append((yield i))
+        clauses.append((header, prologue, conditions))
+    return clauses
+
+
+def _awaits(node: ast.AST) -> bool:
+    return any(isinstance(i, ast.Await) for i in ast.walk(node))
+
+
+def _nest(clauses, innermost: typing.List[unholy.Compilable]) -> typing.List[unholy.Compilable]:
+    body = innermost
+    for header, prologue, conditions in reversed(clauses):
+        for test in reversed(conditions):
+            body = [unholy.JSStatement('if ', ['(', *test, ')'], has_semicolon=False), unholy.JSBlock(body)]
+        body = [*header, unholy.JSBlock([*prologue, *body])]
+    return body
+
+
+@ensure_typecheck
+def _jsify_filling_comprehension(node: typing.Union[ast.ListComp, ast.SetComp, ast.DictComp], empty: str,
+                                 add: typing.Callable) -> typing.List[unholy.Compilable]:
+    clauses = yield from _jsify_generators(node, node.generators[0].iter)
+    if isinstance(node, ast.DictComp):
+        innermost = add((yield node.key), (yield node.value))
+    else:
+        innermost = add((yield node.elt))
+    awaits = _awaits(node)
+    return [unholy.JSExpression([
+        '(await (async () =>' if awaits else '(() =>',
+        unholy.JSBlock([
+            unholy.JSStatement(f'const {_RESULT_NAME} = {empty}'),
+            *_nest(clauses, [innermost]),
+            unholy.JSStatement(f'return {_RESULT_NAME}'),
+        ]),
+        ')())' if awaits else ')()'
+    ])]
+
+
+@ensure_typecheck
+def jsify_list_comprehension(node: ast.ListComp) -> typing.List[unholy.Compilable]:
+    # elt, generators
+    return (yield from _jsify_filling_comprehension(
+        node, '[]', lambda elt: unholy.JSStatement(f'{_RESULT_NAME}.push(', [*elt, ')'])
+    ))
+
+
+@ensure_typecheck
+def jsify_set_comprehension(node: ast.SetComp) -> typing.List[unholy.Compilable]:
+    # elt, generators
+    return (yield from _jsify_filling_comprehension(
+        node, 'new Set()', lambda elt: unholy.JSStatement(f'{_RESULT_NAME}.add(', [*elt, ')'])
+    ))
+
+
+@ensure_typecheck
+def jsify_dict_comprehension(node: ast.DictComp) -> typing.List[unholy.Compilable]:
+    # key, value, generators
+    return (yield from _jsify_filling_comprehension(
+        node, '{}', lambda key, value: unholy.JSStatement(f'{_RESULT_NAME}[', [*key, '] = ', *value])
+    ))
+
+
+@ensure_typecheck
+def jsify_generator_expression(node: ast.GeneratorExp) -> typing.List[unholy.Compilable]:
+    # elt, generators
+    if _awaits(node):
+        raise unholy.CompilationError('Asynchronous generator expressions are not supported')
+    outer = node.generators[0].iter
+    iterable = ast.Name(id=_ITERABLE_NAME, ctx=ast.Load())
+    iterable.inferred_type = inference.type_of(outer)  # iterated natively if the outer iterable's type is known
+    clauses = yield from _jsify_generators(node, iterable)
+    elt = yield node.elt
+    return [unholy.JSExpression([
+        f'(function* ({_ITERABLE_NAME})',
+        unholy.JSBlock(_nest(clauses, [unholy.JSStatement('yield ', elt)])),
+        ')(',
+        *(yield outer),
+        ')'
+    ])]
+
+
+__all__ = ['jsify_list_comprehension', 'jsify_set_comprehension', 'jsify_dict_comprehension',
+           'jsify_generator_expression']
@@ -2,48 +2,44 @@ import ast
 from typing import List
 
 from typechecker import ensure_typecheck
-from unholy import jsify_node
 from unholy.classes import Compilable, CompilationError, JSExpression
 
 
 def _jsify_sequential_container(node, prefix, suffix) -> List[Compilable]:
-    elts = []
+    elts = [prefix]
     for i in node.elts:
-        v = jsify_node(i)
+        v = yield i
         if len(v) != 1:
             raise CompilationError(f'Expected only one JSExpression (or Compilable) while got {len(v)}: {v!r}')
         elts.append(v[0])
         elts.append(', ')
+    elts.append(suffix)
 
-    return [JSExpression([
-        prefix,
-        JSExpression(elts),
-        suffix
-    ])]
+    return [JSExpression(elts)]
 
 
 @ensure_typecheck
 def jsify_list(node: ast.List) -> List[Compilable]:
-    return _jsify_sequential_container(node, '[', ']')
+    return (yield from _jsify_sequential_container(node, '[', ']'))
 
 
 @ensure_typecheck
 def jsify_tuple(node: ast.Tuple) -> List[Compilable]:
-    return _jsify_sequential_container(node, '#[', ']')
+    return (yield from _jsify_sequential_container(node, '#[', ']'))
 
 
 @ensure_typecheck
 def jsify_set(node: ast.Set) -> List[Compilable]:
-    return _jsify_sequential_container(node, 'new Set([', '])')
+    return (yield from _jsify_sequential_container(node, 'new Set([', '])'))
 
 
 @ensure_typecheck
 def jsify_dict(node: ast.Dict) -> List[Compilable]:
     # keys, values
-    output = []
+    output = ['{']
     for k, v in zip(node.keys, node.values):
-        jk = jsify_node(k)
-        jv = jsify_node(v)
+        jk = yield k
+        jv = yield v
         if len(jk) != 1:
             raise CompilationError(f'Dict key: Expected only one JSExpression (or Compilable) while got '
                                    f'{len(jk)}: {jk!r}')
@@ -51,15 +47,9 @@ def jsify_dict(node: ast.Dict) -> List[Compilable]:
             raise CompilationError(f'Dict value: Expected only one JSExpression (or Compilable) while got '
                                    f'{len(jv)}: {jv!r}')
 
-        output.append(JSExpression([
-            JSExpression(['[', jk[0], ']', ':']),
-            jv[0],
-        ]))
-    return [JSExpression([
-        '{',
-        JSExpression(output),
-        '}',
-    ])]
+        output.extend(['[', jk[0], ']:', jv[0]])
+    output.append('}')
+    return [JSExpression(output)]
 
 
 __all__ = ['jsify_set', 'jsify_dict', 'jsify_list', 'jsify_tuple']
@@ -3,16 +3,22 @@ import typing
 
 import unholy
 from typechecker import ensure_typecheck
+from unholy import inference
+from .general import _jsify_slice_arguments
+
+# iterated by for...of as they are
+_NATIVE_ITERABLES = (inference.LIST, inference.TUPLE, inference.STR, inference.SET, inference.RANGE)
 
 
 @ensure_typecheck
 def jsify_if(node: ast.If) -> typing.List[unholy.Compilable]:
     # test, body, orelse,
     body = []
+    test = yield node.test
     for i in node.body:
-        body.extend(unholy.jsify_node(i))
+        body.extend((yield i))
     return [
-        unholy.JSStatement('if ', ['(', *unholy.jsify_node(node.test), ')'], has_semicolon=False),
+        unholy.JSStatement('if ', ['(', *test, ')'], has_semicolon=False),
         unholy.JSBlock(body)
     ]
 
@@ -20,24 +26,41 @@ def jsify_if(node: ast.If) -> typing.List[unholy.Compilable]:
 @ensure_typecheck
 def _parse_range_arguments(call: ast.Call):
     if len(call.args) == 1:
-        return [unholy.JSExpression(['0'])], unholy.jsify_node(call.args[0]), [unholy.JSExpression(['1'])]
+        return [unholy.JSExpression(['0'])], (yield call.args[0]), [unholy.JSExpression(['1'])]
     elif len(call.args) == 2:
-        return unholy.jsify_node(call.args[0]), unholy.jsify_node(call.args[1]), [unholy.JSExpression(['1'])]
+        return (yield call.args[0]), (yield call.args[1]), [unholy.JSExpression(['1'])]
     elif len(call.args) == 3:
-        return unholy.jsify_node(call.args[0]), unholy.jsify_node(call.args[1]), unholy.jsify_node(call.args[2])
+        return (yield call.args[0]), (yield call.args[1]), (yield call.args[2])
     else:
         raise unholy.CompilationError('Bad arguments for range() function in for loop.')
 
 
 @ensure_typecheck
-def jsify_for(node: ast.For) -> typing.List[unholy.Compilable]:
-    # 'target', 'iter', 'body', 'orelse', 'type_comment',
-    output = []
-    var_name = unholy.jsify_node(node.target)
-    if isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Name) and node.iter.func.id == 'range':
+def _jsify_loop_target(target: ast.expr) -> typing.List[typing.Union[unholy.Compilable, str]]:
+    if isinstance(target, (ast.Tuple, ast.List)):
+        # unpacking, `for k, v in ...` becomes `for (const [k, v] of ...)`
+        output = ['[']
+        for i in target.elts:
+            output.extend((yield from _jsify_loop_target(i)))
+            output.append(', ')
+        output[-1] = ']'
+        return output
+    return (yield target)
+
+
+@ensure_typecheck
+def _jsify_loop_header(target: ast.expr, iter_node: ast.expr) \
+        -> typing.Tuple[typing.List[unholy.Compilable], typing.List[unholy.Compilable]]:
+    """
+    Translates the `for (...)` part of a loop over `iter_node`, used by for statements and comprehensions. Returns it
+    and the statements that have to start the body of the loop.
+    """
+    if isinstance(iter_node, ast.Call) and isinstance(iter_node.func, ast.Name) and iter_node.func.id == 'range' \
+            and isinstance(target, ast.Name):
         # range loop
-        start, end, step = _parse_range_arguments(node.iter)
-        output.append(
+        var_name = yield target
+        start, end, step = yield from _parse_range_arguments(iter_node)
+        return [
             unholy.JSStatement(
                 'for ',
                 [
@@ -63,23 +86,94 @@ def jsify_for(node: ast.For) -> typing.List[unholy.Compilable]:
                 ],
                 has_semicolon=False
             )
-        )
+        ], []
+
+    if getattr(iter_node, 'slice_view', False):
+        # A slice only read by the loop, see unholy.passes.SliceViews. The sliced variable is indexed directly, this
+        # is faster than copying and than any view object.
+        var_name = yield from _jsify_loop_target(target)
+        sliced = yield iter_node.value
+        arguments = yield from _jsify_slice_arguments(iter_node.slice)
+        return [
+            unholy.JSStatement(
+                'for ',
+                [
+                    '(let [py__index, py__left, py__step] = ' + unholy.runtime.reference('py__slice_indices') + '(',
+                    *sliced,
+                    *arguments,
+                    '); py__left > 0; py__left--, py__index += py__step)'
+                ],
+                has_semicolon=False
+            )
+        ], [unholy.JSStatement('const ', [*var_name, ' = ', *sliced, '[py__index]'])]
+
+    var_name = yield from _jsify_loop_target(target)
+    iterator = yield iter_node
+    iterable_type = inference.type_of(iter_node)
+    is_slice = isinstance(iter_node, ast.Subscript) and isinstance(iter_node.slice, ast.Slice)
+    if iterable_type in _NATIVE_ITERABLES or is_slice:
+        iterable = iterator  # slices are always arrays or strings
+    elif iterable_type == inference.DICT:
+        iterable = ['Object.keys(', *iterator, ')']
     else:
-        iterator = unholy.jsify_node(node.iter)
-        output.append(unholy.JSStatement(
+        iterable = [unholy.runtime.reference('py__iter') + '(', *iterator, ')']
+    return [
+        unholy.JSStatement(
             'for ',
             [
                 '(const ',
                 *var_name,
                 ' of ',
-                f'{unholy.map_name("iter")}(',
-                *iterator,
-                '))'
+                *iterable,
+                ')'
             ],
             has_semicolon=False
-        ))
+        )
+    ], []
+
+
+@ensure_typecheck
+def jsify_for(node: ast.For) -> typing.List[unholy.Compilable]:
+    # 'target', 'iter', 'body', 'orelse', 'type_comment',
+    output, body = yield from _jsify_loop_header(node.target, node.iter)
+    for i in node.body:
+        body.append(unholy.JSStatement('', (yield i)))
+    output.append(unholy.JSBlock(body))
+    return output
+
+
+@ensure_typecheck
+def _jsify_counting_header(target: ast.Name, start_node: ast.expr, end_node: ast.expr, step: int) \
+        -> typing.List[unholy.Compilable]:
+    """
+    Translates the `for (...)` part of a loop over `range()` with the literal `step`, see
+    unholy.passes.RangeSpecialization.
+    """
+    var_name = yield target
+    start = yield start_node
+    end = yield end_node
+    if step > 0:
+        condition = [*var_name, ' < ', *end]
+    else:
+        condition = [*var_name, ' > ', *end]
+    if step == 1:
+        increment = [*var_name, '++']
+    elif step == -1:
+        increment = [*var_name, '--']
+    elif step > 0:
+        increment = [*var_name, ' += ', str(step)]
+    else:
+        increment = [*var_name, ' -= ', str(-step)]
+    return [unholy.JSStatement('for ', ['(let ', *var_name, ' = ', *start, '; ', *condition, '; ', *increment, ')'],
+                               has_semicolon=False)]
+
+
+@ensure_typecheck
+def jsify_range_for(node: unholy.RangeFor) -> typing.List[unholy.Compilable]:
+    # range loop with a step known at compile time, see unholy.passes.RangeSpecialization
+    output = yield from _jsify_counting_header(node.target, node.start, node.end, node.step)
     body = []
     for i in node.body:
-        body.append(unholy.JSStatement('', unholy.jsify_node(i)))
+        body.append(unholy.JSStatement('', (yield i)))
     output.append(unholy.JSBlock(body))
     return output
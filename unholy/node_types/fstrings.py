@@ -1,10 +1,16 @@
 import ast
+import json
+import re
 import typing
 
-from unholy import jsify_node
+from unholy import inference, runtime
 from unholy.classes import Compilable, JSExpression
 from typechecker import ensure_typecheck
 
+# the subset of the format spec mini-language that has a direct JS equivalent: [[fill]align][width][.precision][type]
+_SIMPLE_FORMAT_SPEC = re.compile(r'(?:(?P<fill>.)?(?P<align>[<>]))?(?P<width>[1-9]\d*)?(?:\.(?P<precision>\d+))?'
+                                 r'(?P<type>[sdf]?)', re.DOTALL)
+
 
 @ensure_typecheck
 def jsify_fstring(node: ast.JoinedStr) -> typing.List[Compilable]:
@@ -12,13 +18,13 @@ def jsify_fstring(node: ast.JoinedStr) -> typing.List[Compilable]:
     for i in node.values:
         if isinstance(i, ast.FormattedValue):
             values.append(JSExpression(
-                ['${', *jsify_node(i), '}']
+                ['${', *(yield i), '}']
             ))
         else:
             if isinstance(i, ast.Constant):
                 values.append(JSExpression([i.value]))
             else:
-                values.extend(jsify_node(i))
+                values.extend((yield i))
 
     return [JSExpression([
         '`',
@@ -27,13 +33,51 @@ def jsify_fstring(node: ast.JoinedStr) -> typing.List[Compilable]:
     ])]
 
 
+def _constant_format_spec(node: ast.FormattedValue) -> typing.Optional[str]:
+    if isinstance(node.format_spec, ast.JoinedStr) and all(isinstance(i, ast.Constant) for i in node.format_spec.values):
+        return ''.join(i.value for i in node.format_spec.values)
+    return None
+
+
+def _native_format(value: typing.List[Compilable], spec: str, value_type: typing.Optional[str]
+                   ) -> typing.Optional[typing.List[Compilable]]:
+    """
+    Formats `value` with plain JS string methods. Returns None if `spec` can't be done that way for `value_type`.
+    """
+    match = _SIMPLE_FORMAT_SPEC.fullmatch(spec)
+    if match is None:
+        return None
+    precision = match['precision']
+    if value_type == inference.STR and match['type'] in ('', 's'):
+        output = ['String(', *value, ')']
+        if precision is not None:
+            output += ['.slice(0, ', precision, ')']
+    elif value_type == inference.INT and match['type'] in ('', 'd') and precision is None:
+        output = ['String(', *value, ')']
+    elif value_type in (inference.INT, inference.FLOAT) and match['type'] == 'f':
+        output = ['(', *value, ').toFixed(', precision or '6', ')']
+    else:
+        return None
+
+    if match['width']:
+        align = match['align'] or ('<' if value_type == inference.STR else '>')
+        pad = '.padEnd(' if align == '<' else '.padStart('
+        output += [pad, match['width'], ', ', json.dumps(match['fill'] or ' '), ')']
+    return [JSExpression(output)]
+
+
 @ensure_typecheck
 def jsify_formatted_value(node: ast.FormattedValue) -> typing.List[Compilable]:
-    value = jsify_node(node.value)
+    value = yield node.value
+    spec = _constant_format_spec(node)
+    if spec is not None:
+        native = _native_format(value, spec, inference.type_of(node.value))
+        if native is not None:
+            return native
     if node.format_spec:
-        fspec = jsify_node(node.format_spec)
+        fspec = yield node.format_spec
         return [JSExpression([
-            'unholy_js.py__format(',
+            runtime.reference('py__format') + '(',
             *value,
             ', ',
             *fspec,
@@ -4,13 +4,35 @@ import warnings
 
 import unholy
 from typechecker import ensure_typecheck
+from .general import variable_declarations
+
+_NESTED_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def _is_generator(node: typing.Union[ast.FunctionDef, ast.AsyncFunctionDef]) -> bool:
+    """
+    Checks if the function has a `yield` of its own, not one of a function nested in it. Type inference marks the
+    functions it analysed already.
+    """
+    marked = getattr(node, 'is_generator', None)
+    if marked is not None:
+        return marked
+    stack = list(node.body)
+    while stack:
+        i = stack.pop()
+        if isinstance(i, (ast.Yield, ast.YieldFrom)):
+            return True
+        if not isinstance(i, _NESTED_SCOPES):
+            stack.extend(ast.iter_child_nodes(i))
+    return False
+
 
 @ensure_typecheck
 def jsify_function_definition(node: typing.Union[ast.FunctionDef, ast.AsyncFunctionDef]) -> typing.List[unholy.Compilable]:
     name = node.name
     decorators = []
     for i in node.decorator_list:
-        decorators.extend(unholy.jsify_node(i))
+        decorators.extend((yield i))
         decorators.append('(')
 
     if decorators:
@@ -22,22 +44,24 @@ def jsify_function_definition(node: typing.Union[ast.FunctionDef, ast.AsyncFunct
         arg_list += f', options'
     if node.args.vararg:
         arg_list += f', ...{node.args.vararg.arg}'
-    body = []
+    body = variable_declarations(getattr(node, 'esm_declarations', []))
     for i in node.body:
-        body.extend(unholy.jsify_node(i))
+        body.extend((yield i))
     if isinstance(node, ast.FunctionDef):
         keyword = 'function'
     elif isinstance(node, ast.AsyncFunctionDef):
         keyword = 'async function'
     else:
         raise unholy.CompilationError('Expected a FunctionDev or AsyncFunctionDef. Something broke.')
+    if _is_generator(node):
+        keyword += '*'
     return [
         # unholy.JSStatement(f'let {name} = {decorators}(function {name}({arg_list})', has_semicolon=False),
         unholy.JSStatement('let ', [
             name,
             ' = ',
             *decorators,
-            f'({keyword}',
+            f'({keyword} ',
             name,
             '(',
             arg_list,
@@ -51,13 +75,23 @@ def jsify_function_definition(node: typing.Union[ast.FunctionDef, ast.AsyncFunct
 @ensure_typecheck
 def jsify_return(node: ast.Return) -> typing.List[unholy.Compilable]:
     # 'value',
-    # noinspection PyTypeChecker
-    v: unholy.JSStatement = unholy.jsify_node(node.value)[0]
-    v.force_concat = True
-    return [
-        unholy.JSStatement(f'return'),
-        v
-    ]
+    if node.value is None:
+        return [unholy.JSStatement('return')]
+    return [unholy.JSStatement('return ', (yield node.value))]
+
+
+@ensure_typecheck
+def jsify_yield(node: ast.Yield) -> typing.List[unholy.Compilable]:
+    # 'value',
+    if node.value is None:
+        return [unholy.JSExpression(['yield'])]
+    return [unholy.JSExpression(['yield ', *(yield node.value)])]
+
+
+@ensure_typecheck
+def jsify_yield_from(node: ast.YieldFrom) -> typing.List[unholy.Compilable]:
+    # 'value',
+    return [unholy.JSExpression(['yield* ', unholy.runtime.reference('py__iter') + '(', *(yield node.value), ')'])]
 
 
 @ensure_typecheck
@@ -72,17 +106,17 @@ def jsify_lambda(node: ast.Lambda) -> typing.List[unholy.Compilable]:
     return [
         unholy.JSExpression([
             unholy.JSExpression([f'({arg_list}) =>']),
-            unholy.JSBlock(unholy.jsify_node(node.body))
+            unholy.JSBlock((yield node.body))
         ])
     ]
 
 
 @ensure_typecheck
 def jsify_call(node: ast.Call) -> typing.List[unholy.Compilable]:
-    func_name = unholy.jsify_node(node.func)
+    func_name = yield node.func
     args = []
     for i in node.args:
-        args.extend(unholy.jsify_node(i))
+        args.extend((yield i))
 
     if node.keywords:
         warnings.warn(f'keyword arguments were ignored while calling {func_name}')
@@ -94,4 +128,5 @@ def jsify_call(node: ast.Call) -> typing.List[unholy.Compilable]:
     ])]
 
 
-__all__ = ['jsify_lambda', 'jsify_return', 'jsify_function_definition', 'jsify_call']
+__all__ = ['jsify_lambda', 'jsify_return', 'jsify_yield', 'jsify_yield_from', 'jsify_function_definition',
+           'jsify_call']
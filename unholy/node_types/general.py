@@ -1,5 +1,4 @@
 import ast
-import json
 import logging
 import typing
 
@@ -9,40 +8,74 @@ import unholy
 from typechecker import ensure_typecheck
 
 
+def module_prologue(helpers: typing.Optional[typing.Set[str]] = None,
+                    esm: bool = False) -> typing.List[unholy.Compilable]:
+    """
+    Statements put at the start of a module, before the translated body. They make the runtime `helpers` the body
+    uses available, all of them if `helpers` isn't known.
+    """
+    return [unholy.JSStatement(i) for i in unholy.runtime.prologue(helpers, esm)]
+
+
+def variable_declarations(names: typing.List[str]) -> typing.List[unholy.Compilable]:
+    # variables that are assigned without being declared, ES modules are strict, see unholy.esm
+    return [unholy.JSStatement(f'let {", ".join(names)}')] if names else []
+
+
+def module_block(node: ast.Module, helpers: typing.Set[str],
+                 body: typing.List[unholy.Compilable]) -> unholy.JSBlock:
+    """
+    The translation of the module `node`, given the translations of its statements and the runtime helpers they use.
+    """
+    exports = getattr(node, 'esm_exports', None)
+    if exports is None:
+        return unholy.JSBlock([
+            *module_prologue(helpers),
+            *body
+        ], has_braces=False)
+    return unholy.JSBlock([
+        *module_prologue(helpers, esm=True),
+        *([unholy.JSStatement(i) for i in unholy.esm.REQUIRE_SETUP] if node.esm_require else []),
+        *variable_declarations(node.esm_declarations),
+        *body,
+        *([unholy.JSStatement(f'export {{ {", ".join(exports)} }}')] if exports else [])
+    ], has_braces=False)
+
+
 @ensure_typecheck
 def jsify_module(node: ast.Module) -> typing.List[unholy.Compilable]:
+    helpers = unholy.runtime.collect()
     body = []
     for i in node.body:
-        body.extend(unholy.jsify_node(i))
+        body.extend((yield i))
     logging.debug(body)
-    return [unholy.JSBlock([
-        unholy.JSStatement('const unholy_js = require("./not_python/unholy_js.js")'),
-        *body
-    ], has_braces=False)]
+    return [module_block(node, helpers, body)]
 
 
 @ensure_typecheck
 def jsify_expr(node: ast.Expr) -> typing.List[unholy.Compilable]:
     # 'value',
-    return unholy.jsify_node(node.value)
+    return (yield node.value)
 
 
 @ensure_typecheck
 def jsify_constant(node: ast.Constant) -> typing.List[unholy.Compilable]:
-    return [unholy.JSExpression([json.dumps(node.value)])]
+    return [unholy.interning.constant(node.value)]
 
 
 @ensure_typecheck
 def jsify_name(node: ast.Name) -> typing.List[unholy.Compilable]:
-    logging.debug(f'asdf {unholy.map_name(node.id)=}')
-    return [unholy.JSExpression([unholy.map_name(node.id)])]
+    return [unholy.interning.name(node.id)]
 
 
 @ensure_typecheck
 def jsify_attribute(node: ast.Attribute) -> typing.List[unholy.Compilable]:
     # value, attr, ctx
+    chain = unholy.interning.attribute_chain(node)
+    if chain is not None:
+        return [chain]
     return [unholy.JSExpression([
-        *unholy.jsify_node(node.value),
+        *(yield node.value),
         '.',
         node.attr
     ])]
@@ -59,11 +92,12 @@ def jsify_assign(node: typing.Union[ast.Assign, ast.AnnAssign]) -> typing.List[u
     targets = []
 
     for i in t:
-        targets.extend(unholy.jsify_node(i))
+        targets.extend((yield i))
+    value = yield node.value
     if len(targets) == 1:
         return [unholy.JSExpression([
             targets[0], ' = ',
-            *unholy.jsify_node(node.value)
+            *value
         ])]
     else:
         output = ['[']
@@ -71,30 +105,59 @@ def jsify_assign(node: typing.Union[ast.Assign, ast.AnnAssign]) -> typing.List[u
             output.append(i)
             output.append(', ')
         output.append('] =')
-        output.extend(unholy.jsify_node(node.value))
+        output.extend(value)
         return [unholy.JSExpression(output)]
 
 
 @ensure_typecheck
 def jsify_delete(node: ast.Delete) -> typing.List[unholy.Compilable]:
     # 'targets',
-    return [unholy.JSStatement('delete ', unholy.jsify_node(i)) for i in node.targets]
+    output = []
+    for i in node.targets:
+        output.append(unholy.JSStatement('delete ', (yield i)))
+    return output
+
+
+@ensure_typecheck
+def jsify_scope_declaration(node: typing.Union[ast.Global, ast.Nonlocal]) -> typing.List[unholy.Compilable]:
+    # JS functions assign variables of the enclosing scopes unless they declare them, there's nothing to translate
+    return []
+
+
+@ensure_typecheck
+def _jsify_slice_arguments(node: ast.Slice) -> typing.List[typing.Union[unholy.Compilable, str]]:
+    # the arguments of the runtime's slicing helpers after the sliced object, missing ones at the end are left out
+    parts = [node.lower, node.upper, node.step]
+    while parts and parts[-1] is None:
+        parts.pop()
+    output = []
+    for i in parts:
+        output.append(', ')
+        output.extend((yield i) if i is not None else ['null'])
+    return output
 
 
 @ensure_typecheck
 def jsify_subscript(node: ast.Subscript) -> typing.List[unholy.Compilable]:
     # value, slice, ctx,
-    v = unholy.jsify_node(node.value)
+    v = yield node.value
     # node.slice: typing.Union[ast.Slice, ast.Index]
     if isinstance(node.slice, ast.Slice):
-        raise unholy.CompilationError('Slicing is not yet implemented')
-    elif isinstance(node.slice, ast.Index):
+        if not isinstance(node.ctx, ast.Load):
+            raise unholy.CompilationError('Assigning to and deleting slices is not yet implemented')
+        # a view for slices that are only read once, see unholy.passes.SliceViews, a copy otherwise
+        helper = 'py__slice_view' if getattr(node, 'slice_view', False) else 'py__slice'
+        arguments = yield from _jsify_slice_arguments(node.slice)
+        return [unholy.JSExpression([unholy.runtime.reference(helper) + '(', *v, *arguments, ')'])]
+    elif isinstance(node.slice, ast.Index):  # Python 3.8
         return [unholy.JSExpression([
             *v,
-            *unholy.jsify_node(node.slice.value)
+            '[',
+            *(yield node.slice.value),
+            ']'
         ])]
     elif isinstance(node.slice, (ast.Constant, ast.Name)):
-        return [unholy.JSExpression([*v, '[', *unholy.jsify_node(node.slice), ']'])]
+        return [unholy.JSExpression([*v, '[', *(yield node.slice), ']'])]
     else:
         raise unholy.CompilationError(f'Unknown index type: {type(node.slice)}. No way to js-ify. Aborting')
 
@@ -102,8 +165,8 @@ def jsify_subscript(node: ast.Subscript) -> typing.List[unholy.Compilable]:
 @ensure_typecheck
 def jsify_await(node: ast.Await) -> typing.List[unholy.Compilable]:
     return [unholy.JSExpression([
-        'await',
-        *unholy.jsify_node(node.value)
+        'await ',
+        *(yield node.value)
     ])]
 
 
@@ -112,5 +175,6 @@ def jsify_num(node: ast.Num) -> typing.List[unholy.Compilable]:
     return [unholy.JSExpression([str(node.n)])]
 
 
-__all__ = ['jsify_expr', 'jsify_module', 'jsify_name', 'jsify_assign', 'jsify_await', 'jsify_constant',
-           'jsify_attribute', 'jsify_delete', 'jsify_subscript', 'jsify_num']
+__all__ = ['jsify_expr', 'jsify_module', 'module_prologue', 'jsify_name', 'jsify_assign', 'jsify_await', 'jsify_constant',
+           'jsify_attribute', 'jsify_delete', 'jsify_scope_declaration', 'jsify_subscript', 'jsify_num',
+           'module_block']
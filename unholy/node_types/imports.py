@@ -1,6 +1,7 @@
 import ast
 import typing
 
+import unholy
 # noinspection PyUnresolvedReferences
 from unholy import jsify_node
 # noinspection PyUnresolvedReferences
@@ -8,38 +9,73 @@ from unholy.classes import Compilable, JSStatement, CompilationError, JSBlock, J
 from typechecker import ensure_typecheck
 
 
+def module_specifier(name: str) -> str:
+    """
+    What the module `name` is required as. Relative imports leave out the dots, `unholy.bundle` resolves them.
+    """
+    return f'not_python/{name}.js'
+
+
+def _load(specifier: str, loading: typing.Optional[str]) -> str:
+    """
+    The expression loading a module, in ES modules `loading` tells if it's awaited or required lazily (`unholy.esm`).
+    """
+    if loading == unholy.esm.AWAIT:
+        return f'await import("{specifier}")'
+    if loading == unholy.esm.REQUIRE:
+        return f'{unholy.esm.REQUIRE_NAME}("{specifier}")'
+    return f'require("{specifier}")'
+
+
+def _import_module(name: str, specifier: str, loading: typing.Optional[str]) -> Compilable:
+    if loading == unholy.esm.STATIC:
+        return JSStatement('import * as ', [JSExpression([name]), f' from "{specifier}"'])
+    if loading is not None:
+        # declared at the start of the scope, see unholy.esm
+        return JSStatement('', [JSExpression([name]), ' = ', _load(specifier, loading)])
+    return JSStatement('const ', [JSExpression([name]), ' = ', _load(specifier, loading)])
+
+
 @ensure_typecheck
 def jsify_import_from(node: ast.ImportFrom) -> typing.List[Compilable]:
-    requires = []
-    names = node.names
-    for alias in names:
+    loading = getattr(node, 'esm_loading', None)
+    if node.module is None:
+        # `from . import a, b` imports modules
+        return [_import_module(alias.asname or alias.name, module_specifier(alias.name), loading)
+                for alias in node.names]
+    names = []
+    for alias in node.names:
         alias: ast.alias
-        requires.append(JSStatement('const ', [
-            '{ ',
-            JSExpression([alias.asname or alias.name]),
-            ' }',
-            ' = ',
-            'require(',
-            JSExpression([f'"not_python/{alias.name}.js"']),
-            ')'
-        ]))
-    return requires
+        if alias.name == '*':
+            raise CompilationError('Star imports are not supported')
+        if alias.asname is None:
+            names.append(alias.name)
+        elif loading == unholy.esm.STATIC:
+            names.append(f'{alias.name} as {alias.asname}')
+        else:
+            names.append(f'{alias.name}: {alias.asname}')
+    specifier = module_specifier(node.module)
+    if loading == unholy.esm.STATIC:
+        return [JSStatement('import ', ['{ ', JSExpression([', '.join(names)]), ' }', f' from "{specifier}"'])]
+    if loading is not None:
+        # a destructuring assignment to declared variables has to be parenthesized
+        return [JSStatement('(', ['{ ', JSExpression([', '.join(names)]), ' }', ' = ', _load(specifier, loading), ')'])]
+    # one require for all names, the module is loaded once
+    return [JSStatement('const ', [
+        '{ ',
+        JSExpression([', '.join(names)]),
+        ' }',
+        ' = ',
+        'require(',
+        JSExpression([f'"{specifier}"']),
+        ')'
+    ])]
 
 
 @ensure_typecheck
 def jsify_import(node: ast.Import) -> typing.List[Compilable]:
-    requires = []
-    names = node.names
-    for alias in names:
-        alias: ast.alias
-        requires.append(JSStatement('const ', [
-            JSExpression([alias.asname or alias.name]),
-            ' = ',
-            'require(',
-            JSExpression([f'"not_python/{alias.name}.js"']),
-            ')'
-        ]))
-    return requires
+    loading = getattr(node, 'esm_loading', None)
+    return [_import_module(alias.asname or alias.name, module_specifier(alias.name), loading) for alias in node.names]
 
 
 __all__ = ['jsify_import', 'jsify_import_from']
@@ -3,85 +3,107 @@ from typing import List
 
 # noinspection PyUnresolvedReferences
 from typechecker import ensure_typecheck
-from unholy import jsify_node
 # noinspection PyUnresolvedReferences
 from unholy.classes import Compilable, CompilationError, JSExpression
+from unholy import inference, runtime
 
 PY_TO_JS_OPERATORS = {
     ast.Mult: lambda l, r: JSExpression([
-        *jsify_node(l),
+        *l,
         '*',
-        *jsify_node(r),
+        *r,
     ]),
     ast.Div: lambda l, r: JSExpression([
-        *jsify_node(l),
+        *l,
         '/',
-        *jsify_node(r),
+        *r,
     ]),
     ast.Add: lambda l, r: JSExpression([
-        *jsify_node(l),
+        *l,
         '+',
-        *jsify_node(r),
+        *r,
     ]),
     ast.Pow: lambda l, r: JSExpression([
-        *jsify_node(l),
+        *l,
         '**',
-        *jsify_node(r),
+        *r,
     ]),
     ast.USub: lambda l, r: JSExpression([
         '-',
-        *jsify_node(l),
+        *l,
     ]),
     ast.In: lambda l, r: JSExpression([
-        '(',
-        *jsify_node(r),
-        ').contains(',
-        *jsify_node(l),
+        runtime.reference('py__contains') + '(',
+        *r,
+        ', ',
+        *l,
         ')'
     ]),
+    ast.NotIn: lambda l, r: JSExpression([
+        '!' + runtime.reference('py__contains') + '(',
+        *r,
+        ', ',
+        *l,
+        ')'
+    ]),
+}
+
+# `in` when the type of the container is known
+_NATIVE_MEMBERSHIP_TESTS = {
+    inference.LIST: lambda l, r: JSExpression(['(', *r, ').includes(', *l, ')']),
+    inference.TUPLE: lambda l, r: JSExpression(['(', *r, ').includes(', *l, ')']),
+    inference.STR: lambda l, r: JSExpression(['(', *r, ').includes(', *l, ')']),
+    inference.SET: lambda l, r: JSExpression(['(', *r, ').has(', *l, ')']),
+    # not `in`, that finds inherited properties like `toString` too
+    inference.DICT: lambda l, r: JSExpression(['Object.prototype.hasOwnProperty.call(', *r, ', ', *l, ')']),
 }
 
 
-@ensure_typecheck
-def _jsify_operator(node, left, right, node_type_name=''):
-    node_type = type(node.op)
+def _lookup_operator(node_type, node_type_name=''):
     try:
-        return [PY_TO_JS_OPERATORS[node_type](left, right)]
+        return PY_TO_JS_OPERATORS[node_type]
     except KeyError as e:
         raise CompilationError(f'no known way to compile {node_type_name}operator {node_type}') from e
 
 
+@ensure_typecheck
+def _jsify_operator(node, left, right, node_type_name=''):
+    operator = _lookup_operator(type(node.op), node_type_name)
+    left = yield left
+    right = (yield right) if right is not None else None
+    return [operator(left, right)]
+
+
 @ensure_typecheck
 def jsify_binop(node: ast.BinOp) -> List[Compilable]:
-    return _jsify_operator(node, node.left, node.right, 'binop ')
+    return (yield from _jsify_operator(node, node.left, node.right, 'binop '))
 
 
 @ensure_typecheck
 def jsify_unary(node: ast.UnaryOp) -> List[Compilable]:
-    return _jsify_operator(node, node.operand, None, 'unary ')
+    return (yield from _jsify_operator(node, node.operand, None, 'unary '))
 
 
 @ensure_typecheck
 def jsify_comparison(node: ast.Compare) -> List[Compilable]:
     # left, ops, comparators,
-    left_most = node.left
-    values = node.comparators
     out = []
-    left = left_most
-    for num, val in enumerate(values):
-        right = val
-        oper = type(node.ops[num])
-
-        try:
-            out.append(PY_TO_JS_OPERATORS[oper](left, right))
-        except KeyError as e:
-            raise CompilationError(f'no known way to compile comparison operator {oper}') from e
-
+    left = yield node.left
+    for num, val in enumerate(node.comparators):
+        operator = _lookup_operator(type(node.ops[num]), 'comparison ')
+        if isinstance(node.ops[num], (ast.In, ast.NotIn)):
+            native = _NATIVE_MEMBERSHIP_TESTS.get(inference.type_of(val))
+            if native is not None and isinstance(node.ops[num], ast.In):
+                operator = native
+            elif native is not None:
+                operator = lambda l, r, native=native: JSExpression(['!', native(l, r)])
+        right = yield val
+        out.append(operator(left, right))
         left = right
 
     new_out = []
     for i in out:
-        new_out.append(JSExpression(['&&']))
+        new_out.append('&&')
         new_out.append(i)
 
     new_out.pop(0)  # remove leading '&&'
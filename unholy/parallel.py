@@ -0,0 +1,271 @@
+"""
+Translation of one large module by several processes (`--parallel`).
+
+The module is split into runs of top-level statements with about the same number of lines, one per worker process.
+Workers parse, optimize, translate and compile their run on their own, the results are put together in source order
+with the prologue and separators the module gets when it's translated in one piece. The output is the same as
+`unholy.transpile`'s.
+
+Up to translation every top-level statement is handled on its own, like `unholy.watch` relies on too, except for the
+parts of `unholy.rename_locals` and `unholy.esm.prepare` that look at the whole module. Workers keep their optimized
+run between two rounds: the first returns what the renamer needs to know about the run, the second renames and
+translates it with what the other runs returned. ES module declarations and exports are summarized per run and
+combined at the end.
+
+Workers get the source of their run rather than its AST, unpickling the AST takes longer than parsing. Where the
+statements start is guessed from the lines, so the module isn't parsed once more up front. A guess inside a
+statement leaves the runs next to it with a syntax error, only then the module is parsed to find the statements.
+"""
+import ast
+import io
+import logging
+import multiprocessing
+import os
+import re
+import typing
+
+import typechecker
+import unholy
+from unholy.layout import Layout
+from unholy.node_types.general import module_block
+
+# modules are split into runs of at least this many lines, starting a worker takes longer than translating fewer
+MIN_RUN_LINES = 500
+# a line that can start a top-level statement, rather than continue one
+_STATEMENT_START = re.compile(r'(?!(?:else|elif|except|finally)\b)[A-Za-z_@]')
+
+# the optimized runs of the module being translated, by index
+_runs: typing.Dict[int, typing.List[ast.stmt]] = {}
+
+
+class _Compiled(unholy.Compilable):
+    """
+    Statements that were compiled separately, laid out like they were compiled as part of the block they're put in.
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def emit(self, layout: Layout, indent: int, indent_inc: int) -> None:
+        layout.write(self.text)
+
+
+def guess_cuts(lines: typing.List[str], count: int) -> typing.List[int]:
+    """
+    Splits the module `lines` into `count` runs of about the same length without parsing. Returns the indices of
+    the lines the runs after the first start at, lines that look like the start of a top-level statement. They're
+    only guesses, e.g. a line of a multi-line string can look like one, the runs have to be parsed to know.
+    """
+    cuts = []
+    for i in range(1, count):
+        line = max(len(lines) * i // count, cuts[-1] + 1 if cuts else 1)
+        while line < len(lines) and (not _STATEMENT_START.match(lines[line]) or lines[line - 1].startswith('@')):
+            line += 1
+        if line >= len(lines):
+            break
+        cuts.append(line)
+    return cuts
+
+
+def statement_cuts(body: typing.List[ast.stmt], count: int, length: int) -> typing.List[int]:
+    """
+    Like `guess_cuts`, from the parsed statements `body` of a module with `length` lines. Statements sharing a line
+    stay in the same run.
+    """
+    cuts = []
+    for stmt, following in zip(body, body[1:]):
+        start = min([following.lineno] + [i.lineno for i in getattr(following, 'decorator_list', [])]) - 1
+        if len(cuts) < count - 1 and stmt.end_lineno >= length * (len(cuts) + 1) / count and start >= stmt.end_lineno:
+            cuts.append(start)
+    return cuts
+
+
+def load_run(index: int, source: str, first_line: int,
+             filename: str) -> typing.Optional[typing.Tuple[typing.Set[str], int]]:
+    """
+    Parses and optimizes the run `index`, whose `source` starts at line `first_line` of the module. With minifying,
+    returns the names the run uses and how many short names it needs.
+    """
+    body = unholy.optimize(unholy.parse('\n' * (first_line - 1) + source, filename)).body
+    _runs[index] = body
+    if not unholy.minify.enabled:
+        return None
+    names = unholy.minify.used_names(ast.Module(body=body, type_ignores=[]))
+    return names, unholy.minify.LocalRenamer(ast.Module(body=body, type_ignores=[]), names).count()
+
+
+def translate_run(index: int, taken: typing.Optional[typing.Set[str]],
+                  skip: int) -> typing.Tuple[str, typing.Set[str], typing.Optional['unholy.esm.ModuleSummary']]:
+    """
+    Translates and compiles the run `index` loaded before. Local variables are renamed like the whole module does,
+    `taken` are the names used in all runs and `skip` the short names the runs before this one need. Returns the
+    output, the runtime helpers it uses and with ES modules the summary of the run.
+    """
+    body = _runs.pop(index)
+    if unholy.minify.enabled:
+        unholy.minify.LocalRenamer(ast.Module(body=body, type_ignores=[]), taken, skip).run()
+    summary = unholy.esm.summarize(body) if unholy.esm.enabled else None
+    helpers = unholy.runtime.collect()
+    translated = []
+    for i in body:
+        translated.extend(unholy.jsify_node(i))
+    text = unholy.JSBlock(translated, has_braces=False).compile([], minify=unholy.minify.enabled)
+    return text, helpers, summary
+
+
+def _init_worker(log_level: int, passes: typing.List[str], minify: bool, esm: bool, typecheck: dict):
+    logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(funcName)s:%(lineno)s] %(message)s', level=log_level)
+    unholy.passes.set_passes(passes)
+    unholy.minify.enabled = minify
+    unholy.esm.enabled = esm
+    typechecker.configure(**typecheck)
+
+
+def _serve(connection, initargs: tuple):
+    _init_worker(*initargs)
+    while True:
+        request = connection.recv()
+        if request is None:
+            return
+        function, args = request
+        try:
+            connection.send((True, function(*args)))
+        except Exception as e:
+            connection.send((False, e))
+
+
+class _Worker:
+    """
+    A process translating one run. Unlike in a pool, every request for a run goes to the process that loaded it.
+    """
+
+    def __init__(self, initargs: tuple):
+        self._connection, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child, initargs), daemon=True)
+        self._process.start()
+        child.close()
+
+    def submit(self, function: typing.Callable, *args):
+        self._connection.send((function, args))
+
+    def result(self):
+        try:
+            ok, value = self._connection.recv()
+        except EOFError:
+            self._process.join()
+            raise RuntimeError(f'The worker translating a run exited with {self._process.exitcode}') from None
+        if not ok:
+            raise value
+        return value
+
+    def close(self):
+        try:
+            self._connection.send(None)
+        except OSError:
+            pass  # it's gone already
+        self._process.join(1)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._connection.close()
+
+
+class _Local:
+    """
+    Runs the requests for a run in this process instead, for a single job.
+    """
+
+    def __init__(self):
+        self._result = None
+
+    def submit(self, function: typing.Callable, *args):
+        try:
+            self._result = (True, function(*args))
+        except Exception as e:
+            self._result = (False, e)
+
+    def result(self):
+        ok, value = self._result
+        if not ok:
+            raise value
+        return value
+
+    def close(self):
+        pass
+
+
+def _load(workers: list, lines: typing.List[str], cuts: typing.List[int], filename: str) -> list:
+    starts = [0, *cuts]
+    for index, (worker, start, end) in enumerate(zip(workers, starts, [*cuts, len(lines)])):
+        worker.submit(load_run, index, ''.join(lines[start:end]), start + 1, filename)
+    results = []
+    error = None
+    for i in workers[:len(starts)]:
+        try:
+            results.append(i.result())
+        except SyntaxError as e:
+            # the others are read anyway, the workers are loaded again
+            error = error or e
+    if error is not None:
+        raise error
+    return results
+
+
+def transpile(code: str, filename: str = 'eval.py', jobs: typing.Optional[int] = None,
+              cache: 'typing.Optional[unholy.TranspileCache]' = None, log_level: int = logging.WARNING) -> str:
+    """
+    Transpiles `code` like `unholy.transpile`, with the top-level statements split between `jobs` worker processes.
+    Modules shorter than `MIN_RUN_LINES` are translated in this process.
+    """
+    if cache is not None:
+        key = cache.key(code)
+        result = cache.get(code, key)
+        if result is not None:
+            return result
+
+    lines = io.StringIO(code, newline='').readlines()
+    count = max(1, min(jobs or os.cpu_count() or 1, len(lines) // MIN_RUN_LINES))
+    if count == 1:
+        workers = [_Local()]
+    else:
+        initargs = (log_level, unholy.passes.enabled_passes, unholy.minify.enabled, unholy.esm.enabled,
+                    typechecker.settings())
+        workers = [_Worker(initargs) for _ in range(count)]
+    try:
+        cuts = guess_cuts(lines, count)
+        try:
+            loaded = _load(workers, lines, cuts, filename)
+        except SyntaxError:
+            # a guess was wrong or the code is, parsing it all tells which
+            cuts = statement_cuts(unholy.parse(code, filename).body, count, len(lines))
+            loaded = _load(workers, lines, cuts, filename)
+
+        taken = set().union(*(i[0] for i in loaded)) if unholy.minify.enabled else None
+        skip = 0
+        for index, worker in enumerate(workers[:len(loaded)]):
+            worker.submit(translate_run, index, taken, skip)
+            if unholy.minify.enabled:
+                skip += loaded[index][1]
+        translated = [i.result() for i in workers[:len(loaded)]]
+    finally:
+        for i in workers:
+            i.close()
+        _runs.clear()
+
+    helpers = set()
+    body = []
+    for text, used, _ in translated:
+        helpers.update(used)
+        if text:
+            body.append(_Compiled(text))
+    tree = ast.Module(body=[], type_ignores=[])
+    if unholy.esm.enabled:
+        tree = unholy.esm.finish(tree, unholy.esm.combine(i[2] for i in translated))
+    result = module_block(tree, helpers, body).compile([], minify=unholy.minify.enabled)
+
+    if cache is not None:
+        cache.put(code, result, key)
+    return result
+
+
+__all__ = ['transpile', 'guess_cuts', 'statement_cuts', 'load_run', 'translate_run', 'MIN_RUN_LINES']
@@ -0,0 +1,382 @@
+"""
+Optimization passes, run on the Python AST between parsing and translation.
+
+Which passes run is decided by `enabled_passes`, which is part of the cache key.
+"""
+import ast
+import operator
+import typing
+
+from .inference import TypeInference
+
+# JS numbers are doubles, folding must not produce integers that can't be represented exactly
+_MAX_SAFE_INTEGER = 2 ** 53
+_MAX_FOLDED_STRING = 1024
+# nodes without children worth walking into
+_LEAVES = {ast.Name, ast.Constant}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPERATORS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Not: operator.not_,
+}
+_COMPARISON_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+def _foldable(value) -> bool:
+    if isinstance(value, bool):
+        return True
+    if isinstance(value, int):
+        return abs(value) <= _MAX_SAFE_INTEGER
+    if isinstance(value, float):
+        return value == value and abs(value) != float('inf')
+    if isinstance(value, str):
+        return len(value) <= _MAX_FOLDED_STRING
+    return False
+
+
+def _constant(node) -> bool:
+    return isinstance(node, ast.Constant) and _foldable(node.value)
+
+
+class Pass:
+    """
+    Base of the optimization passes.
+
+    Like with `ast.NodeTransformer`, `visit_<NodeType>` methods return what replaces the node: the node itself, a new
+    one, a list of nodes (statements only) or None to remove it. Unlike there, the children are always replaced
+    before their parent is visited and the tree is walked with an explicit stack, the input can be as deep as the
+    parser allows.
+
+    `run_passes` runs several passes in one walk, which is what `optimize` does. Every node gets visited by all of
+    them in order once its children are done, the same as running the passes one after another.
+    """
+
+    def run(self, tree: ast.AST):
+        return run_passes([self], tree)
+
+
+def run_passes(passes: typing.List[Pass], tree: ast.AST):
+    """
+    Runs `passes` over `tree` in a single walk, see `Pass`.
+    """
+    if not passes:
+        return tree
+    visited = {name[len('visit_'):] for i in passes for name in dir(i) if name.startswith('visit_')}
+    # (node, parent, field, index in the field or None), parents before their children and earlier siblings before
+    # later ones, only nodes some pass visits
+    found = []
+    # a node is pushed with where it is only if it's visited, leaves no pass visits aren't pushed at all
+    stack = [(tree, None, None, None)]
+    push = stack.append
+    while stack:
+        entry = stack.pop()
+        if entry.__class__ is tuple:
+            found.append(entry)
+            node = entry[0]
+        else:
+            node = entry
+        for field in reversed(node._fields):
+            value = getattr(node, field, None)
+            if value.__class__ is list:
+                for index in range(len(value) - 1, -1, -1):
+                    i = value[index]
+                    if i.__class__.__name__ in visited:
+                        push((i, node, field, index))
+                    elif isinstance(i, ast.AST) and i.__class__ not in _LEAVES:
+                        push(i)
+            elif value.__class__.__name__ in visited:
+                push((value, node, field, None))
+            elif isinstance(value, ast.AST) and value._fields and value.__class__ not in _LEAVES:  # not contexts either
+                push(value)
+
+    # Backwards, every node comes after its children. Later siblings are replaced first, replacing a node by a list
+    # doesn't move the ones still to come.
+    result = tree
+    for node, parent, field, index in reversed(found):
+        replacement = node
+        for i in passes:
+            visitor = getattr(i, 'visit_' + replacement.__class__.__name__, None)
+            if visitor is not None:
+                replacement = visitor(replacement)
+                if replacement is None or replacement.__class__ is list:
+                    break
+        if replacement is node:
+            continue
+        if parent is None:
+            result = replacement
+        elif index is not None:
+            if replacement.__class__ is not list:
+                replacement = [] if replacement is None else [replacement]
+            getattr(parent, field)[index:index + 1] = replacement
+        elif replacement is None:
+            delattr(parent, field)
+        else:
+            setattr(parent, field, replacement)
+    return result
+
+
+class ConstantFolding(Pass):
+    """
+    Evaluates arithmetic, comparisons and boolean operations on literals, with Python semantics.
+    """
+
+    def _replace(self, node, func, *args):
+        try:
+            value = func(*args)
+        except (ArithmeticError, TypeError, ValueError):
+            return node
+        if not _foldable(value):
+            return node
+        return ast.copy_location(ast.Constant(value=value), node)
+
+    def visit_BinOp(self, node: ast.BinOp):
+        func = _BINARY_OPERATORS.get(type(node.op))
+        if func is None or not _constant(node.left) or not _constant(node.right):
+            return node
+        # don't spend time building huge values that won't be folded anyway
+        if isinstance(node.op, (ast.Pow, ast.Mult)) and any(
+                type(i.value) is int and abs(i.value) > _MAX_FOLDED_STRING for i in (node.left, node.right)):
+            return node
+        return self._replace(node, func, node.left.value, node.right.value)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp):
+        func = _UNARY_OPERATORS.get(type(node.op))
+        if func is None or not _constant(node.operand):
+            return node
+        return self._replace(node, func, node.operand.value)
+
+    def visit_Compare(self, node: ast.Compare):
+        operands = [node.left, *node.comparators]
+        if not all(_constant(i) for i in operands):
+            return node
+        if not all(type(i) in _COMPARISON_OPERATORS for i in node.ops):
+            return node
+
+        def compare(*values):
+            return all(_COMPARISON_OPERATORS[type(op)](values[i], values[i + 1]) for i, op in enumerate(node.ops))
+
+        return self._replace(node, compare, *(i.value for i in operands))
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        if not all(_constant(i) for i in node.values):
+            return node
+        value = node.values[0].value
+        for i in node.values[1:]:
+            if isinstance(node.op, ast.And) and not value or isinstance(node.op, ast.Or) and value:
+                break
+            value = i.value
+        return ast.copy_location(ast.Constant(value=value), node)
+
+
+def _has_yield(statements: typing.List[ast.stmt]) -> bool:
+    """
+    Checks if `statements` contain a `yield` of the function they're in, not of one nested in them.
+    """
+    stack = list(statements)
+    while stack:
+        i = stack.pop()
+        if isinstance(i, (ast.Yield, ast.YieldFrom)):
+            return True
+        if not isinstance(i, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            stack.extend(ast.iter_child_nodes(i))
+    return False
+
+
+class DeadBranchElimination(Pass):
+    """
+    Replaces `if` statements with a constant condition by the branch that is taken. A branch with a `yield` is kept
+    even if it never runs, it makes the function a generator.
+    """
+
+    def visit_If(self, node: ast.If):
+        if not isinstance(node.test, ast.Constant):
+            return node
+        taken, removed = (node.body, node.orelse) if node.test.value else (node.orelse, node.body)
+        if _has_yield(removed):
+            return node
+        return taken
+
+
+class RangeFor(ast.For):
+    """
+    A `for` loop over `range()` whose step is known at compile time. `start` and `end` are expressions, `step` is an
+    int.
+    """
+    _fields = ast.For._fields + ('start', 'end', 'step')
+
+
+def _literal_step(node) -> typing.Optional[int]:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        step = _literal_step(node.operand)
+        return -step if step is not None else None
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return node.value
+    return None
+
+
+def _range_bounds(target: ast.expr, call: ast.expr) -> typing.Optional[typing.Tuple[ast.expr, ast.expr, int]]:
+    """
+    The start, end and step of a loop over `call` if it's `range()` with a literal step and the loop assigns a variable.
+    """
+    if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id == 'range'):
+        return None
+    if call.keywords or not 1 <= len(call.args) <= 3 or not isinstance(target, ast.Name):
+        return None
+    if len(call.args) == 1:
+        start, end, step = ast.Constant(value=0), call.args[0], 1
+    else:
+        start, end = call.args[:2]
+        step = _literal_step(call.args[2]) if len(call.args) == 3 else 1
+    if not step:
+        return None  # not a literal, or zero which has to fail at runtime
+    return start, end, step
+
+
+class RangeSpecialization(Pass):
+    """
+    Turns `for i in range(...)` with a literal step into a `RangeFor`, which is translated into a plain counting loop
+    instead of one that checks the direction of the step on every iteration. The `for` clauses of comprehensions are
+    marked with `range_bounds`, (start, end, step), instead.
+    """
+
+    def visit_For(self, node: ast.For):
+        bounds = _range_bounds(node.target, node.iter)
+        if bounds is None:
+            return node
+        start, end, step = bounds
+        return ast.copy_location(RangeFor(target=node.target, iter=node.iter, body=node.body, orelse=node.orelse,
+                                          type_comment=node.type_comment, start=start, end=end, step=step), node)
+
+    def visit_comprehension(self, node: ast.comprehension):
+        bounds = _range_bounds(node.target, node.iter)
+        if bounds is not None and not node.is_async:
+            node.range_bounds = bounds
+        return node
+
+
+# builtins that read what they're given once and don't keep it
+_CONSUMING_BUILTINS = ('len', 'sum')
+# builtins that can't change a list whatever they're given
+_HARMLESS_BUILTINS = ('print', 'len')
+
+
+def _is_slice(node) -> bool:
+    return isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice) and isinstance(node.ctx, ast.Load)
+
+
+def _cannot_change(name: str, nodes: typing.List[ast.AST]) -> bool:
+    """
+    Checks that `nodes` can't change the variable `name`: they use it only as `name[...]`, don't call anything but
+    `_HARMLESS_BUILTINS`, don't store into subscripts or attributes (of an alias, say) and don't let other code run
+    with `yield` or `await`.
+    """
+    indexed = set()
+    for node in (i for root in nodes for i in ast.walk(root)):
+        if isinstance(node, (ast.Subscript, ast.Attribute)) and not isinstance(node.ctx, ast.Load):
+            return False
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+            indexed.add(id(node.value))
+        elif isinstance(node, ast.Name) and node.id == name and id(node) not in indexed:
+            return False
+        elif isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name)
+                                                 and node.func.id in _HARMLESS_BUILTINS):
+            return False
+        elif isinstance(node, (ast.Yield, ast.YieldFrom, ast.Await)):
+            return False
+    return True
+
+
+class SliceViews(Pass):
+    """
+    Marks slices with a `slice_view` attribute if the result is only iterated, measured or searched. These are
+    translated into views of the sliced object instead of copies.
+
+    A view sees changes made to the sliced object while it's used, so a slice iterated by a loop is only marked if
+    it's of a variable the loop doesn't touch except for indexing it, and the loop can't get to the object another
+    way: through a function it calls or an alias it stores into. Like with type inference, builtins are assumed not
+    to be replaced.
+    """
+
+    def _mark_iterated(self, iterable, body: typing.List[ast.AST]):
+        if _is_slice(iterable) and isinstance(iterable.value, ast.Name) and _cannot_change(iterable.value.id, body):
+            iterable.slice_view = True
+
+    def visit_For(self, node: ast.For):
+        self._mark_iterated(node.iter, [node.target, *node.body])
+        return node
+
+    def _visit_comprehension(self, node):
+        parts = [getattr(node, i) for i in ('elt', 'key', 'value') if hasattr(node, i)]
+        for generator in node.generators:
+            parts.extend((generator.target, *generator.ifs))
+        for index, generator in enumerate(node.generators):
+            self._mark_iterated(generator.iter, parts + [i.iter for i in node.generators[index + 1:]])
+        return node
+
+    # generator expressions run later, anything could happen to the sliced object before that
+    visit_ListComp = visit_SetComp = visit_DictComp = _visit_comprehension
+
+    def visit_Compare(self, node: ast.Compare):
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)) and _is_slice(comparator):
+                comparator.slice_view = True
+        return node
+
+    def visit_Call(self, node: ast.Call):
+        if isinstance(node.func, ast.Name) and node.func.id in _CONSUMING_BUILTINS and len(node.args) == 1 \
+                and not node.keywords and _is_slice(node.args[0]):
+            node.args[0].slice_view = True
+        return node
+
+
+# in the order they run, all of them have a `run(tree)` method
+PASSES: typing.Dict[str, type] = {
+    'fold': ConstantFolding,
+    'dead-if': DeadBranchElimination,
+    'range': RangeSpecialization,
+    'views': SliceViews,
+    'types': TypeInference,
+}
+enabled_passes: typing.List[str] = list(PASSES)
+
+
+def set_passes(names: typing.Iterable[str]):
+    global enabled_passes
+    names = set(names)
+    unknown = names - set(PASSES)
+    if unknown:
+        raise ValueError(f'Unknown optimization passes: {", ".join(sorted(unknown))}')
+    enabled_passes = [i for i in PASSES if i in names]
+
+
+def optimize(tree: ast.Module) -> ast.Module:
+    """
+    Runs the enabled passes over `tree`, modifying it in place. The `Pass`es share one walk over the tree, the others
+    run after it.
+    """
+    passes = [PASSES[name]() for name in enabled_passes]
+    tree = run_passes([i for i in passes if isinstance(i, Pass)], tree)
+    for i in passes:
+        if not isinstance(i, Pass):
+            tree = i.run(tree)
+    return tree
+
+
+__all__ = ['RangeFor', 'optimize']
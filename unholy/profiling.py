@@ -0,0 +1,182 @@
+import json
+import time
+import tracemalloc
+import types
+import typing
+
+import unholy
+
+
+class _NodeStats:
+    __slots__ = ('calls', 'cumulative', 'self_time', 'active')
+
+    def __init__(self):
+        self.calls = 0
+        self.cumulative = 0.0
+        self.self_time = 0.0
+        self.active = 0  # recursion depth, nested calls of the same type aren't counted into cumulative time twice
+
+
+class _PhaseStats:
+    __slots__ = ('time', 'peak_memory')
+
+    def __init__(self, time_: float, peak_memory: typing.Optional[int]):
+        self.time = time_
+        self.peak_memory = peak_memory
+
+
+class Profiler:
+    """
+    Collects timings of a transpilation: per phase (parse, optimize, jsify, compile) and per translated AST node type.
+
+    The profiler only hooks into `unholy.jsify_node` while it is installed (`with profiler:`), when it isn't there is
+    no overhead at all. If `trace_memory` is set, peak memory of every phase is recorded with tracemalloc, which slows
+    everything down noticeably; the times are still comparable with each other.
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.phases: typing.Dict[str, _PhaseStats] = {}
+        self.nodes: typing.Dict[str, _NodeStats] = {}
+        self._stack: typing.List[list] = []  # [stats, start time, time spent in children] of unfinished nodes
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uninstall()
+
+    def install(self):
+        if unholy.functions._profiler is self:
+            return
+        unholy.functions._profiler = self
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def uninstall(self):
+        if unholy.functions._profiler is not self:
+            return
+        unholy.functions._profiler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _enter(self, node):
+        stats = self.nodes.get(type(node).__name__)
+        if stats is None:
+            stats = self.nodes[type(node).__name__] = _NodeStats()
+        stats.active += 1
+        start = time.perf_counter()
+        try:
+            value = unholy.functions.translate_node(node)
+        except BaseException:
+            stats.active -= 1
+            raise
+        if isinstance(value, types.GeneratorType):
+            self._stack.append([stats, start, 0.0])
+        else:
+            self._exit(stats, start, 0.0)
+        return value
+
+    def _exit(self, stats: _NodeStats, start: float, children: float):
+        elapsed = time.perf_counter() - start
+        stats.active -= 1
+        stats.calls += 1
+        stats.self_time += elapsed - children
+        if not stats.active:
+            stats.cumulative += elapsed
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def drive(self, node):
+        """
+        Same as `unholy.jsify_node`, but records the time spent translating every node.
+        """
+        depth = len(self._stack)
+        stack = []
+        try:
+            value = self._enter(node)
+            while True:
+                if isinstance(value, types.GeneratorType):
+                    stack.append(value)
+                    value = None
+                elif not stack:
+                    return value
+
+                while True:
+                    try:
+                        child = stack[-1].send(value)
+                        break
+                    except StopIteration as e:
+                        stack.pop()
+                        self._exit(*self._stack.pop())
+                        if not stack:
+                            return e.value
+                        value = e.value
+                value = self._enter(child)
+        finally:
+            while len(self._stack) > depth:  # translation failed, unwind
+                self._stack.pop()[0].active -= 1
+
+    def phase(self, name: str, func: typing.Callable, *args, **kwargs):
+        """
+        Runs `func(*args, **kwargs)` and records it as the phase `name`.
+        """
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # Python 3.8 has no reset_peak, clearing the traces resets the peak too
+            getattr(tracemalloc, 'reset_peak', tracemalloc.clear_traces)()
+            base, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        peak = None
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            peak -= base
+        self.phases[name] = _PhaseStats(elapsed, peak)
+        return result
+
+    def transpile(self, code: str, filename: str = 'eval.py') -> str:
+        """
+        Transpiles `code` like `unholy.transpile`, recording every phase.
+        """
+        with self:
+            tree = self.phase('parse', unholy.parse, code, filename)
+            tree = self.phase('optimize', unholy.optimize, tree)
+            result = self.phase('jsify', unholy.jsify_node, tree)
+            return self.phase('compile', result[0].compile, [])
+
+    def as_dict(self) -> dict:
+        return {
+            'phases': {
+                name: {'time': i.time, 'peak_memory': i.peak_memory} for name, i in self.phases.items()
+            },
+            'nodes': {
+                name: {'calls': i.calls, 'cumulative_time': i.cumulative, 'self_time': i.self_time}
+                for name, i in sorted(self.nodes.items(), key=lambda x: -x[1].self_time) if i.calls
+            }
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=4)
+
+    def report(self) -> str:
+        lines = [f'{"phase":<24} {"time [ms]":>12} {"peak memory [KiB]":>18}']
+        for name, i in self.phases.items():
+            memory = f'{i.peak_memory / 1024:.1f}' if i.peak_memory is not None else '-'
+            lines.append(f'{name:<24} {i.time * 1000:>12.3f} {memory:>18}')
+
+        lines.append('')
+        lines.append(f'{"node type":<24} {"calls":>12} {"cumulative [ms]":>18} {"self [ms]":>12} '
+                     f'{"self/call [us]":>15}')
+        for name, i in self.as_dict()['nodes'].items():
+            lines.append(f'{name:<24} {i["calls"]:>12} {i["cumulative_time"] * 1000:>18.3f} '
+                         f'{i["self_time"] * 1000:>12.3f} {i["self_time"] / i["calls"] * 1e6:>15.2f}')
+        return '\n'.join(lines)
+
+
+__all__ = ['Profiler']
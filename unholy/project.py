@@ -0,0 +1,154 @@
+import concurrent.futures
+import glob
+import logging
+import os
+import time
+import typing
+
+import typechecker
+import unholy
+
+_worker_cache: typing.Optional['unholy.TranspileCache'] = None
+_worker_source_maps = False
+
+
+class FileResult:
+    def __init__(self, source: str, output: str, size: int, error: typing.Optional[str] = None):
+        self.source = source
+        self.output = output
+        self.size = size
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ProjectSummary:
+    def __init__(self, results: typing.List[FileResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def failures(self) -> typing.List[FileResult]:
+        return [i for i in self.results if not i.ok]
+
+    def __str__(self):
+        size = sum(i.size for i in self.results)
+        elapsed = self.elapsed or 1e-9
+        return (f'Transpiled {len(self.results) - len(self.failures)}/{len(self.results)} files '
+                f'({size / 1e6:.2f} MB) in {self.elapsed:.2f}s: {len(self.results) / elapsed:.1f} files/s, '
+                f'{size / 1e6 / elapsed:.2f} MB/s')
+
+
+def is_project_input(path: str) -> bool:
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def collect_sources(paths: typing.List[str]) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Expands directories and globs into a list of (source path, path relative to the output directory).
+    """
+    output = []
+    for path in paths:
+        if os.path.isdir(path):
+            base = path
+            found = glob.glob(os.path.join(glob.escape(path), '**', '*.py'), recursive=True)
+        elif glob.has_magic(path):
+            base = _glob_base(path)
+            found = glob.glob(path, recursive=True)
+        else:
+            base = os.path.dirname(path)
+            found = [path]
+
+        for i in sorted(found):
+            if os.path.isfile(i):
+                output.append((i, os.path.relpath(i, base or '.')))
+    return output
+
+
+def _glob_base(pattern: str) -> str:
+    parts = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts)
+
+
+def output_path(relative: str, output_dir: str) -> str:
+    root, _ = os.path.splitext(relative)
+    return os.path.join(output_dir, root + '.js')
+
+
+def _init_worker(cache_dir: typing.Optional[str], cache_size: int, log_level: int, passes: typing.List[str],
+                 source_maps: bool = False, minify: bool = False, inline_runtime: bool = False,
+                 esm: bool = False, typecheck: typing.Optional[dict] = None):
+    global _worker_cache, _worker_source_maps
+    _worker_source_maps = source_maps
+    logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(funcName)s:%(lineno)s] %(message)s', level=log_level)
+    unholy.passes.set_passes(passes)
+    unholy.minify.enabled = minify
+    unholy.runtime.inline = inline_runtime
+    unholy.esm.enabled = esm
+    if typecheck is not None:
+        typechecker.configure(**typecheck)
+    if cache_dir:
+        _worker_cache = unholy.TranspileCache(cache_dir, cache_size)
+
+
+def transpile_file(source: str, output: str) -> FileResult:
+    try:
+        with open(source, encoding='utf-8') as f:
+            code = f.read()
+    except OSError as e:
+        return FileResult(source, output, 0, f'{type(e).__name__}: {e}')
+
+    size = len(code.encode('utf-8', 'surrogatepass'))
+    try:
+        source_map = unholy.sourcemap.for_output(source, output, code) if _worker_source_maps else None
+        result = unholy.transpile(code, source, cache=_worker_cache, source_map=source_map)
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        unholy.sourcemap.write_output(output, result, source_map)
+    except Exception as e:
+        logging.debug('Failed to transpile %s', source, exc_info=True)
+        return FileResult(source, output, size, f'{type(e).__name__}: {e}')
+    return FileResult(source, output, size)
+
+
+def transpile_project(paths: typing.List[str], output_dir: str, jobs: typing.Optional[int] = None,
+                      cache_dir: typing.Optional[str] = None, cache_size: int = unholy.cache.DEFAULT_CACHE_SIZE,
+                      log_level: int = logging.WARNING, on_result: typing.Optional[typing.Callable] = None,
+                      source_maps: bool = False) -> ProjectSummary:
+    """
+    Transpiles every Python file found in `paths` into `output_dir`, mirroring the directory structure. With
+    `source_maps`, every output file gets a source map next to it.
+
+    Files are spread across `jobs` worker processes. A file that fails to transpile is reported in the summary and
+    doesn't stop the others.
+    """
+    sources = collect_sources(paths)
+    jobs = jobs or os.cpu_count() or 1
+    results = []
+    start = time.perf_counter()
+    initargs = (cache_dir, cache_size, log_level, unholy.passes.enabled_passes, source_maps,
+                unholy.minify.enabled, unholy.runtime.inline, unholy.esm.enabled, typechecker.settings())
+    if jobs == 1 or len(sources) <= 1:
+        _init_worker(*initargs)
+        for source, relative in sources:
+            results.append(transpile_file(source, output_path(relative, output_dir)))
+            if on_result:
+                on_result(results[-1])
+    else:
+        with concurrent.futures.ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(transpile_file, source, output_path(relative, output_dir))
+                       for source, relative in sources]
+            for future in concurrent.futures.as_completed(futures):
+                results.append(future.result())
+                if on_result:
+                    on_result(results[-1])
+    return ProjectSummary(results, time.perf_counter() - start)
+
+
+__all__ = ['transpile_project', 'transpile_file', 'collect_sources', 'is_project_input', 'ProjectSummary',
+           'FileResult']
@@ -0,0 +1,151 @@
+"""
+The JS runtime (`not_python/unholy_js.js`) and which of its helpers a module uses.
+
+Translators refer to helpers through `reference`, which records them while a module is translated. The module then
+only loads the runtime if it needs it. With `inline`, the helpers and whatever they depend on are copied into the
+output instead, so the module doesn't load anything. They're wrapped in a function, only `unholy_js` is added to the
+module's scope, the same name the required runtime is assigned to.
+"""
+import functools
+import os
+import re
+import typing
+
+RUNTIME_DIR = os.path.join(os.path.dirname(__file__), '..', 'not_python')
+RUNTIME_FILES = ('common.js', 'unholy_js.js')
+NAME = 'unholy_js'
+REQUIRE = f'const {NAME} = require("./not_python/unholy_js.js")'
+# the runtime is a CommonJS module, its default export is `module.exports`
+IMPORT = f'import {NAME} from "./not_python/unholy_js.js"'
+
+# set from the command line, part of the cache key
+inline = False
+
+_PREFIX = NAME + '.'
+_DECLARATION = re.compile(r'(?:class|const|let|function\*?) +([A-Za-z_$][\w$]*)')
+_EXPORT = re.compile(r' +([A-Za-z_$][\w$]*)(?:: *([A-Za-z_$][\w$]*))?,?')
+_IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+
+# helpers referenced by the module being translated
+_used: typing.Set[str] = set()
+
+
+def collect() -> typing.Set[str]:
+    """
+    Starts recording the helpers referenced from now on, the returned set is filled while translating.
+    """
+    global _used
+    _used = set()
+    return _used
+
+
+def reference(name: str) -> str:
+    """
+    The JS expression for the runtime helper `name`.
+    """
+    _used.add(name)
+    return _PREFIX + name
+
+
+def record(expression: str):
+    """
+    Records the helper an expression like `unholy_js.py__iter` refers to, e.g. one from `PY_TO_JS_NAMES`.
+    """
+    if expression.startswith(_PREFIX):
+        _used.add(expression[len(_PREFIX):].split('.', 1)[0])
+
+
+class Runtime:
+    """
+    The top-level declarations of the runtime files, in the order they're defined, and what they depend on.
+    """
+
+    def __init__(self, sources: typing.Iterable[str]):
+        self.declarations: typing.Dict[str, str] = {}
+        self.exports: typing.Dict[str, str] = {}
+        for source in sources:
+            self._parse(source)
+        names = set(self.declarations)
+        self.dependencies = {
+            name: (set(_IDENTIFIER.findall(text)) & names) - {name} for name, text in self.declarations.items()
+        }
+
+    def _parse(self, source: str):
+        lines = source.split('\n')
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            if line.startswith('module.exports = {'):
+                i += 1
+                while not lines[i].startswith('}'):
+                    match = _EXPORT.match(lines[i])
+                    if match:
+                        self.exports[match.group(1)] = match.group(2) or match.group(1)
+                    i += 1
+                continue
+            match = _DECLARATION.match(line)
+            if match is None or 'require(' in line:
+                i += 1
+                continue
+            start = i
+            if not line.rstrip().endswith(';'):
+                i += 1
+                while not lines[i].startswith(('}', ')')):
+                    i += 1
+            self.declarations[match.group(1)] = '\n'.join(lines[start:i + 1])
+            i += 1
+
+    def inline(self, helpers: typing.Iterable[str]) -> str:
+        """
+        A statement assigning an object with `helpers` to `unholy_js`, defining only the declarations they need.
+        """
+        helpers = sorted(helpers)
+        try:
+            needed = {self.exports[i] for i in helpers}
+        except KeyError as e:
+            raise ValueError(f'Unknown runtime helper: {e.args[0]}') from None
+        stack = list(needed)
+        while stack:
+            for i in self.dependencies[stack.pop()] - needed:
+                needed.add(i)
+                stack.append(i)
+        body = [text for name, text in self.declarations.items() if name in needed]
+        exports = ', '.join(i if self.exports[i] == i else f'{i}: {self.exports[i]}' for i in helpers)
+        return f'const {NAME} = (() => {{\n' + '\n'.join(body) + f'\nreturn {{{exports}}};\n}})()'
+
+
+@functools.lru_cache(maxsize=None)
+def load() -> Runtime:
+    sources = []
+    for name in RUNTIME_FILES:
+        with open(os.path.join(RUNTIME_DIR, name), encoding='utf-8') as f:
+            sources.append(f.read())
+    return Runtime(sources)
+
+
+@functools.lru_cache(maxsize=None)
+def fingerprint() -> str:
+    """
+    A hash of the runtime files, inlined output depends on them.
+    """
+    import hashlib  # only needed with a cache and --inline-runtime
+
+    h = hashlib.sha256()
+    for name in RUNTIME_FILES:
+        with open(os.path.join(RUNTIME_DIR, name), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def prologue(helpers: typing.Optional[typing.Iterable[str]] = None, esm: bool = False) -> typing.List[str]:
+    """
+    The statements making `helpers` available as `unholy_js.<name>`. Without `helpers` the whole runtime is loaded,
+    with `esm` by an import declaration.
+    """
+    if helpers is None:
+        return [IMPORT if esm else REQUIRE]
+    if not helpers:
+        return []
+    if inline:
+        return [load().inline(helpers)]
+    return [IMPORT if esm else REQUIRE]
@@ -0,0 +1,374 @@
+"""
+A long running transpiler for build tools (`--serve`), so they don't start Python and import the transpiler for every
+file.
+
+Requests and responses are JSON objects, one per line, over stdin and stdout or over the connections to a Unix socket.
+A request is
+
+    {"id": 1, "source": "print(1)", "filename": "main.py", "options": {"minify": true}}
+
+and gets back `{"id": 1, "ok": true, "js": "..."}`, plus `"map"` with the `source_map` option, or
+`{"id": 1, "ok": false, "error": {"type": "...", "message": "...", "line": ..., "column": ...}}`. Responses are
+written as soon as they're done, not in the order of the requests, `id` is copied from the request to tell them apart.
+`{"type": "stats"}` returns counters, `{"type": "shutdown"}` stops the server once the requests it has are answered.
+
+Requests are translated by a pool of worker processes. Results are kept in memory, a request repeating a previous one
+is answered without translating, and with `cache_dir` the workers share an on-disk `TranspileCache`.
+"""
+import collections
+import concurrent.futures
+import concurrent.futures.process
+import hashlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+import typing
+
+import typechecker
+import unholy
+
+# option -> default, the module-level flags every request sets
+OPTIONS = {
+    'passes': None,
+    'minify': False,
+    'inline_runtime': False,
+    'esm': False,
+    'source_map': False,
+}
+DEFAULT_MEMORY_CACHE_SIZE = 4096
+
+_worker_cache: typing.Optional['unholy.TranspileCache'] = None
+
+
+def _init_worker(cache_dir: typing.Optional[str], cache_size: int, log_level: int, typecheck: dict):
+    global _worker_cache
+    logging.basicConfig(format='%(asctime)s [%(levelname)s] [%(funcName)s:%(lineno)s] %(message)s', level=log_level)
+    typechecker.configure(**typecheck)
+    if cache_dir:
+        _worker_cache = unholy.TranspileCache(cache_dir, cache_size)
+
+
+def _configure(options: dict):
+    unknown = set(options) - set(OPTIONS)
+    if unknown:
+        raise ValueError(f'Unknown options: {", ".join(sorted(unknown))}')
+    options = {**OPTIONS, **options}
+    passes = options['passes']
+    unholy.passes.set_passes(unholy.passes.PASSES if passes is None else passes)
+    unholy.minify.enabled = bool(options['minify'])
+    unholy.runtime.inline = bool(options['inline_runtime'])
+    unholy.esm.enabled = bool(options['esm'])
+
+
+def error_response(error: BaseException) -> dict:
+    """
+    The structured description of a failed request.
+    """
+    result = {'type': type(error).__name__, 'message': str(error)}
+    if isinstance(error, SyntaxError):
+        result['message'] = error.msg
+        result['line'] = error.lineno
+        result['column'] = error.offset
+    return result
+
+
+def transpile_request(source: str, filename: str, options: dict) -> typing.Tuple[dict, float, typing.Optional[dict]]:
+    """
+    Runs one transpile request in a worker. Returns the response without its id, the time it took and the worker's
+    cache counters.
+    """
+    start = time.perf_counter()
+    try:
+        _configure(options)
+        source_map = None
+        if options.get('source_map'):
+            source_map = unholy.SourceMap(filename, source_content=source,
+                                          line_offset=unholy.minify.header().count('\n'))
+        response = {'ok': True, 'js': unholy.transpile(source, filename, cache=_worker_cache, source_map=source_map)}
+        if source_map is not None:
+            response['map'] = source_map.as_dict()
+    except Exception as e:
+        logging.debug('Failed to transpile %s', filename, exc_info=True)
+        response = {'ok': False, 'error': error_response(e)}
+    stats = _worker_cache.stats.as_dict() if _worker_cache is not None else None
+    return response, time.perf_counter() - start, stats
+
+
+class ServerStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.memory_hits = 0
+        self.transpile_time = 0.0
+        # pid -> the latest counters of its on-disk cache
+        self.worker_caches: typing.Dict[int, dict] = {}
+
+    def as_dict(self) -> dict:
+        cache = collections.Counter()
+        for i in self.worker_caches.values():
+            cache.update(i)
+        return {
+            'uptime': time.monotonic() - self.started,
+            'requests': self.requests,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'memory_hits': self.memory_hits,
+            'transpile_time': self.transpile_time,
+            'cache': dict(cache),
+        }
+
+
+class Server:
+    """
+    Answers requests read from any number of streams, see the module's docstring. With `jobs` 1 requests are
+    translated in the server's process, one at a time, also when several threads serve streams.
+    """
+
+    def __init__(self, jobs: typing.Optional[int] = None, cache_dir: typing.Optional[str] = None,
+                 cache_size: int = unholy.cache.DEFAULT_CACHE_SIZE, log_level: int = logging.WARNING,
+                 memory_cache_size: int = DEFAULT_MEMORY_CACHE_SIZE):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.stats = ServerStats()
+        self.memory_cache_size = memory_cache_size
+        self._memory: typing.OrderedDict[str, dict] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.shutdown_requested = threading.Event()
+        # the options are module-level flags, requests translated in this process take turns
+        self._transpile_lock = threading.Lock()
+        self._initargs = (cache_dir, cache_size, log_level, typechecker.settings())
+        if self.jobs == 1:
+            _init_worker(*self._initargs)
+            self._pool = None
+        else:
+            self._pool = self._new_pool()
+
+    def _new_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(self.jobs, initializer=_init_worker, initargs=self._initargs)
+
+    def _restart_pool(self, broken: concurrent.futures.ProcessPoolExecutor):
+        """
+        Replaces the pool `broken` after one of its workers died, unless that was done already. A broken pool
+        doesn't take any more requests.
+        """
+        with self._lock:
+            if self._pool is not broken:
+                return
+            self._pool = self._new_pool()
+        logging.warning('A worker died, restarted the worker processes')
+        broken.shutdown(wait=False)
+
+    def close(self):
+        """
+        Waits for the requests being translated and stops the workers.
+        """
+        with self._lock:
+            self._idle.wait_for(lambda: not self.stats.in_flight)
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def serve_stream(self, reader: typing.TextIO, writer: typing.TextIO):
+        """
+        Answers the requests read from `reader` until it ends or the server is shut down.
+        """
+        write_lock = threading.Lock()
+
+        def respond(response: dict):
+            line = json.dumps(response) + '\n'
+            with write_lock:
+                writer.write(line)
+                writer.flush()
+
+        pending = []
+        for line in reader:
+            if line.strip():
+                answered = self.handle(line, respond)
+                if answered is not None:
+                    pending = [i for i in pending if not i.done()]
+                    pending.append(answered)
+            if self.shutdown_requested.is_set():
+                break
+        # the writer may be closed once this returns
+        concurrent.futures.wait(pending)
+
+    def handle(self, line: str, respond: typing.Callable[[dict], None]) -> typing.Optional[concurrent.futures.Future]:
+        """
+        Answers the request `line` through `respond`. If that happens later, returns a future which is done then.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('A request has to be a JSON object')
+        except ValueError as e:
+            respond({'id': None, 'ok': False, 'error': error_response(e)})
+            return None
+        request_id = request.get('id')
+        kind = request.get('type', 'transpile')
+        if kind == 'stats':
+            with self._lock:
+                respond({'id': request_id, 'ok': True, 'stats': self.stats.as_dict()})
+        elif kind == 'shutdown':
+            self.shutdown_requested.set()
+            respond({'id': request_id, 'ok': True})
+        elif kind == 'transpile':
+            return self._transpile(request_id, request, respond)
+        else:
+            respond({'id': request_id, 'ok': False,
+                     'error': {'type': 'ValueError', 'message': f'Unknown request type: {kind}'}})
+        return None
+
+    def _transpile(self, request_id, request: dict,
+                   respond: typing.Callable[[dict], None]) -> typing.Optional[concurrent.futures.Future]:
+        source = request.get('source')
+        options = request.get('options') or {}
+        if not isinstance(source, str) or not isinstance(options, dict):
+            with self._lock:
+                self.stats.requests += 1
+                self.stats.errors += 1
+            respond({'id': request_id, 'ok': False, 'error': {
+                'type': 'ValueError', 'message': 'A transpile request needs a "source" string and "options" object'
+            }})
+            return None
+        filename = request.get('filename') or 'eval.py'
+        # the output doesn't depend on the file name, only source maps and errors mention it
+        key = hashlib.sha256(json.dumps([sorted({**OPTIONS, **options}.items()),
+                                         filename if options.get('source_map') else None,
+                                         source]).encode('utf-8', 'surrogatepass')).hexdigest()
+        with self._lock:
+            self.stats.requests += 1
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+            else:
+                self.stats.in_flight += 1
+        if cached is not None:
+            respond({'id': request_id, **cached})
+            return None
+        answered = concurrent.futures.Future()
+
+        def done(result: typing.Tuple[dict, float, typing.Optional[dict]], pid: int):
+            response, elapsed, cache_stats = result
+            with self._lock:
+                self.stats.in_flight -= 1
+                self.stats.transpile_time += elapsed
+                if cache_stats is not None:
+                    self.stats.worker_caches[pid] = cache_stats
+                if response['ok']:
+                    self._memory[key] = response
+                    if len(self._memory) > self.memory_cache_size:
+                        self._memory.popitem(last=False)
+                else:
+                    self.stats.errors += 1
+                self._idle.notify_all()
+            respond({'id': request_id, **response})
+            answered.set_result(None)
+
+        if self._pool is None:
+            with self._transpile_lock:
+                result = transpile_request(source, filename, options)
+            done(result, os.getpid())
+            return None
+        pool = self._pool
+        try:
+            future = pool.submit(_run_in_worker, source, filename, options)
+        except concurrent.futures.process.BrokenProcessPool as e:
+            # a worker died since the last request was submitted
+            self._restart_pool(pool)
+            done(({'ok': False, 'error': error_response(e)}, 0.0, None), 0)
+            return None
+
+        def finished(f: concurrent.futures.Future):
+            try:
+                result, pid = f.result()
+            except Exception as e:
+                # the worker died, e.g. killed by the OS
+                if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+                    self._restart_pool(pool)
+                result, pid = ({'ok': False, 'error': error_response(e)}, 0.0, None), 0
+            done(result, pid)
+
+        future.add_done_callback(finished)
+        return answered
+
+
+def _run_in_worker(source: str, filename: str, options: dict):
+    return transpile_request(source, filename, options), os.getpid()
+
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+    server: '_UnixServer'
+
+    def handle(self):
+        reader = (line.decode('utf-8', 'surrogateescape') for line in self.rfile)
+        self.server.transpiler.serve_stream(reader, _BinaryWriter(self.wfile))
+        if self.server.transpiler.shutdown_requested.is_set():
+            # shutdown() waits for serve_forever, which runs in another thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class _BinaryWriter:
+    def __init__(self, stream: typing.BinaryIO):
+        self._stream = stream
+
+    def write(self, text: str):
+        self._stream.write(text.encode('utf-8', 'surrogatepass'))
+
+    def flush(self):
+        self._stream.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, transpiler: Server):
+        self.transpiler = transpiler
+        super().__init__(path, _SocketHandler)
+
+
+def serve(server: Server, socket_path: typing.Optional[str] = None):
+    """
+    Answers requests from stdin, or from the connections to the Unix socket at `socket_path`, until the input ends or
+    a shutdown request comes in.
+    """
+    try:
+        if socket_path is None:
+            server.serve_stream(sys.stdin, sys.stdout)
+            return
+        _remove_stale_socket(socket_path)
+        with _UnixServer(socket_path, server) as listener:
+            try:
+                listener.serve_forever()
+            finally:
+                os.unlink(socket_path)
+    finally:
+        server.close()
+
+
+def _remove_stale_socket(path: str):
+    """
+    Removes the socket a server that's gone left behind at `path`.
+    """
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return  # binding fails, the error tells what's wrong
+    except FileNotFoundError:
+        return
+    with socket.socket(socket.AF_UNIX) as s:
+        try:
+            s.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise OSError(f'{path} is used by a running server')
+
+
+__all__ = ['Server', 'serve', 'transpile_request', 'OPTIONS']
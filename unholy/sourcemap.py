@@ -0,0 +1,155 @@
+"""
+Source maps (version 3) of the transpiled output, so that debuggers and profilers show the Python source.
+
+Translated code remembers where it came from (`origin`) while a source map is being built. When the output is laid
+out, `Layout.mark` is called wherever code of a different origin starts and the mapping is VLQ encoded right away.
+Columns are counted in characters, not UTF-16 code units, which only matters for lines with characters outside the
+BMP.
+"""
+import json
+import os
+import typing
+
+from . import minify
+
+_BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+
+def encode_vlq(value: int) -> str:
+    """
+    Encodes a number as a base64 VLQ, as used by the `mappings` of source maps.
+    """
+    encoded = _VLQ.get(value)
+    if encoded is not None:
+        return encoded
+    remaining = (-value << 1) | 1 if value < 0 else value << 1
+    digits = []
+    while True:
+        digit = remaining & 31
+        remaining >>= 5
+        if remaining:
+            digits.append(_BASE64[digit | 32])
+        else:
+            digits.append(_BASE64[digit])
+            return ''.join(digits)
+
+
+# most deltas are small, their encodings are looked up
+_VLQ: typing.Dict[int, str] = {}
+_VLQ.update((i, encode_vlq(i)) for i in range(-1024, 1025))
+
+
+class SourceMap:
+    """
+    A source map of one generated file translated from one source file.
+
+    `line_offset` is the number of lines written before the output of the transpiler, e.g. by `START_COMMENT`.
+    """
+
+    def __init__(self, source: str, file: typing.Optional[str] = None, source_content: typing.Optional[str] = None,
+                 line_offset: int = 0):
+        self.source = source
+        self.file = file
+        self.source_content = source_content
+        self.line_offset = line_offset
+
+        self._parts = [';' * line_offset]
+        # the last encoded segment, mappings are relative to it
+        self._line = line_offset
+        self._column = 0
+        self._source_line = 0
+        self._source_column = 0
+        self._line_has_segment = False
+        # kept back in case an inner expression starts at the same position
+        self._pending: typing.Optional[typing.Tuple[int, int, int, int]] = None
+
+    def add(self, line: int, column: int, source_line: int, source_column: int):
+        """
+        Maps the generated position `line`:`column` to the source position, everything 0-based. Positions have to be
+        added in the order the output is written.
+        """
+        line += self.line_offset
+        pending = self._pending
+        if pending is not None and (pending[1] != column or pending[0] != line):
+            self._encode(*pending)
+        self._pending = (line, column, source_line, source_column)
+
+    def _encode(self, line: int, column: int, source_line: int, source_column: int):
+        if line != self._line:
+            self._parts.append(';' * (line - self._line))
+            self._line = line
+            self._column = 0
+            separator = ''
+        elif self._line_has_segment:
+            if source_line == self._source_line and source_column == self._source_column:
+                return  # continues the previous segment
+            separator = ','
+        else:
+            separator = ''
+        vlq = _VLQ
+        delta = column - self._column
+        segment = vlq.get(delta) or encode_vlq(delta)
+        delta = source_line - self._source_line
+        segment += 'A' + (vlq.get(delta) or encode_vlq(delta))
+        delta = source_column - self._source_column
+        self._parts.append(separator + segment + (vlq.get(delta) or encode_vlq(delta)))
+        self._column = column
+        self._source_line = source_line
+        self._source_column = source_column
+        self._line_has_segment = True
+
+    @property
+    def mappings(self) -> str:
+        if self._pending is not None:
+            self._encode(*self._pending)
+            self._pending = None
+        return ''.join(self._parts)
+
+    def as_dict(self) -> dict:
+        result = {
+            'version': 3,
+            'sources': [self.source],
+            'names': [],
+            'mappings': self.mappings,
+        }
+        if self.file is not None:
+            result['file'] = self.file
+        if self.source_content is not None:
+            result['sourcesContent'] = [self.source_content]
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict())
+
+
+def for_output(source: str, output: str, code: str) -> SourceMap:
+    """
+    Creates the source map of the file `output`, translated from `code` read from `source` and written after
+    `minify.header()`.
+    """
+    return SourceMap(os.path.relpath(source, os.path.dirname(os.path.abspath(output))).replace(os.sep, '/'),
+                     file=os.path.basename(output), source_content=code, line_offset=minify.header().count('\n'))
+
+
+def url_comment(output: str) -> str:
+    """
+    The comment at the end of `output` which tells where its source map is.
+    """
+    return f'\n//# sourceMappingURL={os.path.basename(output)}.map\n'
+
+
+def write_output(output: str, result: str, source_map: typing.Optional[SourceMap] = None):
+    """
+    Writes transpiled code into `output`. A source map is written next to it, as `output` + '.map'.
+    """
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(minify.header())
+        f.write(result)
+        if source_map is not None:
+            f.write(url_comment(output))
+    if source_map is not None:
+        with open(output + '.map', 'w', encoding='utf-8') as f:
+            f.write(source_map.to_json())
+
+
+__all__ = ['SourceMap', 'encode_vlq']
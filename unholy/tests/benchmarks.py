@@ -0,0 +1,52 @@
+import unittest
+from unittest import TestCase
+
+import unholy
+from benchmarks import corpus, scaling
+
+
+class CorpusTests(TestCase):
+    def test_every_axis_transpiles(self):
+        for axis in corpus.AXES:
+            for value in (0, 1, 3):
+                with self.subTest(axis=axis, value=value):
+                    unholy.transpile(corpus.scaled(axis, value))
+
+    def test_axes_scale_the_output(self):
+        for axis in corpus.AXES:
+            with self.subTest(axis=axis):
+                self.assertLess(len(corpus.scaled(axis, 2)), len(corpus.scaled(axis, 4)))
+
+
+class ScalingTests(TestCase):
+    def test_fit_exponent(self):
+        values = [10, 20, 40, 80]
+        self.assertAlmostEqual(scaling.fit_exponent(values, [3 * i for i in values]), 1.0)
+        self.assertAlmostEqual(scaling.fit_exponent(values, [i ** 2 for i in values]), 2.0)
+
+    def test_compare(self):
+        def results(wall, exponent=1.0):
+            return {'axes': {'chain': {'exponent': exponent, 'points': [
+                {'value': 1, 'wall': wall, 'peak_memory': 100, 'phases': {'jsify': wall}},
+            ]}}}
+
+        self.assertEqual(scaling.compare(results(1.0), results(1.0)), [])
+        self.assertEqual(scaling.compare(results(1.2), results(1.0)), [])
+        self.assertEqual(len(scaling.compare(results(2.0), results(1.0))), 2)
+        self.assertEqual(len(scaling.compare(results(1.0, exponent=2.0), None)), 1)
+        # too short to tell
+        self.assertEqual(scaling.compare(results(0.001), results(0.0001)), [])
+
+    def test_merge(self):
+        first = {'points': [{'value': 1, 'wall': 2.0, 'peak_memory': 100, 'phases': {'jsify': 1.0}},
+                            {'value': 2, 'wall': 3.0, 'peak_memory': 200, 'phases': {'jsify': 2.0}}]}
+        second = {'points': [{'value': 1, 'wall': 1.0, 'peak_memory': 150, 'phases': {'jsify': 0.5}},
+                             {'value': 2, 'wall': 4.0, 'peak_memory': 100, 'phases': {'jsify': 3.0}}]}
+        merged = scaling.merge(first, second)
+        self.assertEqual([(i['wall'], i['peak_memory'], i['phases']['jsify']) for i in merged['points']],
+                         [(1.0, 100, 0.5), (3.0, 100, 2.0)])
+        self.assertAlmostEqual(merged['exponent'], scaling.fit_exponent([1, 2], [1.0, 3.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
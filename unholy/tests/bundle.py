@@ -0,0 +1,87 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.bundle import Bundle, bundle
+from unholy.tests.comprehensions import ROOT
+
+FILES = {
+    'main.py': 'from helpers import double, name\n'
+               'from pkg import tools\n'
+               'import missing\n'
+               'print(double(21))\n'
+               'print(name)\n'
+               'print(tools.triple(2))\n',
+    'helpers.py': 'from pkg.tools import triple\n'
+                  'name = "helpers"\n'
+                  'def double(x):\n'
+                  '    return triple(x) + x\n',
+    'pkg/__init__.py': '',
+    'pkg/tools.py': 'from .constants import THREE\n'
+                    'def triple(x):\n'
+                    '    return x * THREE\n',
+    'pkg/constants.py': 'THREE = 3\n',
+}
+
+
+class ImportTests(TestCase):
+    def test_one_require_per_statement(self):
+        self.assertEqual(unholy.transpile('from x import a, b as c'),
+                         'const { a, b: c } = require("not_python/x.js");')
+
+    def test_modules(self):
+        self.assertEqual(unholy.transpile('from . import a, b'),
+                         'const a = require("not_python/a.js");\nconst b = require("not_python/b.js");')
+
+    def test_star(self):
+        self.assertRaises(unholy.CompilationError, unholy.transpile, 'from x import *')
+
+
+class BundleTests(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        for name, code in FILES.items():
+            path = os.path.join(self._dir.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(code)
+        self.entry = os.path.join(self._dir.name, 'main.py')
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_graph(self):
+        bundled = Bundle(self.entry)
+        paths = [os.path.relpath(i.path, os.path.realpath(self._dir.name)) for i in bundled.modules]
+        # pkg/tools.py is imported twice but bundled once
+        self.assertEqual(paths, ['main.py', 'helpers.py', os.path.join('pkg', '__init__.py'),
+                                 os.path.join('pkg', 'tools.py'), os.path.join('pkg', 'constants.py')])
+        main = bundled.modules[0]
+        self.assertEqual(main.links, {'not_python/helpers.js': 1, 'not_python/pkg.js': 2})
+        self.assertEqual(main.submodules, {'not_python/pkg.js': {'tools': 3}})
+        self.assertEqual(bundled.modules[3].links, {'not_python/constants.js': 4})
+        self.assertEqual(bundled.modules[1].exports, ['triple', 'name', 'double'])
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = unholy.TranspileCache(directory)
+            first = bundle(self.entry, cache=cache)
+            self.assertEqual(cache.stats.misses, 5)
+            self.assertEqual(bundle(self.entry, cache=cache), first)
+            self.assertEqual(cache.stats.hits, 5)
+
+    @unittest.skipUnless(shutil.which('node'), 'node is not installed')
+    def test_run(self):
+        with open(self.entry, 'w') as f:
+            f.write(FILES['main.py'].replace('import missing\n', ''))
+        result = subprocess.run(['node', '-e', bundle(self.entry)], cwd=ROOT, capture_output=True, text=True,
+                                timeout=30, check=True)
+        self.assertEqual(result.stdout, '84\nhelpers\n6\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
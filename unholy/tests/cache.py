@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+import unholy
+from unholy.cache import TranspileCache
+
+
+class TranspileCacheTests(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.directory = self._dir.name
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_hit_and_miss(self):
+        cache = TranspileCache(self.directory)
+        first = unholy.transpile('print(1)', cache=cache)
+        second = unholy.transpile('print(1)', cache=cache)
+        self.assertEqual(first, second)
+        self.assertEqual(first, unholy.transpile('print(1)'))
+        self.assertEqual(cache.stats.as_dict(), {'hits': 1, 'misses': 1, 'stores': 1, 'evictions': 0})
+
+        unholy.transpile('print(2)', cache=cache)
+        self.assertEqual(cache.stats.misses, 2)
+
+    def test_key_depends_on_name_mapping(self):
+        cache = TranspileCache(self.directory)
+        key = cache.key('print(1)')
+        unholy.PY_TO_JS_NAMES['print'] = 'console.error'
+        try:
+            self.assertNotEqual(cache.key('print(1)'), key)
+        finally:
+            unholy.PY_TO_JS_NAMES['print'] = 'console.log'
+
+    def test_key_depends_on_sources(self):
+        # an upgrade doesn't have to change the version
+        cache = TranspileCache(self.directory)
+        key = cache.key('print(1)')
+        self.assertEqual(cache.key('print(1)'), key)
+        with mock.patch.object(unholy.cache, '_sources_fingerprint', return_value='changed'):
+            self.assertNotEqual(cache.key('print(1)'), key)
+
+    def test_lru_eviction(self):
+        cache = TranspileCache(self.directory, max_size=0)
+        cache.put('a = 1', 'a = 1')
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(cache.stats.evictions, 1)
+
+        size = len('b = 2')
+        cache = TranspileCache(self.directory, max_size=size * 2)
+        cache.put('b = 2', 'b = 2')
+        cache.put('c = 3', 'c = 3')
+        old = os.path.join(self.directory, cache.key('b = 2') + cache.SUFFIX)
+        os.utime(old, (0, 0))
+        cache.get('c = 3')
+        cache.put('d = 4', 'd = 4')
+        self.assertIsNone(cache.get('b = 2'))
+        self.assertEqual(cache.get('d = 4'), 'd = 4')
+
+    def test_eviction_scans(self):
+        # the directory is only listed when it could have grown too big
+        cache = TranspileCache(self.directory, max_size=len('x = 1') * 3)
+        with mock.patch.object(cache, 'evict', wraps=cache.evict) as evict:
+            for i in range(3):
+                cache.put(f'x = {i}', f'x = {i}')
+            self.assertEqual(evict.call_count, 1)
+            cache.put('x = 3', 'x = 3')
+            self.assertEqual(evict.call_count, 2)
+        self.assertEqual(cache.stats.evictions, 1)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+    def test_key_computed_once(self):
+        cache = TranspileCache(self.directory)
+        with mock.patch.object(cache, 'key', wraps=cache.key) as key:
+            unholy.transpile('print(1)', cache=cache)
+            unholy.transpile('print(1)', cache=cache)
+        self.assertEqual(key.call_count, 2)
+
+    def test_read_only(self):
+        cache = TranspileCache(self.directory)
+        cache.put('print(1)', 'console.log(1)')
+        with mock.patch('os.utime', side_effect=PermissionError):
+            self.assertEqual(cache.get('print(1)'), 'console.log(1)')
+        self.assertEqual(cache.stats.hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
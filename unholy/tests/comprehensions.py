@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import unittest
+from unittest import TestCase
+
+import unholy
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def _transpile(code: str) -> str:
+    return unholy.transpile(code).replace(unholy.runtime.REQUIRE + ';\n', '', 1)
+
+
+def _run(code: str, *node_options: str) -> str:
+    # the output requires the runtime relative to the working directory
+    result = subprocess.run(['node', *node_options, '-e', unholy.transpile(code)], cwd=ROOT, capture_output=True,
+                            text=True, timeout=60, check=True)
+    return result.stdout
+
+
+class ComprehensionTests(TestCase):
+    def test_list_comprehension(self):
+        self.assertEqual(_transpile('x = [i * 2 for i in a if i]'),
+                         'x = (() => {\n'
+                         '    const py__result = [];\n'
+                         '    for (const i of unholy_js.py__iter(a)) {\n'
+                         '        if (i) {\n'
+                         '            py__result.push(i*2);\n'
+                         '        }\n'
+                         '    }\n'
+                         '    return py__result;\n'
+                         '})()')
+
+    def test_nested_clauses(self):
+        code = _transpile('x = {i: j for i in a for j in b if i if j}')
+        self.assertLess(code.index('of unholy_js.py__iter(a)'), code.index('of unholy_js.py__iter(b)'))
+        self.assertEqual(code.count('if ('), 2)
+        self.assertIn('const py__result = {};', code)
+        self.assertIn('py__result[i] = j;', code)
+
+    def test_set_comprehension(self):
+        code = _transpile('x = {i for i in a}')
+        self.assertIn('const py__result = new Set();', code)
+        self.assertIn('py__result.add(i);', code)
+
+    def test_unpacking(self):
+        self.assertIn('for (const [k, v] of unholy_js.py__iter(a))', _transpile('x = [k for k, v in a]'))
+
+    def test_generator_expression(self):
+        # the outermost iterable is evaluated right away, the rest lazily
+        self.assertEqual(_transpile('x = (i * 2 for i in a)'),
+                         'x = (function* (py__iterable) {\n'
+                         '    for (const i of unholy_js.py__iter(py__iterable)) {\n'
+                         '        yield i*2;\n'
+                         '    }\n'
+                         '})(a)')
+
+    def test_await(self):
+        code = _transpile('async def f(a):\n    return [await g(i) for i in a]')
+        self.assertIn('return (await (async () => {\n', code)
+        self.assertIn('py__result.push(await g(i));', code)
+        self.assertIn('})());', code)
+        with self.assertRaises(unholy.CompilationError):
+            _transpile('async def f(a):\n    return (await g(i) for i in a)')
+
+    def test_generator_function(self):
+        code = _transpile('def f(a):\n    yield a\n    yield from a\n')
+        self.assertTrue(code.startswith('let f = (function* f(a) {'), code)
+        self.assertIn('yield a', code)
+        self.assertIn('yield* unholy_js.py__iter(a)', code)
+        # yield in a nested function doesn't make the outer one a generator
+        code = _transpile('def f(a):\n    def g():\n        yield a\n    return g\n')
+        self.assertTrue(code.startswith('let f = (function f(a) {'), code)
+        self.assertIn('(function* g() {', code)
+
+
+@unittest.skipUnless(shutil.which('node'), 'node is not installed')
+class ComprehensionRuntimeTests(TestCase):
+    def test_results(self):
+        code = ('def gen(n):\n'
+                '    for i in range(n):\n'
+                '        yield i\n'
+                '    yield from [n]\n'
+                'print([x * x for x in gen(3)])\n'
+                'print({k: v for k, v in [["a", 1], ["b", 2]]})\n'
+                'print({x for x in "abca"})\n')
+        self.assertEqual(_run(code), "[ 0, 1, 4, 9 ]\n{ a: 1, b: 2 }\nSet(3) { 'a', 'b', 'c' }\n")
+
+    def test_await(self):
+        code = ('async def double(x):\n'
+                '    return x * 2\n'
+                'async def f(a):\n'
+                '    return [await double(x) for x in a]\n'
+                'f([1, 2]).then(print)\n')
+        self.assertEqual(_run(code), '[ 2, 4 ]\n')
+
+    def test_constant_memory(self):
+        # an array of this many numbers doesn't fit into the heap, the pipeline has to stream
+        code = 'print(sum(y for y in (x * 2 for x in range(3000000))))'
+        self.assertEqual(_run(code, '--max-old-space-size=16'), f'{sum(x * 2 for x in range(3000000))}\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import ast
+import sys
+import unittest
+from unittest import TestCase
+
+import unholy
+
+
+class DriverTests(TestCase):
+    def test_long_chain(self):
+        terms = 5000
+        code = unholy.transpile('x = ' + ' + '.join(f'a{i}' for i in range(terms)))
+        self.assertTrue(code.endswith('x = ' + '+'.join(f'a{i}' for i in range(terms))))
+
+    def test_deep_literal(self):
+        depth = sys.getrecursionlimit() * 10
+        node = ast.Constant(value=1)
+        for _ in range(depth):
+            node = ast.List(elts=[node], ctx=ast.Load())
+        result = unholy.jsify_node(ast.Expr(value=node))
+        self.assertEqual(result[0].compile([]), '[' * depth + '1' + ', ]' * depth)
+
+    def test_unknown_node(self):
+        with self.assertRaises(unholy.CompilationError):
+            unholy.transpile('x = [1, (y := 2)]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.tests.comprehensions import ROOT
+
+MAIN = ('from helpers import double\n'
+        'print("start")\n'
+        'def load():\n'
+        '    from lazy import value\n'
+        '    return value\n'
+        'print(load())\n'
+        'print(load())\n'
+        'async def load_async():\n'
+        '    import lazy_async\n'
+        '    return lazy_async.name\n'
+        'load_async().then(print)\n'
+        'print("double"[0:double(2)])\n')
+ITEMS = ('d = {}\n'
+         'k = "a"\n'
+         'o = {}\n'
+         'def f():\n'
+         '    d[k] = 1\n'
+         '    o.x = 2\n'
+         '    a = 3\n'
+         '    return a\n'
+         'f()\n'
+         'print(d)\n'
+         'print(o.x)\n')
+# imported from node_modules/not_python, where module_specifier points
+DEPENDENCIES = {
+    'helpers.py': 'def double(x):\n'
+                  '    return x * 2\n',
+    'lazy.py': 'print("loading lazy")\n'
+               'value = 1\n'
+               'if value:\n'
+               '    from helpers import double\n',
+    'lazy_async.py': 'print("loading lazy_async")\n'
+                     'name = "async"\n',
+}
+
+
+def transpile(code: str) -> str:
+    unholy.esm.enabled = True
+    try:
+        return unholy.transpile(code)
+    finally:
+        unholy.esm.enabled = False
+
+
+class ESMTests(TestCase):
+    def test_static_imports(self):
+        self.assertEqual(transpile('import os\nfrom x import a, b as c\nfrom . import m'),
+                         'import * as os from "not_python/os.js";\n'
+                         'import { a, b as c } from "not_python/x.js";\n'
+                         'import * as m from "not_python/m.js";')
+
+    def test_exports(self):
+        result = transpile('x = 1\ndef f():\n    global y\n    y = 2\n    return x')
+        self.assertTrue(result.startswith('let x, y;\n'), result)
+        self.assertTrue(result.endswith('\nexport { f, x, y };'), result)
+
+    def test_assigned_items(self):
+        # only read, declaring them in the function would hide the module's variables
+        result = transpile(ITEMS)
+        self.assertIn('\n    let a;\n', result)
+        self.assertTrue(result.endswith('\nexport { f, d, k, o };'), result)
+        self.assertIn('\n    let a, b, c;\n', transpile('def f():\n    [a, b], c = x\n    return a'))
+
+    def test_lazy_imports(self):
+        result = transpile('def f():\n    from x import a as b\n    return b\n'
+                           'async def g():\n    import y\n    return y')
+        self.assertIn('const py__require = createRequire(import.meta.url);', result)
+        self.assertIn('    let b;\n    ({ a: b } = py__require("not_python/x.js"));', result)
+        self.assertIn('    let y;\n    y = await import("not_python/y.js");', result)
+
+    def test_module_level_lazy_import(self):
+        # not awaited, a module with top-level await can't be required by a function importing it
+        result = transpile('if y:\n    import x')
+        self.assertIn('const py__require = createRequire(import.meta.url);', result)
+        self.assertIn('x = py__require("not_python/x.js");', result)
+        self.assertNotIn('await', result)
+
+    def test_runtime_import(self):
+        self.assertTrue(transpile('print(x[1:2])').startswith(unholy.runtime.IMPORT + ';\n'))
+
+    def test_cache_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = unholy.TranspileCache(directory)
+            key = cache.key('x = 1')
+            unholy.esm.enabled = True
+            try:
+                self.assertNotEqual(cache.key('x = 1'), key)
+            finally:
+                unholy.esm.enabled = False
+
+    @unittest.skipUnless(shutil.which('node'), 'node is not installed')
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copytree(os.path.join(ROOT, 'not_python'), os.path.join(directory, 'not_python'))
+            modules = os.path.join(directory, 'node_modules', 'not_python')
+            os.makedirs(modules)
+            for path in (directory, modules):
+                with open(os.path.join(path, 'package.json'), 'w') as f:
+                    json.dump({'type': 'module'}, f)
+            for name, code in DEPENDENCIES.items():
+                with open(os.path.join(modules, name[:-3] + '.js'), 'w') as f:
+                    f.write(transpile(code))
+            with open(os.path.join(directory, 'main.js'), 'w') as f:
+                f.write(transpile(MAIN))
+            with open(os.path.join(directory, 'items.js'), 'w') as f:
+                f.write(transpile(ITEMS))
+            result = subprocess.run(['node', 'main.js'], cwd=directory, capture_output=True, text=True, timeout=30)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            # the lazy modules are only loaded, once, when the functions importing them run. `import()` is
+            # asynchronous, the module finishes first
+            self.assertEqual(result.stdout, 'start\nloading lazy\n1\n1\ndoub\nloading lazy_async\nasync\n')
+            result = subprocess.run(['node', 'items.js'], cwd=directory, capture_output=True, text=True, timeout=30)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(result.stdout, '{ a: 1 }\n2\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import ast
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy import inference
+
+
+def _types(code: str) -> dict:
+    """
+    Returns the types inferred for the variables loaded in the first function of `code`.
+    """
+    tree = unholy.optimize(unholy.parse(code))
+    return {i.id: i.inferred_type for i in ast.walk(tree.body[0]) if hasattr(i, 'inferred_type')}
+
+
+class InferenceTests(TestCase):
+    def test_literals_and_arguments(self):
+        types = _types('def f(a: int, b: str, c, d: typing.List[int]):\n'
+                       '    e = [1]\n'
+                       '    g = 1.5\n'
+                       '    return a, b, c, d, e, g, h\n')
+        self.assertEqual(types, {'a': 'int', 'b': 'str', 'c': None, 'd': 'list', 'e': 'list', 'g': 'float'})
+
+    def test_joins_assignments(self):
+        types = _types('def f(x):\n'
+                       '    a = 0\n'
+                       '    a = a + 1\n'
+                       '    b = 0\n'
+                       '    b = "s"\n'
+                       '    c: int = x\n'
+                       '    for i in range(x):\n'
+                       '        d = c * i\n'
+                       '    return a, b, c, d, i\n')
+        self.assertEqual(types, {'x': None, 'a': 'int', 'b': None, 'c': 'int', 'd': 'int', 'i': 'int'})
+
+    def test_unknown_bindings(self):
+        types = _types('def f():\n'
+                       '    a = 1\n'
+                       '    a, b = 1, 2\n'
+                       '    c = 1\n'
+                       '    def g():\n'
+                       '        nonlocal c\n'
+                       '        c = "s"\n'
+                       '    range = list\n'
+                       '    d = range(3)\n'
+                       '    return a, b, c, d\n')
+        self.assertEqual(types, {'a': None, 'b': None, 'c': None, 'range': None, 'd': None})
+
+    def test_module_level_isnt_typed(self):
+        tree = unholy.optimize(unholy.parse('a = [1]\nprint(a)\n'))
+        self.assertFalse(any(hasattr(i, 'inferred_type') for i in ast.walk(tree)))
+        self.assertEqual(inference.type_of(ast.parse('[1] + [2]', mode='eval').body), 'list')
+
+
+class NativeOutputTests(TestCase):
+    def test_for(self):
+        self.assertIn('for (const x of xs)', unholy.transpile('def f(xs: list):\n    for x in xs:\n        print(x)'))
+        self.assertIn('for (const x of Object.keys(d))',
+                      unholy.transpile('def f():\n    d = {}\n    for x in d:\n        print(x)'))
+        self.assertIn('unholy_js.py__iter(xs)', unholy.transpile('def f(xs):\n    for x in xs:\n        print(x)'))
+
+    def test_in(self):
+        self.assertIn('(xs).includes(1)', unholy.transpile('def f(xs: list):\n    return 1 in xs'))
+        self.assertIn('!(xs).has(1)', unholy.transpile('def f(xs: set):\n    return 1 not in xs'))
+        self.assertIn('unholy_js.py__contains(xs, 1)', unholy.transpile('def f(xs):\n    return 1 in xs'))
+        self.assertIn('!Object.prototype.hasOwnProperty.call(d, k)',
+                      unholy.transpile('def f(k):\n    d = {}\n    return k not in d'))
+
+    def test_format(self):
+        self.assertIn('${String(s).padStart(5, " ")}', unholy.transpile('def f(s: str):\n    return f"{s:>5}"'))
+        self.assertIn('${String(n).padEnd(3, "*")}', unholy.transpile('def f(n: int):\n    return f"{n:*<3}"'))
+        self.assertIn('${(x).toFixed(2)}', unholy.transpile('def f(x: float):\n    return f"{x:.2f}"'))
+        self.assertIn('py__format(n, `^5`)', unholy.transpile('def f(n: int):\n    return f"{n:^5}"'))
+        self.assertIn('py__format(x, `>5`)', unholy.transpile('def f(x):\n    return f"{x:>5}"'))
+
+    def test_disabled(self):
+        passes = list(unholy.passes.enabled_passes)
+        try:
+            unholy.passes.set_passes([i for i in passes if i != 'types'])
+            self.assertIn('py__iter(xs)', unholy.transpile('def f(xs: list):\n    for x in xs:\n        print(x)'))
+        finally:
+            unholy.passes.set_passes(passes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import ast
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy import interning
+
+
+class InterningTests(TestCase):
+    def setUp(self):
+        interning.clear()
+
+    def tearDown(self):
+        interning.max_size = 65536
+        interning.clear()
+
+    def test_shared_leaves(self):
+        self.assertIs(interning.name('x'), interning.name('x'))
+        self.assertIs(interning.constant('a'), interning.constant('a'))
+        chain = ast.parse('self.items.append').body[0].value
+        self.assertIs(interning.attribute_chain(chain), interning.attribute_chain(chain))
+        self.assertEqual(interning.attribute_chain(chain).others, ['self.items.append'])
+        self.assertIsNone(interning.attribute_chain(ast.parse('f().x').body[0].value))
+
+    def test_equal_constants_of_different_types(self):
+        self.assertEqual([interning.constant(i).others[0] for i in (1, True, 1.0, 0.0, -0.0)],
+                         ['1', 'true', '1.0', '0.0', '-0.0'])
+
+    def test_output(self):
+        code = 'def f(a):\n    return a.b.c + a.b.c\nprint(f(x), f(x), len(x.y))\n'
+        interning.enabled = False
+        try:
+            expected = unholy.transpile(code)
+        finally:
+            interning.enabled = True
+        self.assertEqual(unholy.transpile(code), expected)
+        # the second run only hits the table, the runtime helper is still loaded
+        self.assertEqual(unholy.transpile(code), expected)
+        self.assertIn('unholy_js.py__len', expected)
+        self.assertTrue(expected.startswith(unholy.runtime.REQUIRE))
+
+    def test_shared_text(self):
+        first, second = (unholy.JSExpression(['total', ' = ', 'a']) for _ in range(2))
+        self.assertIs(first.others[0], second.others[0])
+
+    def test_origins_are_not_shared(self):
+        shared = interning.name('a')
+        unholy.transpile('a\na', source_map=unholy.SourceMap('eval.py'))
+        self.assertIsNone(shared.origin)
+        self.assertIs(interning.name('a'), shared)
+
+    def test_bounded(self):
+        interning.max_size = 4
+        for i in range(10):
+            interning.name(f'x{i}')
+        self.assertLessEqual(len(interning._table), 4)
+        interning.clear()
+        self.assertFalse(interning._table)
+
+
+if __name__ == '__main__':
+    unittest.main()
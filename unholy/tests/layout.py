@@ -0,0 +1,79 @@
+import ast
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.classes import INDENT, JSBlock, JSExpression, JSStatement
+
+
+class _CountingWriter:
+    def __init__(self):
+        self.calls = 0
+        self.chars = 0
+        self.parts = []
+
+    def write(self, text):
+        self.calls += 1
+        self.chars += len(text)
+        self.parts.append(text)
+
+
+def _nested_ifs(depth: int) -> ast.Module:
+    body = [ast.Expr(value=ast.Call(func=ast.Name(id='print', ctx=ast.Load()), args=[ast.Constant(value=depth)],
+                                    keywords=[]))]
+    for i in range(depth):
+        body = [ast.If(test=ast.Name(id=f'cond_{i}', ctx=ast.Load()), body=body, orelse=[])]
+    return ast.Module(body=body, type_ignores=[])
+
+
+class LayoutTests(TestCase):
+    def test_nested_indentation(self):
+        code = unholy.jsify_node(_nested_ifs(3))[0].compile([])
+        lines = code.split('\n')
+        self.assertEqual(lines[0], 'if (cond_2) {')
+        self.assertEqual(lines[1], INDENT + 'if (cond_1) {')
+        self.assertEqual(lines[2], INDENT * 2 + 'if (cond_0) {')
+        self.assertEqual(lines[3], INDENT * 3 + 'console.log(3)')
+        self.assertEqual(lines[4], INDENT * 2 + '}')
+        self.assertEqual(lines[-1], '}')
+
+    def test_force_concat(self):
+        code = JSBlock([
+            JSStatement('let f = (function f()', has_semicolon=False),
+            JSBlock([JSStatement('return 1')]),
+            JSStatement(')', force_concat=True)
+        ], has_braces=False).compile([])
+        self.assertEqual(code, f'let f = (function f() {{\n{INDENT}return 1;\n}});')
+
+    def test_lines_ref_brace(self):
+        lines = ['if (a)']
+        self.assertEqual(JSBlock([JSStatement('b()')]).compile(lines, 0), f'{INDENT}b();\n}}')
+        self.assertEqual(lines, ['if (a) {'])
+
+        lines = ['a();']
+        self.assertEqual(JSBlock([JSStatement('b()')]).compile(lines, 0), f'{{\n{INDENT}b();\n}}')
+        self.assertEqual(lines, ['a();'])
+
+    def test_block_in_expression(self):
+        code = JSStatement('const f = ', [
+            JSExpression(['() =>', JSBlock([JSStatement('return 1')])])
+        ]).compile([])
+        self.assertEqual(code, f'const f = () => {{\n{INDENT}return 1;\n}};')
+
+    def test_nested_if_chain_is_linear(self):
+        measurements = {}
+        for depth in (100, 200):
+            tree = unholy.jsify_node(_nested_ifs(depth))[0]
+            writer = _CountingWriter()
+            tree.compile_to(writer, [])
+            # every character of the output is produced exactly once, nothing is re-split or re-indented
+            code = tree.compile([])
+            self.assertEqual(writer.chars, len(code))
+            self.assertEqual(''.join(writer.parts), code)
+            measurements[depth] = writer.calls
+
+        self.assertLess(measurements[200] / measurements[100], 2.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import ast
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.project import transpile_project
+from unholy.tests.comprehensions import ROOT
+
+
+def _names(code: str) -> set:
+    tree = unholy.rename_locals(ast.parse(code))
+    return {i.id for i in ast.walk(tree) if isinstance(i, ast.Name)} | {i.arg for i in ast.walk(tree)
+                                                                        if isinstance(i, ast.arg)}
+
+
+class MinifyTests(TestCase):
+    def setUp(self):
+        unholy.minify.enabled = True
+
+    def tearDown(self):
+        unholy.minify.enabled = False
+
+    def test_locals(self):
+        self.assertEqual(_names('def f(first, *rest):\n    total = first\n    return total\n'),
+                         {'a', 'b', 'c'})
+
+    def test_module_names_are_kept(self):
+        names = _names('exported = 1\n'
+                       'def f(argument):\n'
+                       '    return exported + len(argument) + print\n')
+        self.assertEqual(names, {'exported', 'len', 'print', 'a'})
+
+    def test_global_and_imports(self):
+        names = _names('def f():\n'
+                       '    global counter\n'
+                       '    import helpers\n'
+                       '    counter = helpers.value\n')
+        self.assertEqual(names, {'counter', 'helpers'})
+
+    def test_nested_functions(self):
+        tree = unholy.rename_locals(ast.parse('def f(value):\n'
+                                              '    def g():\n'
+                                              '        nonlocal value\n'
+                                              '        other = value\n'
+                                              '    return g\n'))
+        outer = tree.body[0]
+        inner = outer.body[0]
+        self.assertEqual(outer.name, 'f')
+        self.assertEqual(outer.args.args[0].arg, 'a')
+        self.assertEqual(inner.name, 'b')
+        self.assertEqual([i.id for i in ast.walk(inner) if isinstance(i, ast.Name)], ['c', 'a'])
+
+    def test_no_clashes(self):
+        # `a` is used at module level, `in` and `do` are reserved in JS
+        names = _names('a = 1\n'
+                       'def f(' + ', '.join(f'v{i}' for i in range(300)) + '):\n'
+                       '    return a\n')
+        self.assertNotIn('in', names)
+        self.assertNotIn('do', names)
+        self.assertEqual(len(names), 301)
+
+    def test_layout(self):
+        code = unholy.transpile('def f(value):\n    for i in range(3):\n        print(value)\n    return value\n')
+        self.assertNotIn('\n', code)
+        self.assertEqual(code, 'let f = (function f(a){for (let b = 0; b < 3; b++){console.log(a);};return a;});')
+
+    def test_disabled(self):
+        unholy.minify.enabled = False
+        self.assertIn('\n    ', unholy.transpile('def f(value):\n    return value\n'))
+
+    def test_cache_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = unholy.TranspileCache(directory)
+            key = cache.key('x = 1')
+            unholy.minify.enabled = False
+            self.assertNotEqual(cache.key('x = 1'), key)
+
+    def test_project(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'src')
+            os.makedirs(source)
+            for name in ('a.py', 'b.py'):
+                with open(os.path.join(source, name), 'w') as f:
+                    f.write('def f(value):\n    return value\n')
+            transpile_project([source], os.path.join(directory, 'out'), jobs=2)
+            with open(os.path.join(directory, 'out', 'a.js')) as f:
+                self.assertEqual(f.read(), unholy.transpile('def f(value):\n    return value\n'))
+
+    @unittest.skipUnless(shutil.which('node'), 'node is not installed')
+    def test_same_results(self):
+        code = ('def gen(limit):\n'
+                '    total = 0\n'
+                '    def add(item):\n'
+                '        return item + total\n'
+                '    for index in range(limit):\n'
+                '        yield add(index)\n'
+                '    yield from [add(i) for i in [0, 5] if i]\n'
+                'print([x for x in gen(3)])\n')
+        results = []
+        for minify in (False, True):
+            unholy.minify.enabled = minify
+            results.append(subprocess.run(['node', '-e', unholy.transpile(code)], cwd=ROOT, capture_output=True,
+                                          text=True, timeout=60, check=True).stdout)
+        self.assertEqual(results, ['[ 0, 1, 2, 5 ]\n'] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
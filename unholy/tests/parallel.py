@@ -0,0 +1,104 @@
+import unittest
+from unittest import TestCase, mock
+
+import unholy
+import unholy.parallel
+from benchmarks import corpus
+
+# imports and runtime helpers at the start, the end and in between the generated functions
+SOURCE = ('import os\n'
+          'from x import y\n'
+          + corpus.generate(functions=40) +
+          'items = [1, 2, 3][1:]\n'
+          'if items:\n'
+          '    import lazy\n'
+          '@decorator\n'
+          'def last(a):\n'
+          '    global items\n'
+          '    items = a[::2]\n'
+          '    return a\n')
+
+
+class SplitTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(unholy.parallel, 'MIN_RUN_LINES', 10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_guess_cuts(self):
+        lines = ['def f():\n', '    x = 1\n', '\n', '@decorator\n', 'def g():\n', '    pass\n', 'else_ = 1\n',
+                 'else:\n', '# comment\n', 'y = 2\n']
+        self.assertEqual(unholy.parallel.guess_cuts(lines, 3), [3, 6])
+        self.assertEqual(unholy.parallel.guess_cuts(lines, 20), [3, 6, 9])
+
+    def test_statement_cuts(self):
+        lines = SOURCE.splitlines(keepends=True)
+        body = unholy.parse(SOURCE).body
+        cuts = unholy.parallel.statement_cuts(body, 4, len(lines))
+        self.assertEqual(len(cuts), 3)
+        starts = {min([i.lineno] + [j.lineno for j in getattr(i, 'decorator_list', [])]) - 1 for i in body}
+        self.assertLessEqual(set(cuts), starts)
+        runs = [b - a for a, b in zip([0, *cuts], [*cuts, len(lines)])]
+        self.assertLess(max(runs), 2 * min(runs))
+
+    def test_shared_lines(self):
+        body = unholy.parse('a = 1; b = 2\n' * 40).body
+        self.assertEqual(unholy.parallel.statement_cuts(body, 4, 40), [10, 20, 30])
+
+
+class TranspileTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(unholy.parallel, 'MIN_RUN_LINES', 10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, unholy.minify, 'enabled', False)
+        self.addCleanup(setattr, unholy.esm, 'enabled', False)
+        self.addCleanup(setattr, unholy.runtime, 'inline', False)
+
+    def assertSameOutput(self, code: str, jobs: int):
+        self.assertEqual(unholy.parallel.transpile(code, jobs=jobs), unholy.transpile(code))
+
+    def test_modes(self):
+        for minify, esm, inline in ((False, False, False), (True, False, False), (False, True, True),
+                                    (True, True, False)):
+            with self.subTest(minify=minify, esm=esm, inline=inline):
+                unholy.minify.enabled = minify
+                unholy.esm.enabled = esm
+                unholy.runtime.inline = inline
+                self.assertSameOutput(SOURCE, 1)
+                self.assertSameOutput(SOURCE, 3)
+
+    def test_separators(self):
+        # statements compiled apart still get the semicolons they'd get next to each other
+        unholy.minify.enabled = True
+        with mock.patch.object(unholy.parallel, 'MIN_RUN_LINES', 1):
+            self.assertSameOutput('def f():\n    return 1\nx = 1\nif x:\n    x = 2\nprint(x)\n', 4)
+
+    def test_guesses(self):
+        with mock.patch.object(unholy.parallel, 'statement_cuts') as cuts:
+            self.assertSameOutput(SOURCE, 3)
+        cuts.assert_not_called()
+
+    def test_wrong_guesses(self):
+        # lines in strings and brackets look like statements, the module is parsed to find the real ones
+        code = ('text = """\n' + 'not_code = 1\n' * 40 + '"""\n'
+                'values = [\n' + 'item,\n' * 40 + ']\n'
+                + 'if text:\n    x = 1\nelse:\n    x = 2\n' * 20)
+        with mock.patch.object(unholy.parallel, 'statement_cuts', wraps=unholy.parallel.statement_cuts) as cuts:
+            self.assertSameOutput(code, 4)
+        cuts.assert_called_once()
+
+    def test_empty(self):
+        self.assertEqual(unholy.parallel.transpile('', jobs=2), unholy.transpile(''))
+
+    def test_errors(self):
+        self.assertRaises(SyntaxError, unholy.parallel.transpile, 'def f(:\n', jobs=2)
+        with self.assertRaises(SyntaxError) as error:
+            unholy.parallel.transpile(SOURCE + 'def f(:\n', jobs=2)
+        self.assertEqual(error.exception.lineno, SOURCE.count('\n') + 1)
+        with self.assertRaises(unholy.CompilationError):
+            unholy.parallel.transpile(SOURCE + 'from x import *\n', jobs=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import ast
+import unittest
+from unittest import TestCase
+
+import unholy
+import unholy.passes
+
+
+def _transpile(code: str) -> str:
+    return unholy.transpile(code).replace(unholy.runtime.REQUIRE + ';\n', '', 1)
+
+
+class PassesTests(TestCase):
+    def setUp(self):
+        self._passes = list(unholy.passes.enabled_passes)
+
+    def tearDown(self):
+        unholy.passes.set_passes(self._passes)
+
+    def test_constant_folding(self):
+        self.assertEqual(_transpile('x = 2 * 3 + 10 / 4'), 'x = 8.5')
+        self.assertEqual(_transpile('x = 10 - 3 - 1'), 'x = 6')
+        self.assertEqual(_transpile('x = "ab" * 2 + "c"'), 'x = "ababc"')
+        self.assertEqual(_transpile('x = not (1 < 2 < 3)'), 'x = false')
+        self.assertEqual(_transpile('x = a * (2 + 3)'), 'x = a*5')
+
+    def test_constant_folding_limits(self):
+        for code in ('x = 1 / 0', 'x = 2 ** 100', 'x = "a" * 100000', 'x = "a" + 1'):
+            with self.subTest(code=code):
+                tree = unholy.optimize(ast.parse(code))
+                self.assertIsInstance(tree.body[0].value, ast.BinOp)
+
+    def test_dead_if(self):
+        self.assertEqual(_transpile('if 1 > 2:\n    print(1)\nprint(2)'), 'console.log(2)')
+        self.assertEqual(_transpile('if 1 > 2:\n    print(1)\nelse:\n    print(3)'), 'console.log(3)')
+        self.assertEqual(_transpile('if 2 > 1:\n    print(1)'), 'console.log(1)')
+        self.assertEqual(_transpile('if a:\n    print(1)'), 'if (a) {\n    console.log(1)\n}')
+
+    def test_dead_if_yield(self):
+        # the yield that never runs still makes g a generator
+        code = 'def g():\n    if False:\n        yield 1\n    return 5'
+        self.assertIn('function* g()', _transpile(code))
+        self.assertIn('function* g()', _transpile(code.replace('if False:', 'if True:\n        x = 1\n    else:')))
+        self.assertNotIn('function*', _transpile('def g():\n    if False:\n        def h():\n            yield 1\n'
+                                                 '    return 5'))
+
+    def test_range_specialization(self):
+        self.assertEqual(_transpile('for i in range(n):\n    print(i)'),
+                         'for (let i = 0; i < n; i++) {\n    console.log(i);\n}')
+        self.assertEqual(_transpile('for i in range(10, 0, -2):\n    print(i)'),
+                         'for (let i = 10; i > 0; i -= 2) {\n    console.log(i);\n}')
+        self.assertIn('>= 0 ?', _transpile('for i in range(0, n, step):\n    print(i)'))
+        self.assertIn('>= 0 ?', _transpile('for i in range(0, n, 0):\n    print(i)'))
+
+    def test_range_comprehension(self):
+        self.assertEqual(_transpile('x = [i for i in range(10)]'),
+                         'x = (() => {\n'
+                         '    const py__result = [];\n'
+                         '    for (let i = 0; i < 10; i++) {\n'
+                         '        py__result.push(i);\n'
+                         '    }\n'
+                         '    return py__result;\n'
+                         '})()')
+        self.assertIn('for (let j = i; j > 0; j--)', _transpile('x = {j for i in a for j in range(i, 0, -1)}'))
+        # the outermost range() of a generator expression is called right away
+        self.assertIn('for (let j = 0; j < i; j++)', _transpile('x = (j for i in range(n) for j in range(i))'))
+        self.assertIn('(unholy_js.py__range(n))', _transpile('x = (j for i in range(n) for j in range(i))'))
+        unholy.passes.set_passes([])
+        self.assertIn('>= 0 ?', _transpile('x = [i for i in range(10)]'))
+
+    def test_disable_passes(self):
+        unholy.passes.set_passes([])
+        self.assertEqual(_transpile('x = 2 * 3'), 'x = 2*3')
+        self.assertIn('>= 0 ?', _transpile('for i in range(n):\n    print(i)'))
+        self.assertRaises(ValueError, unholy.passes.set_passes, ['nonexistent'])
+
+    def test_cache_key(self):
+        cache = unholy.TranspileCache.__new__(unholy.TranspileCache)
+        key = cache.key('x = 1')
+        unholy.passes.set_passes(['fold'])
+        self.assertNotEqual(cache.key('x = 1'), key)
+
+    def test_deep_input(self):
+        tree = unholy.optimize(unholy.parse('x = ' + ' + '.join(['1'] * 20000)))
+        self.assertEqual(tree.body[0].value.value, 20000)
+
+
+if __name__ == '__main__':
+    unittest.main()
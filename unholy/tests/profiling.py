@@ -0,0 +1,32 @@
+import json
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.profiling import Profiler
+
+
+class ProfilerTests(TestCase):
+    def test_profile(self):
+        expected = unholy.transpile('def f(a):\n    return a + 1\nprint(f(1) + f(2))\n')
+        # the translators are loaded now, profiling must not replace them
+        original = dict(unholy.translator_map)
+        profiler = Profiler()
+        result = profiler.transpile('def f(a):\n    return a + 1\nprint(f(1) + f(2))\n')
+
+        self.assertEqual(result, expected)
+        self.assertEqual(unholy.translator_map, original)
+        self.assertEqual(list(profiler.phases), ['parse', 'optimize', 'jsify', 'compile'])
+        self.assertEqual(profiler.nodes['Call'].calls, 3)
+        self.assertEqual(profiler.nodes['BinOp'].calls, 2)
+        module = profiler.nodes['Module']
+        self.assertAlmostEqual(module.cumulative, profiler.phases['jsify'].time, delta=profiler.phases['jsify'].time)
+        self.assertLessEqual(module.self_time, module.cumulative)
+
+        data = json.loads(profiler.to_json())
+        self.assertIn('peak_memory', data['phases']['parse'])
+        self.assertIn('FunctionDef', profiler.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import concurrent.futures
+import os
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+import typechecker
+from unholy.project import transpile_project
+
+
+class ProjectTests(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._dir.name, 'src')
+        self.output = os.path.join(self._dir.name, 'out')
+        os.makedirs(os.path.join(self.source, 'pkg'))
+        for name, code in (('main.py', 'print(1)'), ('pkg/util.py', 'x = 1'), ('pkg/broken.py', 'x = 1 <')):
+            with open(os.path.join(self.source, name), 'w') as f:
+                f.write(code)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_mirrors_tree_and_reports_failures(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                summary = transpile_project([self.source], self.output, jobs=jobs)
+                self.assertTrue(os.path.isfile(os.path.join(self.output, 'main.js')))
+                self.assertTrue(os.path.isfile(os.path.join(self.output, 'pkg', 'util.js')))
+                self.assertEqual([os.path.basename(i.source) for i in summary.failures], ['broken.py'])
+                self.assertEqual(len(summary.results), 3)
+
+    def test_glob(self):
+        summary = transpile_project([os.path.join(self.source, '**', 'u*.py')], self.output, jobs=1)
+        self.assertEqual(len(summary.results), 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.output, 'pkg', 'util.js')))
+
+    def test_worker_typecheck(self):
+        # the workers check like this process does, also where they don't inherit its state
+        self.addCleanup(typechecker.configure, **typechecker.settings())
+        typechecker.configure('sample', rate=7, on_violation='log')
+        with mock.patch.object(concurrent.futures, 'ProcessPoolExecutor',
+                               wraps=concurrent.futures.ProcessPoolExecutor) as pool:
+            transpile_project([self.source], self.output, jobs=2)
+        self.assertEqual(pool.call_args.kwargs['initargs'][-1], typechecker.settings())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import TestCase
+
+import unholy
+
+RUNTIME = os.path.join(os.path.dirname(__file__), '..', '..', 'not_python', 'unholy_js.js')
+
+
+def _node(script: str):
+    result = subprocess.run(['node', '-e', f'const unholy_js = require({json.dumps(os.path.abspath(RUNTIME))});\n'
+                                           f'console.log(JSON.stringify({script}));'],
+                            capture_output=True, text=True, timeout=30, check=True)
+    return json.loads(result.stdout)
+
+
+@unittest.skipUnless(shutil.which('node'), 'node is not installed')
+class RuntimeTests(TestCase):
+    def test_range(self):
+        cases = [(5,), (0,), (2, 7), (7, 2), (10, 0, -3), (0, 10, 4), (0, -5, -1), (-3, 3, 2)]
+        script = '[' + ', '.join(f'(() => {{const r = unholy_js.py__range({", ".join(map(str, i))}); '
+                                 f'return [[...r], r.length, [...r]];}})()' for i in cases) + ']'
+        for args, (values, length, again) in zip(cases, _node(script)):
+            with self.subTest(args=args):
+                self.assertEqual(values, list(range(*args)))
+                self.assertEqual(length, len(range(*args)))
+                self.assertEqual(again, values)
+
+    def test_range_zero_step(self):
+        self.assertEqual(_node('(() => {try {unholy_js.py__range(0, 1, 0);} catch (e) {return e.constructor.name;}})()'),
+                         'ValueError')
+
+    def test_iter(self):
+        self.assertEqual(_node('[...unholy_js.py__iter([1, 2])]'), [1, 2])
+        self.assertEqual(_node('[...unholy_js.py__iter("ab")]'), ['a', 'b'])
+        self.assertEqual(_node('[...unholy_js.py__iter({a: 1, b: 2})]'), ['a', 'b'])
+        self.assertEqual(_node('[...unholy_js.py__iter(new Set([3]))]'), [3])
+        self.assertEqual(_node('(() => {try {unholy_js.py__iter(1);} catch (e) {return e.constructor.name;}})()'),
+                         'TypeError')
+
+    def test_contains(self):
+        self.assertEqual(_node('[unholy_js.py__contains([1, 2], 2), unholy_js.py__contains("abc", "bc"), '
+                               'unholy_js.py__contains(new Set([1]), 1), unholy_js.py__contains({a: 1}, "a")]'),
+                         [True, True, True, True])
+        # keys a dict inherits from Object aren't in it
+        self.assertEqual(_node('[unholy_js.py__contains({}, "toString"), unholy_js.py__contains({}, "__proto__")]'),
+                         [False, False])
+        cases = [(0, 10, 3), (10, 0, -2), (5,)]
+        script = '[' + ', '.join(f'[...Array(14).keys()].map(i => unholy_js.py__range({", ".join(map(str, args))})'
+                                 f'.includes(i - 2))' for args in cases) + ']'
+        for args, results in zip(cases, _node(script)):
+            with self.subTest(args=args):
+                self.assertEqual(results, [i - 2 in range(*args) for i in range(14)])
+
+    def test_next(self):
+        self.assertEqual(_node('unholy_js.py__next([5][Symbol.iterator]())'), 5)
+        self.assertEqual(_node('unholy_js.py__next([][Symbol.iterator](), null)'), None)
+
+    def test_iterator(self):
+        # unlike py__iter, what iter() gives has to work with next()
+        self.assertEqual(_node('(() => {const it = unholy_js.py__iterator([1, 2]), next = unholy_js.py__next; '
+                               'return [next(it), next(it), next(it, null)];})()'),
+                         [1, 2, None])
+        self.assertEqual(_node('["ab", {a: 1}, new Map([["k", 1]]), unholy_js.py__range(2, 4)]'
+                               '.map(i => unholy_js.py__next(unholy_js.py__iterator(i)))'), ['a', 'a', 'k', 2])
+        self.assertEqual(_node('(() => {const r = unholy_js.py__iterator(unholy_js.py__range(2)); '
+                               'const a = r.next(); const b = r.next(); return [a.value, b.value];})()'), [0, 1])
+        self.assertEqual(_node('(() => {const r = unholy_js.py__iterator(unholy_js.py__slice_view([1, 2], 0, 2, 1)); '
+                               'const a = r.next(); r.next(); const c = r.next(); return [a.value, c.done];})()'),
+                         [1, True])
+        # loops don't allocate a result object per element
+        self.assertEqual(_node('(() => {const r = unholy_js.py__range(2)[Symbol.iterator](); '
+                               'return r.next() === r.next();})()'), True)
+        self.assertEqual(_node('(() => {const it = unholy_js.py__iterator([1]); '
+                               'return unholy_js.py__iterator(it) === it;})()'), True)
+        self.assertEqual(_node('[...unholy_js.py__iter(new Map([["k", 1]]))]'), ['k'])
+
+
+class HelperTests(TestCase):
+    def tearDown(self):
+        unholy.runtime.inline = False
+
+    def test_only_when_used(self):
+        self.assertEqual(unholy.transpile('x = 1'), 'x = 1')
+        self.assertEqual(unholy.transpile('x = len(a)'), f'{unholy.runtime.REQUIRE};\nx = unholy_js.py__len(a)')
+        self.assertTrue(unholy.transpile('x = f"{a:>3}"').startswith(unholy.runtime.REQUIRE))
+
+    def test_iter(self):
+        # loops take any iterable, iter() has to give an iterator
+        self.assertIn('unholy_js.py__iterator(xs)', unholy.transpile('it = iter(xs)'))
+        self.assertIn('of unholy_js.py__iter(xs)', unholy.transpile('for x in xs:\n    print(x)'))
+
+    def test_declarations(self):
+        runtime = unholy.runtime.load()
+        self.assertEqual(runtime.exports['format'], 'py__format')
+        self.assertEqual(set(runtime.exports.values()) - set(runtime.declarations), set())
+        self.assertIn('PyRange', runtime.dependencies['py__range'])
+        self.assertIn('ValueError', runtime.dependencies['PyRange'])
+
+    def test_inline(self):
+        unholy.runtime.inline = True
+        code = unholy.transpile('x = len(a)')
+        self.assertNotIn('require(', code)
+        self.assertIn('const py__len = ', code)
+        self.assertNotIn('const py__slice = ', code)
+        self.assertTrue(code.endswith('return {py__len};\n})();\nx = unholy_js.py__len(a)'), code)
+
+    def test_cache_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = unholy.TranspileCache(directory)
+            key = cache.key('x = 1')
+            unholy.runtime.inline = True
+            self.assertNotEqual(cache.key('x = 1'), key)
+
+    @unittest.skipUnless(shutil.which('node'), 'node is not installed')
+    def test_inline_runs_alone(self):
+        unholy.runtime.inline = True
+        code = unholy.transpile('for i in range(n):\n'
+                                '    print(len([j for j in range(i)]) + sum(range(i)))\n'
+                                'print(len(a[1:]))\n'
+                                'print(1 in a[::2])\n')
+        with tempfile.TemporaryDirectory() as directory:
+            # no runtime next to the module
+            result = subprocess.run(['node', '-e', 'const n = 3, a = [1, 2, 3];\n' + code], cwd=directory,
+                                    capture_output=True, text=True, timeout=30, check=True)
+        self.assertEqual(result.stdout, '0\n1\n3\n2\ntrue\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
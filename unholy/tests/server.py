@@ -0,0 +1,165 @@
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase, mock
+
+import unholy
+from unholy.server import Server, serve
+from unholy.tests.comprehensions import ROOT
+
+
+def run(server: Server, *requests) -> list:
+    output = io.StringIO()
+    server.serve_stream(io.StringIO(''.join(json.dumps(i) + '\n' for i in requests)), output)
+    return [json.loads(i) for i in output.getvalue().splitlines()]
+
+
+class ServerTests(TestCase):
+    def setUp(self):
+        self.server = Server(jobs=1)
+
+    def tearDown(self):
+        self.server.close()
+        unholy.minify.enabled = unholy.esm.enabled = False
+        unholy.passes.set_passes(unholy.passes.PASSES)
+
+    def test_transpile(self):
+        self.assertEqual(run(self.server, {'id': 1, 'source': 'print(1)'}),
+                         [{'id': 1, 'ok': True, 'js': unholy.transpile('print(1)')}])
+
+    def test_options(self):
+        code = 'def f(value):\n    return value'
+        response, = run(self.server, {'id': 'a', 'source': code, 'filename': 'f.py',
+                                      'options': {'minify': True, 'source_map': True}})
+        unholy.minify.enabled = True
+        self.assertEqual(response['js'], unholy.transpile(code))
+        self.assertEqual(response['map']['sources'], ['f.py'])
+        # every request sets all options, the previous ones don't stick
+        unholy.minify.enabled = False
+        self.assertEqual(run(self.server, {'id': 2, 'source': code})[0]['js'], unholy.transpile(code))
+
+    def test_errors(self):
+        responses = run(self.server, {'id': 1, 'source': 'x = ('}, {'id': 2, 'source': 'x', 'options': {'x': 1}},
+                        {'id': 3, 'source': 'x', 'options': {'passes': ['nope']}}, {'id': 4}, {'id': 5, 'type': '?'})
+        with self.assertRaises(SyntaxError) as expected:  # the message depends on the Python version
+            unholy.parse('x = (')
+        self.assertEqual(responses[0]['error'], {'type': 'SyntaxError', 'message': expected.exception.msg, 'line': 1,
+                                                 'column': expected.exception.offset})
+        self.assertEqual([i['error']['type'] for i in responses], ['SyntaxError'] + ['ValueError'] * 4)
+        self.assertFalse(any(i['ok'] for i in responses))
+        output = io.StringIO()
+        self.server.serve_stream(io.StringIO('not json\n'), output)
+        self.assertEqual(json.loads(output.getvalue())['error']['type'], 'JSONDecodeError')
+
+    def test_memory_cache_and_stats(self):
+        request = {'id': 1, 'source': 'print(1)'}
+        *_, stats = run(self.server, request, {**request, 'id': 2}, {**request, 'options': {'esm': True}},
+                        {'id': 3, 'type': 'stats'})
+        self.assertEqual(stats['id'], 3)
+        self.assertEqual(stats['stats']['requests'], 3)
+        self.assertEqual(stats['stats']['memory_hits'], 1)
+        self.assertEqual(stats['stats']['in_flight'], 0)
+
+    def test_shutdown(self):
+        output = io.StringIO()
+        self.server.serve_stream(io.StringIO('{"type": "shutdown"}\n{"source": "x"}\n'), output)
+        self.assertEqual(output.getvalue(), '{"id": null, "ok": true}\n')
+
+    def test_threads(self):
+        # the requests of a socket's connections are answered by threads, they all set the options
+        code = 'def f(value):\n    return value\n'
+        expected = {False: unholy.transpile(code)}
+        unholy.minify.enabled = True
+        expected[True] = unholy.transpile(code)
+        unholy.minify.enabled = False
+        results = []
+        transpile = unholy.transpile
+
+        def slow_transpile(*args, **kwargs):
+            # lets the other threads set their options in between
+            time.sleep(0.001)
+            return transpile(*args, **kwargs)
+
+        def client(minify: bool):
+            responses = run(self.server, *({'id': i, 'source': f'{code}# {minify} {i}\n', 'options': {'minify': minify}}
+                                           for i in range(15)))
+            results.extend((minify, i['js']) for i in responses)
+
+        threads = [threading.Thread(target=client, args=(i % 2 == 0,)) for i in range(4)]
+        with mock.patch('unholy.transpile', slow_transpile):
+            for i in threads:
+                i.start()
+            for i in threads:
+                i.join()
+        self.assertEqual(len(results), 60)
+        for minify, js in results:
+            self.assertEqual(js, expected[minify])
+
+
+class WorkerTests(TestCase):
+    def test_pool(self):
+        server = Server(jobs=2)
+        try:
+            requests = [{'id': i, 'source': f'print({i})'} for i in range(20)]
+            responses = run(server, *requests)
+        finally:
+            server.close()
+        self.assertEqual(sorted(i['id'] for i in responses), list(range(20)))
+        self.assertTrue(all(i['js'] == f'console.log({i["id"]})' for i in responses))
+
+    def test_killed_worker(self):
+        server = Server(jobs=2)
+        try:
+            self.assertTrue(run(server, {'id': 1, 'source': 'print(1)'})[0]['ok'])
+            broken = server._pool
+            for process in list(broken._processes.values()):
+                process.kill()
+                process.join()
+            # the request sent to the broken pool fails, the ones after it go to new workers
+            response, = run(server, {'id': 2, 'source': 'print(2)'})
+            self.assertEqual(response['error']['type'], 'BrokenProcessPool')
+            self.assertIsNot(server._pool, broken)
+            self.assertEqual(server.stats.in_flight, 0)
+            self.assertEqual(run(server, {'id': 3, 'source': 'print(3)'}),
+                             [{'id': 3, 'ok': True, 'js': 'console.log(3)'}])
+        finally:
+            server.close()
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets are not supported')
+    def test_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'unholy.sock')
+            thread = threading.Thread(target=serve, args=(Server(jobs=2), path))
+            thread.start()
+            try:
+                for _ in range(100):
+                    if os.path.exists(path):
+                        break
+                    thread.join(0.05)
+                with socket.socket(socket.AF_UNIX) as client:
+                    client.connect(path)
+                    client.sendall(b'{"id": 1, "source": "print(1)"}\n{"id": 2, "type": "shutdown"}\n')
+                    with client.makefile() as lines:
+                        responses = [json.loads(i) for i in lines]
+            finally:
+                thread.join(30)
+            self.assertEqual(sorted(responses, key=lambda i: i['id']),
+                             [{'id': 1, 'ok': True, 'js': 'console.log(1)'}, {'id': 2, 'ok': True}])
+            self.assertFalse(os.path.exists(path))
+
+    def test_command_line(self):
+        result = subprocess.run([sys.executable, '-m', 'unholy', '-qq', '--serve', '-j', '1'], cwd=ROOT,
+                                input='{"id": 1, "source": "print(1)"}\n', capture_output=True, text=True,
+                                timeout=60, check=True)
+        self.assertEqual(json.loads(result.stdout), {'id': 1, 'ok': True, 'js': 'console.log(1)'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import itertools
+import json
+import shutil
+import unittest
+from unittest import TestCase
+
+import unholy
+import unholy.passes
+from unholy.tests.comprehensions import _run
+from unholy.tests.runtime import _node
+
+
+def _transpile(code: str) -> str:
+    return unholy.transpile(code).replace(unholy.runtime.REQUIRE + ';\n', '', 1)
+
+
+class SlicingTests(TestCase):
+    def setUp(self):
+        self._passes = list(unholy.passes.enabled_passes)
+
+    def tearDown(self):
+        unholy.passes.set_passes(self._passes)
+
+    def test_copy(self):
+        self.assertEqual(_transpile('x = a[1:]'), 'x = unholy_js.py__slice(a, 1)')
+        self.assertEqual(_transpile('x = a[::-1]'), 'x = unholy_js.py__slice(a, null, null, -1)')
+        self.assertEqual(_transpile('x = a[b:c:2]'), 'x = unholy_js.py__slice(a, b, c, 2)')
+        self.assertRaises(unholy.CompilationError, _transpile, 'a[1:] = b')
+
+    def test_views(self):
+        self.assertEqual(_transpile('x = len(a[1:])'), 'x = unholy_js.py__len(unholy_js.py__slice_view(a, 1))')
+        self.assertEqual(_transpile('x = sum(a[1:])'), 'x = unholy_js.py__sum(unholy_js.py__slice_view(a, 1))')
+        self.assertIn('py__slice_view(a, 1)', _transpile('x = b in a[1:]'))
+        # generator expressions run later, the slice is copied
+        self.assertIn('py__slice(a, 1)', _transpile('x = (i for i in a[1:])'))
+
+    def test_loops(self):
+        code = _transpile('for i in a[1:]:\n    print(i, a[0])')
+        self.assertIn('py__slice_indices(a, 1)', code)
+        self.assertIn('const i = a[py__index];', code)
+        self.assertIn('py__slice_indices(a, 1)', _transpile('x = [i for i in a[1:]]'))
+        # the loop could change what it iterates over
+        for code in ('for i in a[1:]:\n    a.append(i)', 'for i in a[1:]:\n    f(a)', 'x = [a for i in a[1:]]',
+                     # through a function, an alias or code running while a generator waits
+                     'for i in a[1:]:\n    f()', 'for i in a[1:]:\n    b[0] = i', 'for i in a[1:]:\n    b.c = i',
+                     'x = [f() for i in a[1:]]', 'def g():\n    for i in a[1:]:\n        yield i'):
+            with self.subTest(code=code):
+                self.assertIn('py__slice(a, 1)', _transpile(code))
+
+    def test_disabled(self):
+        unholy.passes.set_passes([])
+        self.assertEqual(_transpile('x = len(a[1:])'), 'x = unholy_js.py__len(unholy_js.py__slice(a, 1))')
+
+
+@unittest.skipUnless(shutil.which('node'), 'node is not installed')
+class SlicingRuntimeTests(TestCase):
+    def test_python_semantics(self):
+        values = [None, -9, -3, -1, 0, 2, 5, 9]
+        cases = list(itertools.product(values, values, [None, 1, 2, -1, -3]))
+        for target in (list(range(7)), 'abcdefg'):
+            script = '[' + ', '.join(
+                f'(() => {{const t = {json.dumps(target)}, a = [{json.dumps(i)[1:-1]}]; '
+                f'return [unholy_js.py__slice(t, ...a), [...unholy_js.py__slice_view(t, ...a)], '
+                f'unholy_js.py__len(unholy_js.py__slice_view(t, ...a))];}})()'
+                for i in cases) + ']'
+            for args, (copy, view, length) in zip(cases, _node(script)):
+                with self.subTest(target=target, args=args):
+                    expected = target[slice(*args)]
+                    self.assertEqual(copy, expected)
+                    self.assertEqual(view, list(expected))
+                    self.assertEqual(length, len(expected))
+
+    def test_typed_arrays(self):
+        self.assertEqual(_node('(() => {const a = new Float64Array([1, 2, 3, 4]), v = unholy_js.py__slice_view(a, 1);'
+                               'v[0] = 5; return [v instanceof Float64Array, a[1], '
+                               '[...unholy_js.py__slice(a, null, null, -2)]];})()'),
+                         [True, 5, [4, 5]])
+
+    def test_zero_step(self):
+        self.assertEqual(_node('(() => {try {unholy_js.py__slice([1], 0, 1, 0);} catch (e) '
+                               '{return e.constructor.name;}})()'), 'ValueError')
+
+    def test_loops(self):
+        code = ('def f(a):\n'
+                '    for i in a[::-2]:\n'
+                '        print(i)\n'
+                '    print([i for i in a[1:3]])\n'
+                '    print(len(a[5:]))\n'
+                '    print(3 in a[:2])\n'
+                'f([1, 2, 3, 4, 5])\n')
+        self.assertEqual(_run(code), '5\n3\n1\n[ 2, 3 ]\n0\nfalse\n')
+
+    def test_changed_in_loop(self):
+        code = ('a = [1, 2, 3, 4]\n'
+                'def f():\n'
+                '    a[2] = 99\n'
+                'for i in a[1:]:\n'
+                '    f()\n'
+                '    print(i)\n')
+        self.assertEqual(_run(code), '2\n3\n4\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
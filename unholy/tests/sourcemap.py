@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.project import transpile_project
+
+_BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def _decode(mappings: str):
+    """
+    Returns the segments of `mappings` as (line, column, source line, source column), with absolute positions.
+    """
+    segments = []
+    source_line = source_column = 0
+    for line, text in enumerate(mappings.split(';')):
+        column = 0
+        for segment in filter(None, text.split(',')):
+            values = []
+            value = shift = 0
+            for character in segment:
+                digit = _BASE64.index(character)
+                value |= (digit & 31) << shift
+                shift += 5
+                if not digit & 32:
+                    values.append(-(value >> 1) if value & 1 else value >> 1)
+                    value = shift = 0
+            column += values[0]
+            source_line += values[2]
+            source_column += values[3]
+            segments.append((line, column, source_line, source_column))
+    return segments
+
+
+class SourceMapTests(TestCase):
+    def test_vlq(self):
+        for value, encoded in ((0, 'A'), (1, 'C'), (-1, 'D'), (15, 'e'), (16, 'gB'), (-16, 'hB'), (123, '2H'),
+                               (100000, 'gqjG')):
+            with self.subTest(value=value):
+                self.assertEqual(unholy.encode_vlq(value), encoded)
+
+    def test_mappings(self):
+        code = 'def f(data):\n    print(data)\n\nx = [1, 2]\n'
+        source_map = unholy.SourceMap('test.py')
+        output = unholy.transpile(code, source_map=source_map).split('\n')
+        segments = {(output[line][column:], source_line, source_column)
+                    for line, column, source_line, source_column in _decode(source_map.mappings)}
+        self.assertIn(('let f = (function f(data) {', 0, 0), segments)
+        self.assertIn(('console.log(data)', 1, 4), segments)
+        self.assertIn(('data)', 1, 10), segments)
+        self.assertIn(('x = [1, 2, ]', 3, 0), segments)
+        self.assertIn(('[1, 2, ]', 3, 4), segments)
+
+    def test_non_ascii(self):
+        # the AST counts columns in UTF-8 bytes
+        code = 'x = "ééé"; y = f(1)\n'
+        source_map = unholy.SourceMap('test.py')
+        output = unholy.transpile(code, source_map=source_map).split('\n')
+        segments = {(output[line][column:], source_line, source_column)
+                    for line, column, source_line, source_column in _decode(source_map.mappings)}
+        self.assertIn(('y = f(1)', 0, 11), segments)
+
+    def test_line_offset(self):
+        source_map = unholy.SourceMap('test.py', line_offset=5)
+        unholy.transpile('x = 1', source_map=source_map)
+        self.assertTrue(source_map.mappings.startswith(';;;;;'))
+        self.assertEqual(_decode(source_map.mappings)[0], (5, 0, 0, 0))
+
+    def test_no_origins_by_default(self):
+        self.assertIsNone(unholy.jsify('x = 1')[0].statements[-1].origin)
+
+    def test_as_dict(self):
+        source_map = unholy.SourceMap('src/test.py', file='test.js', source_content='x = 1')
+        unholy.transpile('x = 1', source_map=source_map)
+        result = json.loads(source_map.to_json())
+        self.assertEqual(result['version'], 3)
+        self.assertEqual(result['sources'], ['src/test.py'])
+        self.assertEqual(result['sourcesContent'], ['x = 1'])
+        self.assertEqual(result['file'], 'test.js')
+
+
+class SourceMapOutputTests(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._dir.name, 'src')
+        self.output = os.path.join(self._dir.name, 'out')
+        os.makedirs(self.source)
+        with open(os.path.join(self.source, 'main.py'), 'w') as f:
+            f.write('def inner(x):\n'
+                    '    return x.missing.attribute\n'
+                    '\n'
+                    '\n'
+                    'inner(1)\n')
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_project(self):
+        transpile_project([self.source], self.output, jobs=1, source_maps=True)
+        with open(os.path.join(self.output, 'main.js')) as f:
+            self.assertTrue(f.read().endswith('\n//# sourceMappingURL=main.js.map\n'))
+        with open(os.path.join(self.output, 'main.js.map')) as f:
+            self.assertEqual(json.load(f)['sources'], ['../src/main.py'])
+
+    @unittest.skipUnless(shutil.which('node'), 'node is not installed')
+    def test_stack_trace(self):
+        transpile_project([self.source], self.output, jobs=1, source_maps=True)
+        os.symlink(os.path.abspath(os.path.join(ROOT, 'not_python')), os.path.join(self.output, 'not_python'))
+        result = subprocess.run(['node', '--enable-source-maps', 'main.js'], cwd=self.output, capture_output=True,
+                                text=True, timeout=30)
+        self.assertIn(f'at inner ({os.path.join(self.source, "main.py")}:2:12)', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
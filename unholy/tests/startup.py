@@ -0,0 +1,56 @@
+import importlib
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.tests.comprehensions import ROOT
+
+# generous, `import unholy` takes around 1 ms, loading the transpiler eagerly took over 50
+IMPORT_BUDGET_US = 20000
+# what `import unholy` must not load
+DEFERRED = ('typing', 'logging', 'ast', 'hashlib', 'json', 'typechecker', 'unholy.classes', 'unholy.functions',
+            'unholy.node_types', 'unholy.runtime', 'unholy.cache')
+
+
+def run_python(*arguments: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *arguments], cwd=ROOT, capture_output=True, text=True, timeout=60,
+                          check=True)
+
+
+class ImportTimeTests(TestCase):
+    def test_budget(self):
+        stderr = run_python('-X', 'importtime', '-c', 'import unholy').stderr
+        # "import time: self [us] | cumulative | imported package", nested imports are indented
+        imported = {}
+        for line in stderr.splitlines()[1:]:
+            _, cumulative, name = line.split('|')
+            imported[name.strip()] = int(cumulative)
+        self.assertLess(imported['unholy'], IMPORT_BUDGET_US)
+        self.assertFalse(set(DEFERRED) & set(imported), imported)
+
+    def test_translators_are_loaded_on_demand(self):
+        stdout = run_python('-c', 'import sys, unholy\n'
+                                  'unholy.transpile("x = 1")\n'
+                                  'print("unholy.node_types.comprehensions" in sys.modules)\n'
+                                  'unholy.transpile("x = [i for i in y]")\n'
+                                  'print("unholy.node_types.comprehensions" in sys.modules)\n').stdout
+        self.assertEqual(stdout, 'False\nTrue\n')
+
+
+class LazyExportTests(TestCase):
+    def test_exports(self):
+        for module, names in unholy._EXPORTS.items():
+            with self.subTest(module=module):
+                self.assertEqual(list(names), importlib.import_module(f'unholy.{module}').__all__)
+
+    def test_attributes(self):
+        self.assertIs(unholy.transpile, importlib.import_module('unholy.functions').transpile)
+        self.assertIs(unholy.watch, importlib.import_module('unholy.watch'))
+        self.assertFalse(hasattr(unholy, 'no_such_name'))
+        self.assertIn('TranspileCache', dir(unholy))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest import TestCase
+
+import unholy
+from unholy.watch import IncrementalModule
+
+SOURCE = '''@decorator
+def first(a, b):
+    if a:
+        print(a)
+    return b
+
+
+x = first(1, 2); y = 3
+
+
+def second():
+    return [1, 2]
+'''
+
+
+class IncrementalModuleTests(TestCase):
+    def assertUpdate(self, module: IncrementalModule, code: str, retranslated: int):
+        self.assertEqual(module.update(code), unholy.jsify(code)[0].compile([]))
+        self.assertEqual(module.retranslated, retranslated)
+
+    def test_initial(self):
+        self.assertUpdate(IncrementalModule(), SOURCE, 3)
+
+    def test_edits(self):
+        module = IncrementalModule()
+        module.update(SOURCE)
+
+        code = SOURCE.replace('print(a)', 'print(b)')
+        self.assertUpdate(module, code, 1)
+
+        code = code.replace('    return b\n', '    return b\n    print(a)\n')
+        self.assertUpdate(module, code, 1)
+
+        code = code.replace('@decorator\n', '')
+        self.assertUpdate(module, code, 1)
+
+        code = code.replace('y = 3\n', 'y = 3\nz = 4\n')
+        self.assertUpdate(module, code, 1)
+
+        code = code.replace('x = first(1, 2); ', '')
+        self.assertUpdate(module, code, 1)
+
+        code = 'import foo\n' + code
+        self.assertUpdate(module, code, 1)
+
+        self.assertUpdate(module, code, 0)
+
+    def test_syntax_error_keeps_state(self):
+        module = IncrementalModule()
+        module.update(SOURCE)
+        with self.assertRaises(SyntaxError):
+            module.update(SOURCE.replace('[1, 2]', '[1, 2'))
+        self.assertUpdate(module, SOURCE.replace('[1, 2]', '[1, 3]'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import ast
+import logging
+import os
+import time
+import typing
+
+import unholy
+import unholy.project
+from unholy.node_types.general import module_prologue
+
+
+class _Chunk:
+    """
+    A run of source lines holding one or more top-level statements (more than one only if they share a line).
+    """
+    __slots__ = ('start', 'end', 'text', 'nodes')
+
+    def __init__(self, start: int, end: int, nodes: typing.List[ast.stmt]):
+        self.start = start
+        self.end = end
+        self.nodes = nodes
+        self.text = ''
+
+
+def _chunk_module(tree: ast.Module, lines: typing.List[str], offset: int = 0) -> typing.List[_Chunk]:
+    chunks = []
+    for stmt in tree.body:
+        start = min([stmt.lineno] + [i.lineno for i in getattr(stmt, 'decorator_list', [])]) - 1
+        end = stmt.end_lineno
+        if offset:
+            ast.increment_lineno(stmt, offset)
+        if chunks and start < chunks[-1].end:
+            chunks[-1].end = max(end, chunks[-1].end)
+            chunks[-1].nodes.append(stmt)
+        else:
+            chunks.append(_Chunk(start, end, [stmt]))
+
+    for i in chunks:
+        i.text = ''.join(lines[i.start:i.end])
+        i.start += offset
+        i.end += offset
+    return chunks
+
+
+class IncrementalModule:
+    """
+    Keeps the translation of a module around between edits.
+
+    Each top-level statement is fingerprinted by its source text. On `update` only the lines that changed are parsed
+    again and only statements with a new fingerprint are translated, everything else is spliced in from the previous
+    output.
+    """
+
+    def __init__(self, filename: str = 'eval.py'):
+        self.filename = filename
+        self.retranslated = 0
+        self._lines: typing.List[str] = []
+        self._chunks: typing.Optional[typing.List[_Chunk]] = None
+        # the translation of every chunk and the runtime helpers it uses
+        self._compiled: typing.Dict[str, typing.Tuple[str, typing.Set[str]]] = {}
+
+    def update(self, code: str) -> str:
+        lines = code.splitlines(keepends=True)
+        chunks = None
+        if self._chunks is not None:
+            chunks = self._reparse_changed(lines)
+        if chunks is None:
+            chunks = _chunk_module(unholy.parse(code, self.filename), lines)
+
+        self.retranslated = 0
+        compiled = {}
+        output = []
+        helpers = set()
+        for chunk in chunks:
+            translation = compiled.get(chunk.text)
+            if translation is None:
+                translation = self._compiled.get(chunk.text)
+            if translation is None:
+                translation = self._translate(chunk)
+                self.retranslated += 1
+            compiled[chunk.text] = translation
+            chunk.nodes = None  # not needed anymore, the output is cached
+            js, used = translation
+            helpers.update(used)
+            if js:
+                output.append(js)
+        prologue = unholy.JSBlock(module_prologue(helpers), has_braces=False).compile([])
+        if prologue:
+            output.insert(0, prologue)
+
+        self._lines = lines
+        self._chunks = chunks
+        self._compiled = compiled
+        return '\n'.join(output)
+
+    @property
+    def statement_count(self) -> int:
+        return len(self._chunks) if self._chunks else 0
+
+    def _translate(self, chunk: _Chunk) -> typing.Tuple[str, typing.Set[str]]:
+        helpers = unholy.runtime.collect()
+        body = []
+        for i in unholy.optimize(ast.Module(body=chunk.nodes, type_ignores=[])).body:
+            body.extend(unholy.jsify_node(i))
+        return unholy.JSBlock(body, has_braces=False).compile([]), helpers
+
+    def _reparse_changed(self, lines: typing.List[str]) -> typing.Optional[typing.List[_Chunk]]:
+        """
+        Parses only the statements touched by the difference between the old and new lines. Returns None if that's
+        not possible and the whole module needs to be parsed.
+        """
+        old = self._lines
+        limit = min(len(old), len(lines))
+        prefix = 0
+        while prefix < limit and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+
+        changed_start = prefix
+        changed_end = len(old) - suffix
+        first = 0
+        while first < len(self._chunks) and self._chunks[first].end <= changed_start:
+            first += 1
+        last = first
+        while last < len(self._chunks) and self._chunks[last].start < changed_end:
+            last += 1
+        # Neighbouring statements are parsed again too. New lines might continue the previous statement
+        # (e.g. the body of a function) or be a prefix of the next one (e.g. a decorator).
+        first = max(first - 1, 0)
+        last = min(last + 1, len(self._chunks))
+        before = self._chunks[:first]
+        after = self._chunks[last:]
+        touched = self._chunks[first:last]
+        touched_start = min([changed_start] + [i.start for i in touched])
+        touched_end = max([changed_end] + [i.end for i in touched])
+
+        delta = len(lines) - len(old)
+        new_end = touched_end + delta
+        try:
+            tree = unholy.parse(''.join(lines[touched_start:new_end]), self.filename)
+        except SyntaxError:
+            return None
+
+        middle = _chunk_module(tree, lines[touched_start:new_end], touched_start)
+        if before and middle and middle[0].start < before[-1].end:
+            return None
+        # the old chunks must stay intact in case translating the new ones fails
+        shifted = []
+        for i in after:
+            chunk = _Chunk(i.start + delta, i.end + delta, i.nodes)
+            chunk.text = i.text
+            shifted.append(chunk)
+        return before + middle + shifted
+
+
+def _write(output: str, result: str):
+    if output == '-':
+        print(result, flush=True)
+        return
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(unholy.START_COMMENT)
+        f.write(result)
+
+
+def watch(paths: typing.List[str], output: str, interval: float = 0.1, rescan_interval: float = 2.0):
+    """
+    Watches `paths` and re-transpiles files as they change, until interrupted.
+
+    A single file is written to `output` (which can be `-`), directories and globs are mirrored into the `output`
+    directory like in project mode.
+    """
+    single = len(paths) == 1 and not unholy.project.is_project_input(paths[0])
+    modules: typing.Dict[str, IncrementalModule] = {}
+    mtimes: typing.Dict[str, int] = {}
+    targets: typing.List[typing.Tuple[str, str]] = []
+    last_scan = None
+
+    while True:
+        if single:
+            targets = [(paths[0], output)]
+        elif last_scan is None or time.monotonic() - last_scan > rescan_interval:
+            targets = [(source, unholy.project.output_path(relative, output))
+                       for source, relative in unholy.project.collect_sources(paths)]
+            last_scan = time.monotonic()
+
+        for source, target in targets:
+            try:
+                mtime = os.stat(source).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtimes.get(source) == mtime:
+                continue
+            mtimes[source] = mtime
+
+            start = time.perf_counter()
+            module = modules.setdefault(source, IncrementalModule(source))
+            try:
+                with open(source, encoding='utf-8') as f:
+                    result = module.update(f.read())
+                _write(target, result)
+            except Exception as e:
+                logging.error(f'{source}: {type(e).__name__}: {e}')
+                continue
+            logging.info(f'Updated {target} in {(time.perf_counter() - start) * 1000:.1f}ms '
+                         f'({module.retranslated}/{module.statement_count} statements translated)')
+        time.sleep(interval)
+
+
+__all__ = ['IncrementalModule', 'watch']